@@ -1,49 +1,73 @@
 """Revenue Agent System Flask application."""
+import functools
+import hmac
 import json
 import os
-import queue
-import threading
+import time
 from datetime import datetime, timezone
 from typing import Any
-from flask import Flask, Response, jsonify, render_template_string, request, stream_with_context
+from flask import Flask, Response, g, jsonify, render_template_string, request, stream_with_context
 try:
     import stripe
 except ImportError:
     stripe = None
 try:
-    from cache_utils import cached, invalidate_revenue_cache, TTL_STRIPE_REVENUE
+    from cache_utils import (cached, cache_stats, invalidate_revenue_cache, on_invalidated, redis_connection,
+                             revenue_invalidator, REVENUE_ROOT, TTL_STRIPE_REVENUE, TTL_STRIPE_REVENUE_HARD)
 except ImportError:
     def cached(*_args, **_kwargs): return lambda fn: fn
-    def invalidate_revenue_cache(): return None
-    TTL_STRIPE_REVENUE = 0
+    def cache_stats(): return {}
+    def invalidate_revenue_cache(immediate=False): return None
+    def on_invalidated(key, callback): return None
+    def redis_connection(): return None
+    revenue_invalidator = None
+    REVENUE_ROOT = 'stripe_revenue'
+    TTL_STRIPE_REVENUE = TTL_STRIPE_REVENUE_HARD = 0
 try:
     from master_conductor import get_conductor
 except ImportError:
     get_conductor = None
+from revenue_providers import RevenueSource
 try:
     from funnel_control.routes import funnel_bp
 except ImportError:
     funnel_bp = None
+from materialized import Materializer
+from metrics import CONTENT_TYPE_LATEST, exposition, observe_request
+from revenue_aggregator import RevenueAggregator
+from revenue_engine import LineItems, compute_mrr
+from sse_hub import EventHub
+from stripe_listing import ListSource, crawl
+from stripe_mirror import StripeMirror
+from webhook_queue import WebhookQueue
 
 app = Flask(__name__)
 MRR = int(os.getenv("MRR", "5000"))
 CUSTOMERS = int(os.getenv("CUSTOMERS", "12"))
 ARR = int(os.getenv("ARR", str(MRR * 12)))
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+PAYOUT_ADMIN_SECRET = os.getenv("PAYOUT_ADMIN_SECRET", "")
+STRIPE_MIRROR_ENABLED = os.getenv("STRIPE_MIRROR_ENABLED", "1").lower() not in {"0", "false", "no"}
 if stripe is not None:
     stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "")
 conductor = get_conductor() if get_conductor else None
-_sse_subscribers: list[queue.Queue] = []
-_sse_lock = threading.Lock()
-
-def _notify_sse(event: str, data: dict[str, Any]):
-    payload = f"event: {event}\ndata: {json.dumps(data)}\n\n"
-    with _sse_lock:
-        for q in list(_sse_subscribers):
-            try:
-                q.put_nowait(payload)
-            except queue.Full:
-                _sse_subscribers.remove(q)
+sse_hub = EventHub(redis_client=redis_connection)
+
+def _notify_sse(event: str, data: dict[str, Any], dedupe: str | None = None):
+    return sse_hub.publish(event, data, dedupe=dedupe)
+
+@app.before_request
+def _start_request_timer(): g.request_started = time.perf_counter()
+
+@app.after_request
+def _observe_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        observe_request(request.url_rule.rule if request.url_rule else 'unmatched', request.method, response.status_code, time.perf_counter() - started)
+    return response
+
+@app.get('/metrics')
+def metrics(): return Response(exposition(), content_type=CONTENT_TYPE_LATEST)
 
 DASHBOARD_HTML = """<!doctype html><html><head><title>Revenue Agent Dashboard</title></head><body><h1>Revenue Agent Dashboard</h1><h2>Monthly Recurring Revenue</h2><div id='mrr'>$0</div><h2>Active Customers</h2><div id='customers'>0</div><h2>System Status</h2><div id='status'>ONLINE</div><script>async function updateDashboard(){const r=await fetch('/api/revenue');const d=await r.json();document.getElementById('mrr').textContent='$'+Number(d.mrr).toLocaleString();document.getElementById('customers').textContent=d.customers;}updateDashboard();</script></body></html>"""
 
@@ -51,38 +75,94 @@ DASHBOARD_HTML = """<!doctype html><html><head><title>Revenue Agent Dashboard</t
 def dashboard():
     return render_template_string(DASHBOARD_HTML)
 
-@cached('stripe_revenue', ttl=TTL_STRIPE_REVENUE)
+stripe_mirror = StripeMirror(stripe_module=stripe) if STRIPE_MIRROR_ENABLED and stripe is not None else None
+
+def _scan_stripe():
+    """Full revenue state; only used to prime and periodically reconcile the aggregator."""
+    if stripe_mirror is not None:
+        stripe_mirror.sync()
+        return stripe_mirror.scan_state()
+    listed = crawl({'subscriptions': ListSource(stripe.Subscription.list, {'status': 'active'}),
+                    'customers': ListSource(stripe.Customer.list),
+                    'charges': ListSource(stripe.Charge.list, max_pages=1)})
+    subscriptions = compute_mrr(LineItems.from_subscriptions(listed['subscriptions'])).by_subscription
+    customers = [c['id'] for c in listed['customers']]
+    total = sum(c['amount'] / 100 for c in listed['charges'] if c.get('status') == 'succeeded')
+    return {'subscriptions': subscriptions, 'customers': customers, 'total_revenue': total}
+
+revenue_aggregator = RevenueAggregator(scanner=_scan_stripe)
+
+@cached('stripe_revenue', ttl=TTL_STRIPE_REVENUE_HARD, soft_ttl=TTL_STRIPE_REVENUE, shared=True)
 def fetch_stripe_revenue():
     if stripe is None or not stripe.api_key:
         return {'mrr': MRR, 'customers': CUSTOMERS, 'arr': ARR, 'total_revenue': 0, 'configured': False}
     try:
-        mrr = 0.0
-        for sub in stripe.Subscription.list(status='active', limit=100).auto_paging_iter():
-            for item in sub['items']['data']:
-                price = item['price']
-                amount = (price.get('unit_amount') or 0) / 100
-                if price.get('recurring', {}).get('interval') == 'year': amount /= 12
-                mrr += amount * item.get('quantity', 1)
-        customers = sum(1 for _ in stripe.Customer.list(limit=100).auto_paging_iter())
-        charges = stripe.Charge.list(limit=100)
-        total = sum(c['amount'] / 100 for c in charges.data if c.get('status') == 'succeeded')
-        return {'mrr': round(mrr, 2), 'customers': customers, 'arr': round(mrr * 12, 2), 'total_revenue': round(total, 2), 'configured': True}
+        return revenue_aggregator.snapshot() or revenue_aggregator.reconcile()
     except Exception as exc:
         return {'mrr': MRR, 'customers': CUSTOMERS, 'arr': ARR, 'total_revenue': 0, 'configured': False, 'error': str(exc)}
 
+if conductor is not None:
+    # The cached Stripe figure is the subscriptions stream; a cold cache costs a crawl, so it gets a long deadline.
+    conductor.providers.register(RevenueSource('subscriptions', lambda: fetch_stripe_revenue()['mrr'], ttl=TTL_STRIPE_REVENUE,
+                                               deadline=float(os.getenv('STRIPE_SOURCE_DEADLINE', 5))))
+    # Whichever worker flushes the cached figure after a webhook, every worker reads it again then, not after the TTL.
+    on_invalidated(REVENUE_ROOT, lambda: conductor.providers.expire('subscriptions'))
+
+def _uncached(view):
+    """The conductor view computed from the current snapshot; its cached copy may predate the version being rendered."""
+    wrapped = getattr(view, '__wrapped__', None)
+    return functools.partial(wrapped, view.__self__) if wrapped else view
+
+# Polled conductor views, pre-rendered whenever a revenue source changes and served by ETag.
+conductor_views = Materializer({'dashboard': _uncached(conductor.get_master_dashboard),
+                                'financial-summary': _uncached(conductor.get_financial_summary),
+                                'health': _uncached(conductor.get_system_health)},
+                               version=conductor.revenue_version, dumps=app.json.dumps) if conductor else None
+
 @app.get('/api/revenue')
 def revenue_api():
-    data = fetch_stripe_revenue()
+    data = dict(revenue_aggregator.snapshot() or fetch_stripe_revenue())
     data['timestamp'] = datetime.now(timezone.utc).isoformat()
     return jsonify(data)
 
+# Webhooks change the mirror and then invalidate REVENUE_ROOT, which flushes this too.
+@cached('revenue_breakdown', ttl=TTL_STRIPE_REVENUE_HARD, soft_ttl=TTL_STRIPE_REVENUE, depends_on=(REVENUE_ROOT,))
+def fetch_revenue_breakdown():
+    return stripe_mirror.mrr().to_dict()
+
+@app.get('/api/revenue/breakdown')
+def revenue_breakdown():
+    if stripe_mirror is None or stripe is None or not stripe.api_key:
+        return jsonify({'status': 'unavailable'})
+    return jsonify({**fetch_revenue_breakdown(), 'timestamp': datetime.now(timezone.utc).isoformat()})
+
+@app.get('/api/revenue/history')
+def revenue_history():
+    if conductor is None:
+        return jsonify({'status': 'unavailable'})
+    resolution = request.args.get('resolution', 'hour')
+    if resolution not in ('minute', 'hour', 'day'):
+        return jsonify({'status': 'error', 'message': f'Unknown resolution: {resolution}'}), 400
+    since = request.args.get('since', time.time() - 7 * 86400, type=float)
+    return jsonify({'resolution': resolution, 'series': conductor.history.series(resolution, since, request.args.get('until', type=float)),
+                    'monthlyGrowth': conductor.history.monthly_growth(), 'timestamp': datetime.now(timezone.utc).isoformat()})
+
 @app.get('/health')
 def health():
     return jsonify({'status': 'healthy', 'service': 'revenue-agent'})
 
+@app.get('/api/cache/stats')
+def cache_stats_api():
+    return jsonify({**cache_stats(), 'invalidation': dict(revenue_invalidator.stats) if revenue_invalidator else {},
+                    'materialized': conductor_views.status() if conductor_views else {}})
+
 @app.post('/api/revenue/sync')
 def sync_revenue():
-    invalidate_revenue_cache()
+    invalidate_revenue_cache(immediate=True)
+    if revenue_aggregator.primed:
+        try: revenue_aggregator.reconcile()
+        except Exception as exc: app.logger.warning(f'Revenue reconciliation failed: {exc}')
+    if conductor_views is not None: conductor_views.wake()
     return jsonify({'status': 'success', 'data': fetch_stripe_revenue(), 'timestamp': datetime.now(timezone.utc).isoformat()})
 
 @app.post('/api/checkout-session')
@@ -122,38 +202,65 @@ def stripe_webhook():
         else:
             event = stripe.Event.construct_from(request.get_json(silent=True) or {}, stripe.api_key)
         event_type = event['type']
-        invalidate_revenue_cache()
-        _notify_sse('revenue_update', {'event': event_type})
-        return jsonify({'status': 'success', 'event': event_type})
+        payload = json.loads(request.data) if STRIPE_WEBHOOK_SECRET else (request.get_json(silent=True) or {})
+        duplicate = not webhook_queue.enqueue(payload)
+        return jsonify({'status': 'queued', 'event': event_type, 'duplicate': duplicate})
     except Exception as exc:
         return jsonify({'error': str(exc)}), 400
 
+def _process_webhook_events(events):
+    """Shared side effects; run once per event by whichever worker claims the batch."""
+    if stripe_mirror is not None:
+        for event in events: stripe_mirror.apply_event(event)
+    invalidate_revenue_cache()
+
+def _apply_webhook_events_locally(events):
+    """Per-worker state; every worker tails every event."""
+    revenue_aggregator.apply_events(events)
+
+def _broadcast_webhook_batch(first_seq, last_seq, events):
+    """Runs once per processed batch; the seq range dedupes a reclaimed batch processed twice."""
+    _notify_sse('revenue_update', {'event': events[-1]['type'], 'count': len(events)}, dedupe=f'webhooks:{first_seq}-{last_seq}')
+
+webhook_queue = WebhookQueue(handler=_process_webhook_events, local_handler=_apply_webhook_events_locally,
+                             on_processed=_broadcast_webhook_batch)
+
+@app.get('/api/webhooks/queue')
+def webhook_queue_status():
+    return jsonify(webhook_queue.status())
+
 @app.get('/api/conductor/dashboard')
-def conductor_dashboard(): return jsonify(conductor.get_master_dashboard() if conductor else {'status':'unavailable'})
+def conductor_dashboard(): return conductor_views.respond('dashboard', request) if conductor_views else jsonify({'status':'unavailable'})
 @app.get('/api/conductor/financial-summary')
-def conductor_financial_summary(): return jsonify(conductor.get_financial_summary() if conductor else {'status':'unavailable'})
+def conductor_financial_summary(): return conductor_views.respond('financial-summary', request) if conductor_views else jsonify({'status':'unavailable'})
 @app.get('/api/conductor/forecast')
 def conductor_forecast(): return jsonify(conductor.get_revenue_forecast(request.args.get('months', 12, type=int)) if conductor else {'status':'unavailable'})
 @app.get('/api/conductor/health')
-def conductor_health(): return jsonify(conductor.get_system_health() if conductor else {'status':'unavailable'})
+def conductor_health(): return conductor_views.respond('health', request) if conductor_views else jsonify({'status':'unavailable'})
+@app.post('/api/conductor/orchestrate-payout')
+def conductor_orchestrate_payout():
+    # Commits a batch and advances the ledger cursors: closed unless PAYOUT_ADMIN_SECRET is set and sent.
+    if not PAYOUT_ADMIN_SECRET or not hmac.compare_digest(request.headers.get('X-Payout-Secret', '').encode(), PAYOUT_ADMIN_SECRET.encode()):
+        return jsonify({'error': 'unauthorized'}), 401
+    if conductor is None:
+        return jsonify({'status': 'unavailable'})
+    try:
+        return jsonify(conductor.orchestrate_payout_cycle((request.get_json(silent=True) or {}).get('tier'),
+                                                          idempotency_key=request.headers.get('Idempotency-Key')))
+    except ValueError as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 400
 
 @app.get('/api/events/stream')
 def events_stream():
-    def generate():
-        q = queue.Queue(maxsize=50)
-        with _sse_lock: _sse_subscribers.append(q)
-        try:
-            yield 'event: heartbeat\ndata: {}\n\n'
-            while True:
-                try: yield q.get(timeout=25)
-                except queue.Empty: yield ': keep-alive\n\n'
-        finally:
-            with _sse_lock:
-                if q in _sse_subscribers: _sse_subscribers.remove(q)
-    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={'Cache-Control':'no-cache','X-Accel-Buffering':'no'})
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+    return Response(stream_with_context(sse_hub.stream(last_id)), mimetype='text/event-stream', headers={'Cache-Control':'no-cache','X-Accel-Buffering':'no'})
+@app.get('/api/events/status')
+def events_status(): return jsonify(sse_hub.status())
 
 if funnel_bp is not None:
     app.register_blueprint(funnel_bp)
 
 if __name__ == '__main__':
+    webhook_queue.start()  # gunicorn workers start theirs in gunicorn.conf.py
     app.run(host='0.0.0.0', port=int(os.getenv('PORT', '5000')))
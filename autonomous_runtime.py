@@ -123,8 +123,10 @@ class AutonomousRuntime:
 
     def __init__(self, conductor: Any = None, revenue_reader: Callable[[], dict[str, Any]] | None = None,
                  action_executor: Callable[[dict[str, Any]], dict[str, Any]] | None = None,
-                 interval: int = DEFAULT_INTERVAL) -> None:
+                 interval: int = DEFAULT_INTERVAL, history: Any = None) -> None:
         self.conductor = conductor
+        # Revenue time series fed once per cycle; defaults to the conductor's so it measures growth from it.
+        self.history = history if history is not None else getattr(conductor, "history", None)
         self.revenue_reader = revenue_reader
         self.action_executor = action_executor
         self.interval = max(10, interval)
@@ -209,6 +211,7 @@ class AutonomousRuntime:
             revenue = self._read_revenue()
             snapshot = self._snapshot(revenue)
             self._emit(cycle_id, "RevenueSentinel", "revenue_snapshot", snapshot)
+            self._record_history(revenue)
 
             opportunities = self._rank_opportunities(revenue)
             self._emit(cycle_id, "OpportunityRanker", "opportunities_ranked",
@@ -250,6 +253,15 @@ class AutonomousRuntime:
             return dict(self.revenue_reader())
         return {"configured": False, "mrr": 0, "customers": 0, "arr": 0, "total_revenue": 0, "source": "unconfigured"}
 
+    def _record_history(self, revenue: dict[str, Any]) -> None:
+        # Placeholder figures from an unconfigured Stripe account would skew measured growth.
+        if self.history is None or not revenue.get("configured"):
+            return
+        try:
+            self.history.record(revenue)
+        except Exception as exc:
+            logger.warning("Could not record revenue history: %s", exc)
+
     @staticmethod
     def _snapshot(revenue: dict[str, Any]) -> dict[str, Any]:
         return {k: revenue.get(k) for k in ("configured", "mrr", "customers", "arr", "total_revenue", "source")}
@@ -0,0 +1,109 @@
+"""Cache codec benchmark on the payload shapes the app actually caches.
+
+Reports encode and decode time and stored size for every available
+serializer/compressor pair in :mod:`cache_codecs`, and, with ``--redis``,
+the server-side ``MEMORY USAGE`` of each stored value.
+
+    python -m benchmarks.bench_cache_codecs --subscriptions 10000
+    python -m benchmarks.bench_cache_codecs --redis redis://localhost:6379/15
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("STRIPE_SECRET_KEY", "sk_test_benchmark")
+
+from benchmarks.fake_stripe import FakeStripeData  # noqa: E402
+from cache_codecs import COMPRESSION_TAGS, COMPRESSORS, CODEC_TAGS, SERIALIZERS, Codec  # noqa: E402
+from master_conductor import MasterConductor  # noqa: E402
+from revenue_engine import LineItems, compute_mrr  # noqa: E402
+
+
+def payloads(subscriptions: int) -> dict[str, Any]:
+    data = FakeStripeData.seed(subscriptions)
+    subs = data.collections["subscriptions"]
+    breakdown = compute_mrr(LineItems.from_subscriptions(subs))
+    conductor = MasterConductor()
+    now = datetime.now(timezone.utc)
+    return {
+        "stripe_revenue": {"mrr": round(breakdown.total, 2), "customers": len(data.collections["customers"]),
+                           "arr": round(breakdown.total * 12, 2), "total_revenue": 123456.78,
+                           "configured": True, "source": "aggregate"},
+        "conductor_master_dashboard": MasterConductor.get_master_dashboard.__wrapped__(conductor),
+        "conductor_forecast_24": MasterConductor.get_revenue_forecast.__wrapped__(conductor, 24),
+        "revenue_breakdown": {**breakdown.to_dict(), "bySubscription": breakdown.by_subscription},
+        "scan_state": {"subscriptions": {s["id"]: {"customer": s["customer"], "status": s["status"],
+                                                   "created": s["created"]} for s in subs}},
+        "recent_events": [{"id": f"evt_{i}", "type": "invoice.paid", "amount": 2900 + i,
+                           "received_at": now - timedelta(seconds=i)} for i in range(min(subscriptions, 2000))],
+    }
+
+
+def codecs() -> list[Codec]:
+    found = []
+    for codec, tag in CODEC_TAGS.items():
+        for compression, ctag in COMPRESSION_TAGS.items():
+            if tag in SERIALIZERS and ctag in COMPRESSORS:
+                found.append(Codec(codec, compression, threshold=0))
+    return found
+
+
+def time_per_call(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def run(subscriptions: int, repeat: int, redis_url: str | None) -> list[dict[str, Any]]:
+    client = None
+    if redis_url:
+        import redis
+        client = redis.Redis.from_url(redis_url)
+    rows = []
+    for name, value in payloads(subscriptions).items():
+        reps = max(3, repeat * 100_000 // max(len(json.dumps(value, default=str)), 1000))
+        for codec in codecs():
+            raw = codec.encode(value)
+            row = {"payload": name, "codec": codec.name, "bytes": len(raw),
+                   "encode_us": time_per_call(lambda: codec.encode(value), reps) * 1e6,
+                   "decode_us": time_per_call(lambda: Codec.decode(raw), reps) * 1e6}
+            if name == "recent_events":
+                row["datetimes_kept"] = isinstance(Codec.decode(raw)[0]["received_at"], datetime)
+            if client is not None:
+                key = f"bench:codec:{name}:{codec.name}"
+                client.set(key, raw)
+                row["redis_bytes"] = client.memory_usage(key)
+                client.delete(key)
+            rows.append(row)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscriptions", type=int, default=10000, help="size of the synthetic account")
+    parser.add_argument("--repeat", type=int, default=200, help="iterations for a 100 KB payload (scaled by size)")
+    parser.add_argument("--redis", default=None, help="Redis URL to measure MEMORY USAGE against")
+    parser.add_argument("--json", action="store_true", help="emit JSON rows instead of a table")
+    args = parser.parse_args()
+    rows = run(args.subscriptions, args.repeat, args.redis)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'payload':<28} {'codec':<14} {'bytes':>10} {'redis':>10} {'enc us':>10} {'dec us':>10} {'datetimes':>9}")
+    for row in rows:
+        kept = {True: "kept", False: "str"}.get(row.get("datetimes_kept"), "-")
+        print(f"{row['payload']:<28} {row['codec']:<14} {row['bytes']:>10} {row.get('redis_bytes', '-'):>10} "
+              f"{row['encode_us']:>10.1f} {row['decode_us']:>10.1f} {kept:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Payout-cycle benchmark on a synthetic ledger.
+
+Streams synthetic commission, content-sale and service-order records into a
+fresh :class:`payout_engine.PayoutLedger` and reports wall time, records per
+second and the process's peak RSS for ingest, a full payout cycle, a replay
+of that cycle and an incremental cycle over 1% new records.
+
+    python -m benchmarks.bench_payouts --records 1000000 --payees 50000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from payout_engine import KINDS, MINIMUM_CENTS, PayoutLedger  # noqa: E402
+
+TIERS = tuple(MINIMUM_CENTS)
+
+
+def synthetic_records(count: int, payees: int, seed: int, offset: int = 0) -> Iterator[tuple]:
+    """``count`` ledger rows spread over ``payees`` payees, generated lazily."""
+    rng = random.Random(seed)
+    who = []
+    for payee in range(payees):
+        kind = KINDS[payee % len(KINDS)]
+        who.append((kind, f"{kind[:3]}_{payee}", TIERS[payee % len(TIERS)] if kind == "commission" else "standard"))
+    created = 1_700_000_000
+    for i in range(offset, offset + count):
+        kind, payee, tier = who[int(rng.random() * payees)]
+        yield f"sale_{i:012d}", kind, payee, tier, 50 + int(rng.random() * 4950), created + i
+
+
+def _peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def run(records: int, payees: int, chunk_size: int, seed: int) -> list[dict[str, Any]]:
+    rows: list[dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = PayoutLedger(Path(tmp) / "ledger.sqlite3", chunk_size=chunk_size)
+
+        def stage(name: str, fn: Callable[[], Any], n: int) -> Any:
+            started = time.perf_counter()
+            result = fn()
+            seconds = time.perf_counter() - started
+            rows.append({"stage": name, "records": n, "seconds": seconds,
+                         "records_per_s": n / seconds if seconds else None, "peak_rss_mib": _peak_rss_mib()})
+            return result
+
+        stage("ingest", lambda: ledger.record_many(synthetic_records(records, payees, seed)), records)
+        batch = stage("cycle", ledger.run_cycle, records)
+        rows[-1].update(payees_paid=len(batch.lines), total_cents=batch.total_cents, carried_cents=batch.carried_cents)
+        replay = stage("cycle_replay", ledger.run_cycle, records)
+        rows[-1]["replayed"] = replay.replayed and replay.batch_id == batch.batch_id
+        extra = max(1, records // 100)
+        stage("ingest_incremental", lambda: ledger.record_many(synthetic_records(extra, payees, seed + 1, records)),
+              extra)
+        batch = stage("cycle_incremental", ledger.run_cycle, extra)
+        rows[-1].update(payees_paid=len(batch.lines), total_cents=batch.total_cents, carried_cents=batch.carried_cents)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1_000_000, help="synthetic ledger records")
+    parser.add_argument("--payees", type=int, default=50_000, help="distinct payees across all kinds")
+    parser.add_argument("--chunk-size", type=int, default=200_000, help="ledger ids aggregated per query")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="emit JSON rows instead of a table")
+    args = parser.parse_args()
+    rows = run(args.records, args.payees, args.chunk_size, args.seed)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'stage':<20} {'records':>10} {'wall ms':>10} {'records/s':>12} {'peak RSS MiB':>13}")
+    for row in rows:
+        rate = f"{row['records_per_s']:>12,.0f}" if row["records_per_s"] else f"{'-':>12}"
+        print(f"{row['stage']:<20} {row['records']:>10} {row['seconds'] * 1000:>10.1f} {rate} "
+              f"{row['peak_rss_mib']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Revenue-path benchmark against the local Stripe stand-in.
+
+Seeds :mod:`benchmarks.fake_stripe` with synthetic accounts and reports wall
+time, Stripe API call count and peak traced memory for each stage of the
+revenue path: the direct crawl, a cold and a warm mirror sync, live
+aggregate reads, checkout session creation and signed webhook delivery.
+
+    python -m benchmarks.bench_revenue_path --sizes 1000,10000,100000
+
+With ``--check`` it exits non-zero when a stage exceeds its budget in
+``BUDGETS``, which is how CI runs it as a regression gate.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("STRIPE_SECRET_KEY", "sk_test_benchmark")
+os.environ.setdefault("STRIPE_STARTER_PRICE_ID", "price_starter")
+
+import stripe  # noqa: E402
+
+import app as revenue_app  # noqa: E402
+import stripe_listing  # noqa: E402
+from benchmarks.fake_stripe import FakeStripeData, FakeStripeServer, make_event, sign_webhook  # noqa: E402
+from revenue_aggregator import RevenueAggregator  # noqa: E402
+from stripe_mirror import StripeMirror  # noqa: E402
+
+WEBHOOK_SECRET = "whsec_benchmark"
+SEED_START = 1_600_000_000
+
+# stage -> (API calls: fixed + per 1k subscriptions, wall seconds per call or None).
+# Call counts are deterministic against the stand-in, so they carry most of the
+# gate; wall time is only bounded where a request handler is being measured.
+BUDGETS = {
+    "crawl": ((10, 25), None),
+    "mirror_sync_cold": ((15, 35), None),
+    "mirror_sync_warm": ((20, 0), None),
+    "aggregate_read": ((0, 0), 0.001),
+    "checkout_session": ((1, 0), 0.25),
+    "webhook": ((0, 0), 0.25),
+}
+
+
+class PeakMemory:
+    """Peak resident-set growth over a block, sampled from /proc.
+
+    tracemalloc slows the Stripe client's object construction several-fold,
+    so it is only used where /proc/self/statm is unavailable.
+    """
+
+    STATM = Path("/proc/self/statm")
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._traced = not self.STATM.exists()
+
+    def _rss(self) -> int:
+        return int(self.STATM.read_text().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self._rss() - self.baseline)
+
+    def __enter__(self) -> "PeakMemory":
+        if self._traced:
+            tracemalloc.start()
+            return self
+        self.baseline = self._rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        if self._traced:
+            self.peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss() - self.baseline)
+
+
+def measure(server: FakeStripeServer, fn: Callable[[], Any], repeat: int = 1) -> dict[str, Any]:
+    server.reset_calls()
+    with PeakMemory() as memory:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = fn()
+        elapsed = time.perf_counter() - started
+    return {"seconds": elapsed / repeat, "api_calls": server.total_calls / repeat,
+            "peak_mib": memory.peak / 2 ** 20, "result": result}
+
+
+def run_size(size: int, latency: float, repeat: int) -> list[dict[str, Any]]:
+    rows = []
+    with FakeStripeServer(FakeStripeData.seed(size), latency=latency) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        stripe.api_base = server.url
+        stripe.api_key = os.environ["STRIPE_SECRET_KEY"]
+        client = revenue_app.app.test_client()
+        revenue_app.STRIPE_WEBHOOK_SECRET = WEBHOOK_SECRET
+
+        def stage(name: str, fn: Callable[[], Any], n: int = 1) -> Any:
+            stats = measure(server, fn, n)
+            rows.append({"size": size, "stage": name, **{k: v for k, v in stats.items() if k != "result"}})
+            return stats["result"]
+
+        revenue_app.stripe_mirror = None
+        state = stage("crawl", revenue_app._scan_stripe)
+        mirror = StripeMirror(Path(tmp) / "mirror.sqlite3", stripe)
+        stage("mirror_sync_cold", lambda: (mirror.sync(full=True), mirror.scan_state()))
+        stage("mirror_sync_warm", lambda: (mirror.sync(full=False), mirror.totals()))
+        revenue_app.stripe_mirror = mirror
+        aggregator = RevenueAggregator(scanner=revenue_app._scan_stripe)
+        aggregator.load(state)
+        stage("aggregate_read", aggregator.snapshot, n=1000)
+        stage("checkout_session", lambda: client.post("/api/checkout-session", json={"tier": "starter"}), n=repeat)
+
+        def deliver_webhook():
+            sub = server.data.collections["subscriptions"][0]
+            payload = json.dumps(make_event("customer.subscription.updated", sub))
+            return client.post("/webhooks/stripe", data=payload,
+                               headers={"Stripe-Signature": sign_webhook(payload, WEBHOOK_SECRET)})
+        try:
+            stage("webhook", deliver_webhook, n=repeat)
+        finally:
+            # Queued deliveries write to the mirror; apply them before its directory goes away.
+            revenue_app.webhook_queue.stop()
+            while revenue_app.webhook_queue.process_batch():
+                pass
+            revenue_app.stripe_mirror = None
+    return rows
+
+
+def over_budget(rows: list[dict[str, Any]]) -> list[str]:
+    """A line for every row whose API calls or wall time exceed its stage budget."""
+    failures = []
+    for row in rows:
+        (fixed, per_thousand), seconds = BUDGETS[row["stage"]]
+        calls = fixed + per_thousand * row["size"] / 1000
+        if row["api_calls"] > calls:
+            failures.append(f"{row['stage']} at {row['size']}: {row['api_calls']:.0f} API calls > {calls:.0f}")
+        if seconds is not None and row["seconds"] > seconds:
+            failures.append(f"{row['stage']} at {row['size']}: {row['seconds'] * 1000:.2f} ms > {seconds * 1000:.2f} ms")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated subscription counts")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of simulated API latency per call")
+    parser.add_argument("--repeat", type=int, default=20, help="iterations for per-request stages")
+    parser.add_argument("--partition-since", type=int, default=SEED_START,
+                        help="lower created bound for partitioned listing (0 disables)")
+    parser.add_argument("--json", action="store_true", help="emit JSON rows instead of a table")
+    parser.add_argument("--check", action="store_true", help="exit 1 if any stage is over its budget")
+    args = parser.parse_args()
+    stripe_listing.PARTITION_SINCE = args.partition_since
+
+    rows = [row for size in args.sizes.split(",") for row in run_size(int(size), args.latency, args.repeat)]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'subs':>8}  {'stage':<18} {'wall ms':>10} {'api calls':>10} {'peak MiB':>9}")
+        for row in rows:
+            print(f"{row['size']:>8}  {row['stage']:<18} {row['seconds'] * 1000:>10.2f} "
+                  f"{row['api_calls']:>10.1f} {row['peak_mib']:>9.2f}")
+    failures = over_budget(rows) if args.check else []
+    for failure in failures:
+        print(f"over budget: {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
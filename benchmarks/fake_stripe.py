@@ -0,0 +1,228 @@
+"""Local Stripe API stand-in for offline benchmarks and tests.
+
+Serves the list endpoints the revenue path reads (subscriptions, customers,
+charges) with Stripe-style ``limit`` / ``starting_after`` / ``created[...]``
+pagination, accepts checkout session creation, and signs webhook payloads
+the same way Stripe does, so the real ``stripe`` client can be pointed at it
+with ``stripe.api_base``. Every request is counted per endpoint.
+
+    python -m benchmarks.fake_stripe --subscriptions 10000 --port 12111
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+PLANS = (  # (price id, unit_amount in cents, interval)
+    ("price_starter", 2900, "month"),
+    ("price_professional", 9900, "month"),
+    ("price_enterprise", 49900, "month"),
+    ("price_professional_yearly", 99000, "year"),
+)
+
+
+class FakeStripeData:
+    """Synthetic account, kept sorted newest-first like Stripe's list order."""
+
+    def __init__(self) -> None:
+        self.collections: dict[str, list[dict[str, Any]]] = {"subscriptions": [], "customers": [], "charges": []}
+        self._index: dict[str, dict[str, int]] = {}
+        self._neg_created: dict[str, list[int]] = {}
+
+    @classmethod
+    def seed(cls, subscriptions: int, customers: int | None = None, charges: int | None = None,
+             seed: int = 7, start: int = 1_600_000_000) -> "FakeStripeData":
+        rng = random.Random(seed)
+        data = cls()
+        customers = subscriptions if customers is None else customers
+        charges = subscriptions if charges is None else charges
+        span = max(subscriptions, customers, charges, 1)
+        for i in range(customers):
+            data.collections["customers"].append({"id": f"cus_{i:08d}", "object": "customer",
+                                                  "created": start + i * 60, "email": f"user{i}@example.com"})
+        for i in range(subscriptions):
+            price_id, amount, interval = rng.choice(PLANS)
+            sub_id = f"sub_{i:08d}"
+            created = start + i * 60
+            data.collections["subscriptions"].append({
+                "id": sub_id, "object": "subscription", "customer": f"cus_{i % max(customers, 1):08d}",
+                "status": "active" if rng.random() > 0.1 else "canceled", "created": created,
+                "items": {"object": "list", "has_more": False, "data": [{
+                    "id": f"si_{i:08d}", "object": "subscription_item", "quantity": rng.choice((1, 1, 1, 2, 5)),
+                    "price": {"id": price_id, "object": "price", "currency": "usd", "unit_amount": amount,
+                              "product": f"prod_{price_id}", "created": start,
+                              "recurring": {"interval": interval, "interval_count": 1}}}]}})
+        for i in range(charges):
+            data.collections["charges"].append({
+                "id": f"ch_{i:08d}", "object": "charge", "customer": f"cus_{i % max(customers, 1):08d}",
+                "amount": rng.choice((2900, 9900, 49900)), "currency": "usd",
+                "status": "succeeded" if rng.random() > 0.05 else "failed",
+                "created": start + (i * span // max(charges, 1)) * 60})
+        data.reindex()
+        return data
+
+    def reindex(self) -> None:
+        for name, rows in self.collections.items():
+            rows.sort(key=lambda o: (-o["created"], o["id"]))
+            self._index[name] = {o["id"]: pos for pos, o in enumerate(rows)}
+            self._neg_created[name] = [-o["created"] for o in rows]
+
+    def page(self, name: str, limit: int = 10, starting_after: str | None = None,
+             created: dict[str, int] | None = None, status: str | None = None) -> dict[str, Any]:
+        rows, neg = self.collections[name], self._neg_created[name]
+        created = created or {}
+        # Newest-first order: created < lt starts at the first row with -created > -lt.
+        lo = bisect.bisect_right(neg, -created["lt"]) if "lt" in created else 0
+        hi = bisect.bisect_right(neg, -created["gte"]) if "gte" in created else len(rows)
+        if starting_after:
+            lo = max(lo, self._index[name][starting_after] + 1)
+        page: list[dict[str, Any]] = []
+        pos = lo
+        while pos < hi and len(page) < limit:
+            obj = rows[pos]
+            if status in (None, "all") or obj.get("status") == status:
+                page.append(obj)
+            pos += 1
+        # Filtered rows may leave a trailing empty page; list consumers stop on it.
+        has_more = pos < hi
+        return {"object": "list", "url": f"/v1/{name}", "has_more": has_more, "data": page}
+
+
+def sign_webhook(payload: bytes | str, secret: str, timestamp: int | None = None) -> str:
+    """Return a ``Stripe-Signature`` header for payload, as Stripe would send it."""
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def make_event(event_type: str, obj: dict[str, Any], created: int | None = None) -> dict[str, Any]:
+    return {"id": f"evt_{uuid.uuid4().hex[:24]}", "object": "event", "type": event_type,
+            "created": int(time.time()) if created is None else created, "data": {"object": obj}}
+
+
+def _parse_params(query: str) -> dict[str, Any]:
+    params: dict[str, Any] = {}
+    for key, values in parse_qs(query).items():
+        if key.startswith("created[") and key.endswith("]"):
+            params.setdefault("created", {})[key[8:-1]] = int(values[0])
+        else:
+            params[key] = values[0]
+    return params
+
+
+class FakeStripeServer:
+    """Threaded HTTP server bound to an ephemeral localhost port."""
+
+    def __init__(self, data: FakeStripeData | None = None, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0) -> None:
+        self.data = data or FakeStripeData()
+        self.latency = latency
+        self.calls: dict[str, int] = {}
+        self._calls_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def total_calls(self) -> int:
+        with self._calls_lock:
+            return sum(self.calls.values())
+
+    def reset_calls(self) -> None:
+        with self._calls_lock:
+            self.calls.clear()
+
+    def _count(self, endpoint: str) -> None:
+        with self._calls_lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *_args):
+                pass
+
+            def _send(self, status: int, body: dict[str, Any]) -> None:
+                raw = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                name = parsed.path.removeprefix("/v1/")
+                server._count(f"GET {parsed.path}")
+                if server.latency:
+                    time.sleep(server.latency)
+                if name not in server.data.collections:
+                    return self._send(404, {"error": {"type": "invalid_request_error",
+                                                      "message": f"Unrecognized request URL ({parsed.path})"}})
+                params = _parse_params(parsed.query)
+                self._send(200, server.data.page(name, limit=min(int(params.get("limit", 10)), 100),
+                                                 starting_after=params.get("starting_after"),
+                                                 created=params.get("created"), status=params.get("status")))
+
+            def do_POST(self):
+                parsed = urlparse(self.path)
+                server._count(f"POST {parsed.path}")
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode())
+                if parsed.path != "/v1/checkout/sessions":
+                    return self._send(404, {"error": {"type": "invalid_request_error", "message": "not found"}})
+                session_id = f"cs_test_{uuid.uuid4().hex[:24]}"
+                self._send(200, {"id": session_id, "object": "checkout.session",
+                                 "mode": form.get("mode", ["payment"])[0],
+                                 "customer_email": form.get("customer_email", [None])[0],
+                                 "url": f"{server.url}/pay/{session_id}"})
+
+        return Handler
+
+    def start(self) -> "FakeStripeServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-stripe", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeStripeServer":
+        return self.start()
+
+    def __exit__(self, *_exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscriptions", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    args = parser.parse_args()
+    server = FakeStripeServer(FakeStripeData.seed(args.subscriptions), port=args.port, latency=args.latency)
+    print(f"Fake Stripe serving {args.subscriptions} subscriptions at {server.url}")
+    server.httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Serialization and compression codecs for cached values.
+
+Values are stored as ``MAGIC + codec tag + compression tag + payload`` so
+readers can decode anything written by a worker configured differently,
+which lets the codec be changed in a rolling deploy. Uncompressed JSON is
+still written untagged, exactly as before, so with the default settings
+values below the compression threshold stay readable by workers that
+predate the header.
+
+msgpack keeps datetimes as datetimes (JSON turns them into strings) and
+lz4 is faster than zlib; both are optional and fall back to json and zlib.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import zlib
+from datetime import date, datetime
+from typing import Any
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+CODEC = os.getenv("CACHE_CODEC", "json")
+COMPRESSION = os.getenv("CACHE_COMPRESSION", "zlib")
+COMPRESS_THRESHOLD = int(os.getenv("CACHE_COMPRESS_THRESHOLD", "4096"))
+MAGIC = b"\xc1"  # never valid as the first byte of JSON text (or msgpack)
+
+_DATETIME_EXT = 1
+_DATE_EXT = 2
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_DATETIME_EXT, obj.isoformat().encode())
+    if isinstance(obj, date):
+        return msgpack.ExtType(_DATE_EXT, obj.isoformat().encode())
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def _msgpack_ext(code: int, data: bytes) -> Any:
+    if code == _DATETIME_EXT:
+        return datetime.fromisoformat(data.decode())
+    if code == _DATE_EXT:
+        return date.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+# tag -> (encode, decode)
+SERIALIZERS = {
+    b"j": (lambda v: json.dumps(v, default=str).encode(), json.loads),
+}
+if msgpack is not None:
+    SERIALIZERS[b"m"] = (lambda v: msgpack.packb(v, default=_msgpack_default, use_bin_type=True),
+                         lambda b: msgpack.unpackb(b, ext_hook=_msgpack_ext, raw=False, strict_map_key=False))
+
+COMPRESSORS = {
+    b"-": (lambda b: b, lambda b: b),
+    b"z": (lambda b: zlib.compress(b, 6), zlib.decompress),
+}
+if lz4_frame is not None:
+    COMPRESSORS[b"4"] = (lz4_frame.compress, lz4_frame.decompress)
+
+CODEC_TAGS = {"json": b"j", "msgpack": b"m"}
+COMPRESSION_TAGS = {"none": b"-", "zlib": b"z", "lz4": b"4"}
+
+
+class Codec:
+    """Encodes values to bytes with a configurable serializer and compressor."""
+
+    def __init__(self, codec: str = CODEC, compression: str = COMPRESSION,
+                 threshold: int = COMPRESS_THRESHOLD) -> None:
+        if CODEC_TAGS.get(codec) not in SERIALIZERS:
+            logger.warning("[Cache] Codec %r unavailable, using json", codec)
+            codec = "json"
+        if COMPRESSION_TAGS.get(compression) not in COMPRESSORS:
+            logger.warning("[Cache] Compression %r unavailable, using zlib", compression)
+            compression = "zlib"
+        self.codec, self.compression, self.threshold = codec, compression, threshold
+        self.tag, self.compression_tag = CODEC_TAGS[codec], COMPRESSION_TAGS[compression]
+
+    @property
+    def name(self) -> str:
+        return f"{self.codec}+{self.compression}"
+
+    def encode(self, value: Any) -> bytes:
+        payload = SERIALIZERS[self.tag][0](value)
+        ctag = b"-"
+        if self.compression_tag != b"-" and len(payload) >= self.threshold:
+            ctag = self.compression_tag
+            payload = COMPRESSORS[ctag][0](payload)
+        if self.tag == b"j" and ctag == b"-":
+            return payload  # legacy untagged JSON
+        return MAGIC + self.tag + ctag + payload
+
+    @staticmethod
+    def decode(raw: bytes | str) -> Any:
+        if isinstance(raw, str):
+            return json.loads(raw)
+        if raw[:1] != MAGIC:
+            return json.loads(raw)
+        tag, ctag = raw[1:2], raw[2:3]
+        return SERIALIZERS[tag][1](COMPRESSORS[ctag][1](raw[3:]))
+
+
+default_codec = Codec()
@@ -2,36 +2,39 @@
 cache_utils.py - Redis caching layer for revenue-agent-system
 
 Provides a simple TTL-based cache backed by Redis with graceful fallback
-to no-op (in-memory dict) when Redis is unavailable.
+to a bounded in-memory LRU store when Redis is unavailable.
 """
+import hashlib
+import inspect
 import json
 import logging
 import os
-from datetime import datetime
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from functools import wraps
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Optional, Sequence
+
+from cache_codecs import Codec, default_codec
+from metrics import backend_call, bulk_call, observe_compute, record as record_metric
+from shared_snapshot import SharedSnapshot
 
 try:
     import redis
-    _redis_client = redis.Redis(
-        host=os.getenv('REDIS_HOST', 'localhost'),
-        port=int(os.getenv('REDIS_PORT', 6379)),
-        password=os.getenv('REDIS_PASSWORD', None),
-        db=int(os.getenv('REDIS_DB', 0)),
-        decode_responses=True,
-        socket_connect_timeout=2,
-        socket_timeout=2,
-    )
-    _redis_client.ping()
-    REDIS_AVAILABLE = True
-    logging.info('[Cache] Redis connected successfully')
-except Exception as e:
-    _redis_client = None
-    REDIS_AVAILABLE = False
-    logging.warning(f'[Cache] Redis unavailable, falling back to in-memory cache: {e}')
-
-# Fallback in-memory cache
-_memory_cache: dict = {}
+    _REDIS_DOWN = (redis.ConnectionError, redis.TimeoutError)
+except ImportError:
+    redis = None
+    _REDIS_DOWN = ()
+
+# Redis connection pool; short timeouts so a brownout costs milliseconds, not seconds
+REDIS_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT', 0.5))
+REDIS_SOCKET_TIMEOUT  = float(os.getenv('REDIS_SOCKET_TIMEOUT', 0.5))
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 32))
+
+# Circuit breaker: open after this many consecutive failures, probe again after the reset interval
+BREAKER_FAILURES = int(os.getenv('REDIS_BREAKER_FAILURES', 3))
+BREAKER_RESET    = float(os.getenv('REDIS_BREAKER_RESET', 10))
 
 # Default TTLs (seconds)
 TTL_STRIPE_REVENUE = int(os.getenv('CACHE_TTL_STRIPE', 120))   # 2 min
@@ -39,83 +42,1038 @@ TTL_WEALTH_INDEX  = int(os.getenv('CACHE_TTL_WEALTH', 300))    # 5 min
 TTL_CONDUCTOR     = int(os.getenv('CACHE_TTL_CONDUCTOR', 60))  # 1 min
 TTL_HEALTH        = int(os.getenv('CACHE_TTL_HEALTH', 30))     # 30 sec
 
+# Hard TTLs for stale-while-revalidate keys: the TTLs above become soft TTLs
+TTL_STRIPE_REVENUE_HARD = int(os.getenv('CACHE_TTL_STRIPE_HARD', 900))     # 15 min
+TTL_CONDUCTOR_HARD      = int(os.getenv('CACHE_TTL_CONDUCTOR_HARD', 600))  # 10 min
 
-def _serialize(value: Any) -> str:
-    return json.dumps(value, default=str)
+# Single-flight recompute lock (seconds)
+LOCK_TTL  = int(os.getenv('CACHE_LOCK_TTL', 30))
+LOCK_WAIT = float(os.getenv('CACHE_LOCK_WAIT', 10))
 
+# In-process L1 in front of Redis: short TTL, bounded size; CACHE_L1_TTL=0 disables it
+L1_TTL         = float(os.getenv('CACHE_L1_TTL', 5))
+L1_MAX_ENTRIES = int(os.getenv('CACHE_L1_MAX_ENTRIES', 1024))
+L1_MAX_BYTES   = int(os.getenv('CACHE_L1_MAX_BYTES', 32 * 2**20))
 
-def _deserialize(value: str) -> Any:
-    return json.loads(value)
+# Fallback store used while Redis is unavailable; sizes are serialized bytes
+MEMORY_MAX_ENTRIES    = int(os.getenv('CACHE_MEMORY_MAX_ENTRIES', 10000))
+MEMORY_MAX_BYTES      = int(os.getenv('CACHE_MEMORY_MAX_BYTES', 128 * 2**20))
+MEMORY_SWEEP_INTERVAL = float(os.getenv('CACHE_MEMORY_SWEEP_INTERVAL', 30))
+# Keys cached with shared=True fall back to an mmap'd file shared by every worker on the host;
+# the elected worker checks it this often and refreshes it when missing or stale
+SHARED_REFRESH_INTERVAL = float(os.getenv('CACHE_SHARED_REFRESH_INTERVAL', 1))
+INVALIDATION_CHANNEL = os.getenv('CACHE_INVALIDATION_CHANNEL', 'garcar:cache:invalidate')
 
+# Invalidation coalescing window (seconds); 0 flushes immediately
+INVALIDATION_WINDOW = float(os.getenv('CACHE_INVALIDATION_WINDOW', 2))
+REFRESH_AFTER_INVALIDATE = os.getenv('CACHE_REFRESH_AFTER_INVALIDATE', '0').lower() in {'1', 'true', 'yes'}
 
-def cache_get(key: str) -> Optional[Any]:
-    """Retrieve a cached value. Returns None on miss or error."""
+# Root of the revenue dependency graph; everything declaring depends_on it is flushed with it
+REVENUE_ROOT = 'stripe_revenue'
+
+_RELEASE_LOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+_stats = {'computed': 0, 'coalesced': 0, 'coalesced_remote': 0, 'lock_timeouts': 0,
+          'stale_served': 0, 'background_refreshes': 0, 'l1_hits': 0, 'l2_hits': 0, 'misses': 0,
+          'remote_invalidations': 0}
+_stats_lock = threading.Lock()
+_flights: dict = {}
+_flights_lock = threading.Lock()
+_memory_locks: dict = {}
+
+
+class MemoryStore:
+    """
+    Thread-safe LRU store with per-entry TTLs and an entry and byte budget.
+
+    Values are held decoded; their size is the length of their serialized
+    form. Least recently used entries are evicted once either budget is
+    exceeded, and expired entries are swept every `sweep_interval` seconds
+    from within writes, so no background thread is needed.
+    """
+
+    def __init__(self, max_entries: int = L1_MAX_ENTRIES, max_bytes: int = L1_MAX_BYTES,
+                 sweep_interval: float = MEMORY_SWEEP_INTERVAL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.bytes = 0
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'rejected': 0}
+        self._data: OrderedDict = OrderedDict()  # key -> (value, expires, size)
+        self._next_sweep = time.monotonic() + sweep_interval
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _drop(self, key: str) -> None:
+        self.bytes -= self._data.pop(key)[2]
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            if entry[1] <= time.monotonic():
+                self._drop(key)
+                self.counters['expirations'] += 1
+                self.counters['misses'] += 1
+                return None
+            self._data.move_to_end(key)
+            self.counters['hits'] += 1
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl: float, size: Optional[int] = None) -> None:
+        size = len(_serialize(value)) if size is None else size
+        now = time.monotonic()
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            if size > self.max_bytes:
+                self.counters['rejected'] += 1
+                return
+            if now >= self._next_sweep:
+                self._sweep(now)
+            self._data[key] = (value, now + ttl, size)
+            self.bytes += size
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                self.bytes -= self._data.popitem(last=False)[1][2]
+                self.counters['evictions'] += 1
+
+    def _sweep(self, now: float) -> None:
+        expired = [k for k, entry in self._data.items() if entry[1] <= now]
+        for k in expired:
+            self._drop(k)
+        self.counters['expirations'] += len(expired)
+        self._next_sweep = now + self.sweep_interval
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._data), 'bytes': self.bytes, 'max_entries': self.max_entries,
+                    'max_bytes': self.max_bytes, **self.counters}
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker around the Redis client.
+
+    Closed, every call goes to Redis. After `failures` consecutive connection
+    errors or timeouts it opens and callers use the memory tier without
+    touching the network. Once `reset` seconds pass, one caller is let
+    through as a probe (half-open); success closes the breaker, failure
+    keeps it open for another interval.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset: float = BREAKER_RESET):
+        self.failures = failures
+        self.reset = reset
+        self.state = 'closed'
+        self.consecutive = 0
+        self.counters = {'opened': 0, 'probes': 0, 'short_circuited': 0}
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            now = time.monotonic()
+            if now >= self._retry_at:
+                # One probe per interval; a probe that never reports back just waits for the next one.
+                self._retry_at = now + self.reset
+                self.state = 'half_open'
+                self.counters['probes'] += 1
+                return True
+            self.counters['short_circuited'] += 1
+            return False
+
+    def record_success(self) -> None:
+        if self.state == 'closed' and not self.consecutive:
+            return
+        with self._lock:
+            if self.state != 'closed':
+                logging.info('[Cache] Redis recovered, closing circuit breaker')
+            self.state = 'closed'
+            self.consecutive = 0
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this one opened the breaker."""
+        with self._lock:
+            self.consecutive += 1
+            if self.state == 'half_open' or (self.state == 'closed' and self.consecutive >= self.failures):
+                opened = self.state == 'closed'
+                self.state = 'open'
+                self._retry_at = time.monotonic() + self.reset
+                if opened:
+                    self.counters['opened'] += 1
+                return opened
+            return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self.consecutive, **self.counters}
+
+
+_l1 = MemoryStore()
+_memory = MemoryStore(MEMORY_MAX_ENTRIES, MEMORY_MAX_BYTES)
+_shared: dict = {}  # key -> SharedSnapshot, for keys cached with shared=True
+_shared_refresh: dict = {}  # key -> (ttl, compute, fresh) run by the elected worker
+_breaker = CircuitBreaker()
+_redis_client = None
+_redis_seen = False
+_redis_lock = threading.Lock()
+_listener: Optional[threading.Thread] = None
+_listener_lock = threading.Lock()
+_invalidation_hooks: dict = {}  # key -> callbacks run when any worker invalidates it
+
+
+def _connect():
+    """Create the pooled client on first use; nothing touches the network at import."""
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                pool = redis.BlockingConnectionPool(
+                    host=os.getenv('REDIS_HOST', 'localhost'),
+                    port=int(os.getenv('REDIS_PORT', 6379)),
+                    password=os.getenv('REDIS_PASSWORD', None),
+                    db=int(os.getenv('REDIS_DB', 0)),
+                    decode_responses=False,
+                    socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+                    socket_timeout=REDIS_SOCKET_TIMEOUT,
+                    max_connections=REDIS_MAX_CONNECTIONS,
+                    timeout=REDIS_SOCKET_TIMEOUT,
+                    health_check_interval=30,
+                )
+                _redis_client = redis.Redis(connection_pool=pool)
+    return _redis_client
+
+
+def _redis():
+    """The Redis client if the breaker lets this call through, else None (use the memory tier)."""
+    if redis is None or not _breaker.allow():
+        return None
+    return _connect()
+
+
+def _redis_ok() -> None:
+    global _redis_seen
+    _redis_seen = True
+    _breaker.record_success()
+    if L1_TTL > 0:
+        _ensure_listener()
+
+
+def _redis_failed(op: str, key: str, e: Exception) -> None:
+    if _breaker.record_failure():
+        # Invalidations published while we were cut off never reached this L1.
+        _l1.clear()
+        logging.warning(f'[Cache] Redis unavailable ({e}); circuit open, using in-memory cache')
+    else:
+        logging.debug(f'[Cache] Redis {op} failed for {key}: {e}')
+
+
+def redis_connection():
+    """The shared Redis client once a cache call has reached it, or None while the breaker is not closed."""
+    if not _redis_seen or _breaker.state != 'closed':
+        return None
+    return _redis_client
+
+
+def _fallback_get(key: str) -> Optional[Any]:
+    store = _shared.get(key)
+    return store.read() if store is not None else _memory.get(key)
+
+
+def _fallback_set(key: str, value: Any, ttl: int, raw: bytes) -> None:
+    store = _shared.get(key)
+    if store is not None:
+        store.write(value, ttl, raw=raw)
+    else:
+        _memory.set(key, value, ttl, size=len(raw))
+
+
+def _fallback_delete(key: str) -> None:
+    _memory.delete(key)
+    store = _shared.get(key)
+    if store is not None:
+        store.expire()  # still servable as the last snapshot while the elected worker refreshes it
+
+
+def _serialize(value: Any) -> bytes:
+    """Encode with the configured codec (CACHE_CODEC / CACHE_COMPRESSION)."""
+    return default_codec.encode(value)
+
+
+def _deserialize(value: bytes) -> Any:
+    """Decode a value written under any codec, tagged or legacy JSON."""
+    return Codec.decode(value)
+
+
+def on_invalidated(key: str, callback: Callable[[], Any]) -> None:
+    """Call callback in this worker whenever key is invalidated, here or (over pub/sub) in any other worker.
+
+    It can run twice for one invalidation (the local delete and its own
+    broadcast), so it should be idempotent.
+    """
+    _invalidation_hooks.setdefault(key, []).append(callback)
+
+
+def _run_invalidation_hooks(keys) -> None:
+    for key in keys:
+        for callback in _invalidation_hooks.get(key, ()):
+            try:
+                callback()
+            except Exception as e:
+                logging.warning(f'[Cache] invalidation hook for {key} failed: {e}')
+
+
+def _on_invalidation(message) -> None:
+    """Evict the newline-separated keys in an invalidation message from L1."""
+    keys = (message.decode() if isinstance(message, bytes) else message).split('\n')
+    for key in keys:
+        _l1.delete(key)
+        _count('remote_invalidations')
+    _run_invalidation_hooks(keys)
+
+
+def _listen_for_invalidations() -> None:
+    """Evict L1 entries deleted by any worker; clear L1 whenever the subscription drops."""
+    delay = 1.0
+    while True:
+        try:
+            pubsub = _connect().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            delay = 1.0
+            while True:
+                message = pubsub.get_message(timeout=30)
+                if message and message.get('type') == 'message':
+                    _on_invalidation(message['data'])
+        except Exception as e:
+            logging.warning(f'[Cache] invalidation subscription lost, retrying in {delay:.0f}s: {e}')
+        _l1.clear()
+        time.sleep(delay)
+        delay = min(delay * 2, 30.0)
+
+
+def _ensure_listener() -> None:
+    global _listener
+    if _listener is not None and _listener.is_alive():
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=_listen_for_invalidations, name='cache-invalidations', daemon=True)
+            _listener.start()
+
+
+def _get(key: str, l1: bool = True) -> Optional[Any]:
     try:
-        if REDIS_AVAILABLE:
-            raw = _redis_client.get(key)
-            if raw is not None:
+        if l1 and L1_TTL > 0:
+            with backend_call(key, 'l1', 'get'):
+                value = _l1.get(key)
+            if value is not None:
+                _count('l1_hits')
+                record_metric(key, 'l1', 'hit')
+                return value
+        client = _redis()
+        if client is not None:
+            try:
+                with backend_call(key, 'redis', 'get'):
+                    raw = client.get(key)
+            except _REDIS_DOWN as e:
+                _redis_failed('get', key, e)
+            else:
+                _redis_ok()
+                if raw is None:
+                    logging.debug(f'[Cache] MISS {key}')
+                    _count('misses')
+                    record_metric(key, 'redis', 'miss')
+                    return None
                 logging.debug(f'[Cache] HIT {key}')
-                return _deserialize(raw)
-        else:
-            entry = _memory_cache.get(key)
-            if entry and entry['expires'] > datetime.utcnow().timestamp():
-                logging.debug(f'[Cache] MEM-HIT {key}')
-                return entry['value']
+                _count('l2_hits')
+                record_metric(key, 'redis', 'hit')
+                value = _deserialize(raw)
+                if L1_TTL > 0:
+                    _l1.set(key, value, L1_TTL, size=len(raw))
+                return value
+        with backend_call(key, 'memory', 'get'):
+            value = _fallback_get(key)
+        if value is not None:
+            logging.debug(f'[Cache] MEM-HIT {key}')
+            record_metric(key, 'memory', 'hit')
+            return value
     except Exception as e:
         logging.warning(f'[Cache] get error for {key}: {e}')
     logging.debug(f'[Cache] MISS {key}')
+    _count('misses')
+    record_metric(key, 'memory', 'miss')
     return None
 
 
+def cache_get(key: str) -> Optional[Any]:
+    """Retrieve a cached value. Returns None on miss or error.
+
+    With Redis, values are also held in a short-lived in-process L1 (CACHE_L1_TTL)
+    so hot keys skip the round-trip and the JSON decode. While the circuit
+    breaker is open, reads go to the in-memory store instead.
+    """
+    return _get(key)
+
+
 def cache_set(key: str, value: Any, ttl: int = 120) -> None:
     """Store a value in cache with TTL in seconds."""
     try:
-        if REDIS_AVAILABLE:
-            _redis_client.setex(key, ttl, _serialize(value))
-        else:
-            _memory_cache[key] = {
-                'value': value,
-                'expires': datetime.utcnow().timestamp() + ttl,
-            }
+        raw = _serialize(value)
+        client = _redis()
+        if client is not None:
+            try:
+                with backend_call(key, 'redis', 'set'):
+                    client.setex(key, ttl, raw)
+            except _REDIS_DOWN as e:
+                _redis_failed('set', key, e)
+            else:
+                _redis_ok()
+                record_metric(key, 'redis', 'set')
+                if L1_TTL > 0:
+                    _l1.set(key, value, min(L1_TTL, ttl), size=len(raw))
+                return
+        with backend_call(key, 'memory', 'set'):
+            _fallback_set(key, value, ttl, raw)
+        record_metric(key, 'memory', 'set')
     except Exception as e:
         logging.warning(f'[Cache] set error for {key}: {e}')
 
 
 def cache_delete(key: str) -> None:
-    """Invalidate a cached key."""
+    """Invalidate a cached key, including every worker's L1 copy."""
     try:
-        if REDIS_AVAILABLE:
-            _redis_client.delete(key)
-        else:
-            _memory_cache.pop(key, None)
+        _l1.delete(key)
+        _fallback_delete(key)  # entries written during an outage must not resurface in the next one
+        _run_invalidation_hooks((key,))
+        client = _redis()
+        if client is not None:
+            try:
+                with backend_call(key, 'redis', 'delete'):
+                    client.delete(key)
+                    client.publish(INVALIDATION_CHANNEL, key)
+            except _REDIS_DOWN as e:
+                _redis_failed('delete', key, e)
+            else:
+                _redis_ok()
+                record_metric(key, 'redis', 'delete')
+                return
+        record_metric(key, 'memory', 'delete')
     except Exception as e:
         logging.warning(f'[Cache] delete error for {key}: {e}')
 
 
-def cached(key: str, ttl: int = 120):
+def cache_get_many(keys: Sequence[str]) -> dict:
+    """Retrieve several values in one round trip (MGET); missing keys are left out."""
+    found: dict = {}
+    pending = []
+    keys = list(dict.fromkeys(keys))
+    if L1_TTL > 0:
+        with bulk_call(keys, 'l1', 'get_many'):
+            cached = [_l1.get(key) for key in keys]
+    else:
+        cached = [None] * len(keys)
+    for key, value in zip(keys, cached):
+        if value is not None:
+            _count('l1_hits')
+            record_metric(key, 'l1', 'hit')
+            found[key] = value
+        else:
+            pending.append(key)
+    if not pending:
+        return found
+    client = _redis()
+    if client is not None:
+        try:
+            with bulk_call(pending, 'redis', 'mget'):
+                raws = client.mget(pending)
+        except _REDIS_DOWN as e:
+            _redis_failed('mget', pending[0], e)
+        else:
+            _redis_ok()
+            for key, raw in zip(pending, raws):
+                if raw is None:
+                    _count('misses')
+                    record_metric(key, 'redis', 'miss')
+                    continue
+                try:
+                    found[key] = value = _deserialize(raw)
+                except Exception as e:
+                    logging.warning(f'[Cache] get error for {key}: {e}')
+                    continue
+                _count('l2_hits')
+                record_metric(key, 'redis', 'hit')
+                if L1_TTL > 0:
+                    _l1.set(key, value, L1_TTL, size=len(raw))
+            return found
+    with bulk_call(pending, 'memory', 'get_many'):
+        values = [_fallback_get(key) for key in pending]
+    for key, value in zip(pending, values):
+        if value is not None:
+            record_metric(key, 'memory', 'hit')
+            found[key] = value
+        else:
+            _count('misses')
+            record_metric(key, 'memory', 'miss')
+    return found
+
+
+def cache_set_many(values: dict, ttl: int = 120) -> None:
+    """Store several values with one pipelined round trip."""
+    if not values:
+        return
+    try:
+        raws = {key: _serialize(value) for key, value in values.items()}
+        client = _redis()
+        if client is not None:
+            try:
+                with bulk_call(raws, 'redis', 'set_many'):
+                    pipe = client.pipeline(transaction=False)
+                    for key, raw in raws.items():
+                        pipe.setex(key, ttl, raw)
+                    pipe.execute()
+            except _REDIS_DOWN as e:
+                _redis_failed('set_many', next(iter(raws)), e)
+            else:
+                _redis_ok()
+                for key, value in values.items():
+                    record_metric(key, 'redis', 'set')
+                    if L1_TTL > 0:
+                        _l1.set(key, value, min(L1_TTL, ttl), size=len(raws[key]))
+                return
+        with bulk_call(values, 'memory', 'set_many'):
+            for key, value in values.items():
+                _fallback_set(key, value, ttl, raws[key])
+        for key in values:
+            record_metric(key, 'memory', 'set')
+    except Exception as e:
+        logging.warning(f'[Cache] set_many error for {len(values)} keys: {e}')
+
+
+def cache_delete_many(keys: Sequence[str]) -> None:
+    """Invalidate several keys, and every worker's L1 copies, in one round trip."""
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return
+    try:
+        for key in keys:
+            _l1.delete(key)
+            _fallback_delete(key)
+        _run_invalidation_hooks(keys)
+        client = _redis()
+        if client is not None:
+            try:
+                with bulk_call(keys, 'redis', 'delete_many'):
+                    pipe = client.pipeline(transaction=False)
+                    pipe.delete(*keys)
+                    pipe.publish(INVALIDATION_CHANNEL, '\n'.join(keys))
+                    pipe.execute()
+            except _REDIS_DOWN as e:
+                _redis_failed('delete_many', keys[0], e)
+            else:
+                _redis_ok()
+                for key in keys:
+                    record_metric(key, 'redis', 'delete')
+                return
+        for key in keys:
+            record_metric(key, 'memory', 'delete')
+    except Exception as e:
+        logging.warning(f'[Cache] delete_many error for {len(keys)} keys: {e}')
+
+
+def _count(stat: str) -> None:
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def cache_stats() -> dict:
+    """Single-flight counters (recomputes run, callers coalesced onto one), hit counts and store sizes."""
+    with _stats_lock:
+        stats = dict(_stats)
+    return {**stats, 'l1': _l1.stats(), 'memory': _memory.stats(), 'redis': _breaker.stats(),
+            'shared': {key: store.status() for key, store in list(_shared.items())}}
+
+
+def _acquire_lock(key: str, token: str) -> tuple:
+    """Take the cross-worker recompute lock for key (Redis, else in-process).
+
+    Returns (acquired, elected): elected is True when the shared-snapshot
+    refresher election decided, so callers need not ask the breaker again.
+    """
+    lock_key = f'lock:{key}'
+    client = _redis()
+    if client is not None:
+        try:
+            acquired = bool(client.set(lock_key, token, nx=True, px=LOCK_TTL * 1000))
+        except _REDIS_DOWN as e:
+            _redis_failed('lock', key, e)
+        except Exception as e:
+            logging.warning(f'[Cache] lock error for {key}: {e}')
+            return True, False
+        else:
+            _redis_ok()
+            return acquired, False
+    if key in _shared:
+        # Without Redis the elected worker does every recompute of a shared key.
+        if _shared[key].try_lead():
+            _ensure_shared_refresher(key)
+            return True, True
+        return False, True
+    now = time.monotonic()
+    with _flights_lock:
+        holder = _memory_locks.get(lock_key)
+        if holder and holder[1] > now:
+            return False, False
+        _memory_locks[lock_key] = (token, now + LOCK_TTL)
+        return True, False
+
+
+def _release_lock(key: str, token: str) -> None:
+    lock_key = f'lock:{key}'
+    with _flights_lock:
+        if _memory_locks.get(lock_key, (None,))[0] == token:
+            del _memory_locks[lock_key]
+            return
+    client = _redis()
+    if client is not None:
+        try:
+            client.eval(_RELEASE_LOCK, 1, lock_key, token)
+        except Exception as e:
+            logging.warning(f'[Cache] unlock error for {key}: {e}')
+
+
+def _present(value: Any) -> bool:
+    return value is not None
+
+
+def _is_envelope(value: Any) -> bool:
+    return isinstance(value, dict) and '__soft_expires__' in value
+
+
+def _fresh_envelope(value: Any) -> bool:
+    return _is_envelope(value) and value['__soft_expires__'] > time.time()
+
+
+def _compute_locked(key: str, ttl: int, compute: Callable[[], Any],
+                    fresh: Callable[[Any], bool] = _present) -> Any:
+    """Recompute key while holding the cross-worker lock.
+
+    Workers that lose the lock poll the cache for the winner's result and
+    only compute themselves if it has not appeared within LOCK_WAIT. Without
+    Redis a shared key's lock is the refresher election, whose winner may
+    not be computing at all, so followers serve the last snapshot (even an
+    expired one) at once, or compute now when there is none.
+    """
+    token = uuid.uuid4().hex
+    acquired, elected = _acquire_lock(key, token)
+    if not acquired:
+        entry = _shared[key].read_entry() if elected else None
+        if entry is not None:
+            _count('stale_served')
+            return entry[0]
+        if not elected:
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                result = _get(key, l1=False)
+                if fresh(result):
+                    _count('coalesced_remote')
+                    return result
+            _count('lock_timeouts')
+            logging.warning(f'[Cache] lock wait timed out for {key}, recomputing')
+    try:
+        result = _get(key, l1=False)
+        if fresh(result):  # another worker finished just before we locked
+            _count('coalesced_remote')
+            return result
+        started = time.perf_counter()
+        result = compute()
+        observe_compute(key, time.perf_counter() - started)
+        _count('computed')
+        cache_set(key, result, ttl)
+        return result
+    finally:
+        _release_lock(key, token)
+
+
+def _single_flight(key: str, ttl: int, compute: Callable[[], Any],
+                   fresh: Callable[[Any], bool] = _present) -> Any:
+    """Run compute once per key across concurrent callers in this process."""
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = {'done': threading.Event(), 'result': None, 'error': None}
+    if not leader:
+        flight['done'].wait()
+        _count('coalesced')
+        if flight['error'] is not None:
+            raise flight['error']
+        return flight['result']
+    try:
+        flight['result'] = _compute_locked(key, ttl, compute, fresh)
+        return flight['result']
+    except Exception as e:
+        flight['error'] = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight['done'].set()
+
+
+def _refresh_in_background(key: str, ttl: int, compute: Callable[[], Any]) -> None:
+    with _flights_lock:
+        if key in _flights:
+            return
+
+    def refresh():
+        try:
+            _single_flight(key, ttl, compute, _fresh_envelope)
+            _count('background_refreshes')
+        except Exception as e:
+            logging.warning(f'[Cache] background refresh failed for {key}: {e}')
+
+    threading.Thread(target=refresh, name=f'cache-refresh-{key}', daemon=True).start()
+
+
+_shared_threads: dict = {}
+
+
+def _ensure_shared_refresher(key: str) -> None:
+    with _flights_lock:
+        if key in _shared_threads:
+            return
+        thread = _shared_threads[key] = threading.Thread(
+            target=_refresh_shared, args=(key,), name=f'cache-shared-{key}', daemon=True)
+    thread.start()
+
+
+def _refresh_shared(key: str) -> None:
+    """Keep a shared key populated while Redis is down so the other workers only ever read it."""
+    ttl, compute, fresh = _shared_refresh[key]
+    while True:
+        time.sleep(SHARED_REFRESH_INTERVAL)
+        if redis_connection() is not None:
+            continue
+        try:
+            if not fresh(_shared[key].read()):
+                _single_flight(key, ttl, compute, fresh)
+                _count('background_refreshes')
+        except Exception as e:
+            logging.warning(f'[Cache] shared refresh failed for {key}: {e}')
+
+
+_namespace_versions: dict = {}
+
+
+def namespace_version(namespace: str) -> int:
+    """Current version of a key namespace (L1-cached when on Redis)."""
+    key = f'ns:{namespace}'
+    version = _l1.get(key) if L1_TTL > 0 else None
+    if version is not None:
+        return version
+    client = _redis()
+    if client is not None:
+        try:
+            version = int(client.get(key) or 0)
+        except _REDIS_DOWN as e:
+            _redis_failed('get', key, e)
+        else:
+            _redis_ok()
+            if L1_TTL > 0:
+                _l1.set(key, version, L1_TTL, size=8)
+            return version
+    return _namespace_versions.get(namespace, 0)
+
+
+def bump_namespace(namespace: str) -> int:
+    """Invalidate every key in a namespace at once by moving it to a new version.
+
+    Old entries are never scanned for; they are unreachable and age out on their TTL.
+    """
+    key = f'ns:{namespace}'
+    with _stats_lock:
+        version = _namespace_versions[namespace] = _namespace_versions.get(namespace, 0) + 1
+    _l1.delete(key)
+    client = _redis()
+    if client is not None:
+        try:
+            version = client.incr(key)
+            client.publish(INVALIDATION_CHANNEL, key)  # drop every worker's L1 copy of the old version
+        except _REDIS_DOWN as e:
+            _redis_failed('incr', key, e)
+        else:
+            _redis_ok()
+    return version
+
+
+def _arg_digest(values: dict) -> str:
+    return hashlib.sha1(json.dumps(values, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _key_builder(key: str, func: Callable, vary: Optional[Sequence[str]],
+                 namespace: Optional[str]) -> Callable[..., str]:
+    if vary is None and namespace is None:
+        return lambda *args, **kwargs: key
+    signature = inspect.signature(func)
+    vary = tuple(vary or ())
+    namespace = namespace or key
+
+    def build(*args, **kwargs) -> str:
+        full = f'{key}:v{namespace_version(namespace)}'
+        if vary:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            full += ':' + _arg_digest({name: bound.arguments[name] for name in vary})
+        return full
+    return build
+
+
+class DependencyGraph:
+    """
+    Which cached results are derived from which.
+
+    Nodes are base cache keys (or plain tags). A fixed key is invalidated by
+    deleting it; a versioned one (vary/namespace) by bumping its namespace.
+    cascade() walks from the invalidated roots to every dependent, returning
+    them in dependency order so eager refreshes see fresh inputs.
+    """
+
+    def __init__(self):
+        self._namespaces: dict = {}   # key -> namespace, for versioned keys
+        self._dependents: dict = {}   # key -> set of keys derived from it
+        self._refreshers: dict = {}   # key -> callables recomputing it
+        self._lock = threading.Lock()
+
+    def register(self, key: str, depends_on: Sequence[str] = (), namespace: Optional[str] = None) -> None:
+        with self._lock:
+            if namespace is not None:
+                self._namespaces[key] = namespace
+            for dependency in depends_on:
+                self._dependents.setdefault(dependency, set()).add(key)
+
+    def on_refresh(self, key: str, refresh: Callable[[], Any]) -> None:
+        """Recompute key eagerly when it is invalidated (if the invalidator refreshes)."""
+        with self._lock:
+            self._refreshers.setdefault(key, []).append(refresh)
+
+    def cascade(self, roots) -> list:
+        """Roots and everything derived from them, each after all of its invalidated dependencies."""
+        with self._lock:
+            order: list = []
+            state: dict = {}
+
+            def visit(key):
+                if state.get(key) == 'done':
+                    return
+                if state.get(key) == 'active':
+                    raise ValueError(f'cache dependency cycle through {key}')
+                state[key] = 'active'
+                for dependent in sorted(self._dependents.get(key, ())):
+                    visit(dependent)
+                state[key] = 'done'
+                order.append(key)
+
+            for root in sorted(roots):
+                visit(root)
+            return order[::-1]
+
+    def targets(self, keys) -> tuple:
+        """Split keys into (fixed keys to delete, namespaces to bump)."""
+        with self._lock:
+            fixed = [k for k in keys if k not in self._namespaces]
+            namespaces = list(dict.fromkeys(self._namespaces[k] for k in keys if k in self._namespaces))
+            return fixed, namespaces
+
+    def refreshers(self, key: str) -> list:
+        with self._lock:
+            return list(self._refreshers.get(key, ()))
+
+
+dependency_graph = DependencyGraph()
+
+
+def cached(key: str, ttl: int = 120, soft_ttl: Optional[int] = None,
+           vary: Optional[Sequence[str]] = None, namespace: Optional[str] = None,
+           depends_on: Sequence[str] = (), shared: bool = False):
     """
     Decorator: cache the return value of a function.
 
+    Concurrent misses are single-flighted: one caller recomputes while the
+    others (in this process and, via a short lock, in other workers) wait
+    for its result.
+
+    With soft_ttl set, ttl becomes the hard TTL: between the two, callers get
+    the stale value immediately while one background refresh repopulates
+    the key; only after the hard TTL does a caller block on a recompute.
+
+    With vary, the named parameters (defaults applied, `self` excluded unless
+    named) are hashed into the key. With vary or namespace, the key also
+    carries the namespace version (namespace defaults to key), so
+    bump_namespace() drops every variant in O(1).
+
+    depends_on names the keys (or tags) this result is derived from;
+    invalidating any of them through an InvalidationCoalescer cascades here.
+    Functions callable without arguments are refreshed eagerly when the
+    invalidator is configured to refresh.
+
+    With shared (fixed keys of argument-less functions only), the fallback
+    tier used while Redis is down is a memory-mapped snapshot shared by every
+    worker on the host rather than this process's memory store: one worker
+    is elected to recompute it and the rest read its result.
+
     Usage:
         @cached('revenue_data', ttl=TTL_STRIPE_REVENUE)
         def fetch_stripe_revenue():
             ...
+
+        @cached('conductor_forecast', ttl=TTL_CONDUCTOR, vary=('months',), depends_on=('stripe_revenue',))
+        def get_revenue_forecast(self, months=12):
+            ...
     """
     def decorator(func: Callable):
+        make_key = _key_builder(key, func, vary, namespace)
+        versioned = vary is not None or namespace is not None
+        dependency_graph.register(key, depends_on, (namespace or key) if versioned else None)
+        if shared:
+            if versioned:
+                raise ValueError(f'shared cache key {key!r} cannot use vary or namespace')
+            _shared[key] = SharedSnapshot(key)
+
+        def register_refresh(wrapper):
+            params = inspect.signature(func).parameters.values()
+            if all(p.default is not p.empty or p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD) for p in params):
+                dependency_graph.on_refresh(key, wrapper)
+            return wrapper
+
+        if soft_ttl is None:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                full_key = make_key(*args, **kwargs)
+                result = cache_get(full_key)
+                if result is not None:
+                    return result
+                return _single_flight(full_key, ttl, lambda: func(*args, **kwargs))
+            if shared:
+                _shared_refresh[key] = (ttl, func, _present)
+            return register_refresh(wrapper)
+
+        def envelope(*args, **kwargs):
+            return {'__soft_expires__': time.time() + soft_ttl, 'value': func(*args, **kwargs)}
+
         @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = cache_get(key)
-            if result is not None:
-                return result
-            result = func(*args, **kwargs)
-            cache_set(key, result, ttl)
-            return result
-        return wrapper
+        def swr_wrapper(*args, **kwargs):
+            def compute():
+                return envelope(*args, **kwargs)
+
+            full_key = make_key(*args, **kwargs)
+            entry = cache_get(full_key)
+            if _is_envelope(entry):
+                if entry['__soft_expires__'] <= time.time():
+                    _count('stale_served')
+                    _refresh_in_background(full_key, ttl, compute)
+                return entry['value']
+            return _single_flight(full_key, ttl, compute, _fresh_envelope)['value']
+        if shared:
+            _shared_refresh[key] = (ttl, envelope, _fresh_envelope)
+        return register_refresh(swr_wrapper)
     return decorator
 
 
-def invalidate_revenue_cache() -> None:
-    """Call this after a successful Stripe webhook to flush stale data."""
-    for k in ('stripe_revenue', 'wealth_index', 'masterwealth', 'conductor_dashboard'):
-        cache_delete(k)
-    logging.info('[Cache] Revenue cache invalidated')
+class InvalidationCoalescer:
+    """
+    Merge invalidations arriving within a window into one flush.
+
+    The window opens on the first invalidation and is not extended by later
+    ones, so a continuous burst still flushes every `window` seconds. A flush
+    cascades through the dependency graph: dependent fixed keys are deleted
+    in one round trip and versioned ones have their namespace bumped. With
+    refresh set, the graph's refreshers then run in dependency order, followed
+    by any on_flush callbacks.
+    """
+
+    def __init__(self, window: float = INVALIDATION_WINDOW, graph: Optional[DependencyGraph] = None,
+                 refresh: bool = REFRESH_AFTER_INVALIDATE):
+        self.window = window
+        self.graph = graph or dependency_graph
+        self.refresh = refresh
+        self.refreshers: list = []
+        self.stats = {'requested': 0, 'flushes': 0, 'keys_deleted': 0, 'namespaces_bumped': 0, 'refreshed': 0}
+        self._pending: set = set()
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def on_flush(self, refresh: Callable[[], Any]) -> None:
+        """Recompute something once at the end of every window."""
+        self.refreshers.append(refresh)
+
+    def invalidate(self, keys, immediate: bool = False) -> None:
+        with self._lock:
+            self.stats['requested'] += 1
+            self._pending.update(keys)
+            if immediate or self.window <= 0:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+            else:
+                return
+        self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            roots, self._pending = self._pending, set()
+            self._timer = None
+        if not roots:
+            return
+        order = self.graph.cascade(roots)
+        fixed, namespaces = self.graph.targets(order)
+        cache_delete_many(fixed)
+        for ns in namespaces:
+            bump_namespace(ns)
+        with self._lock:
+            self.stats['flushes'] += 1
+            self.stats['keys_deleted'] += len(fixed)
+            self.stats['namespaces_bumped'] += len(namespaces)
+        logging.info(f'[Cache] Invalidated {len(fixed)} keys and {len(namespaces)} namespaces from {sorted(roots)}')
+        refreshers = [fn for key in order for fn in self.graph.refreshers(key)] if self.refresh else []
+        for refresh in refreshers + self.refreshers:
+            try:
+                refresh()
+                self.stats['refreshed'] += 1
+            except Exception as e:
+                logging.warning(f'[Cache] refresh after invalidate failed: {e}')
+
+
+revenue_invalidator = InvalidationCoalescer()
+
+
+def invalidate_revenue_cache(immediate: bool = False) -> None:
+    """
+    Call this after a successful Stripe webhook to flush stale data.
+
+    Invalidates stripe_revenue and, through the dependency graph, every result
+    derived from it. Calls within CACHE_INVALIDATION_WINDOW are merged into
+    one flush; pass immediate=True when the caller needs fresh data right away.
+    """
+    revenue_invalidator.invalidate((REVENUE_ROOT,), immediate=immediate)
@@ -1,7 +1,7 @@
 """Production WSGI entrypoint that attaches funnel + autonomous revenue control APIs."""
 from flask import jsonify, request
 
-from app import app as application, conductor, fetch_stripe_revenue
+from app import app as application, conductor, fetch_stripe_revenue, webhook_queue
 from .routes import funnel_bp
 from autonomous_runtime import get_runtime
 
@@ -41,4 +41,8 @@ def agents_health():
 if __import__('os').getenv('AUTONOMOUS_RUNTIME_ENABLED', '1').lower() not in {'0', 'false', 'no'}:
     runtime.start()
 
+# Every worker tails the webhook queue so its in-process revenue aggregate and
+# SSE clients see events delivered to any worker.
+webhook_queue.start()
+
 app = application
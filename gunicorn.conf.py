@@ -0,0 +1,33 @@
+"""Gunicorn settings picked up by every gunicorn invocation run from the repo root.
+
+Command-line flags (Procfile, Dockerfile, start.sh) still take precedence.
+This prepares Prometheus multiprocess mode so /metrics aggregates all
+workers instead of whichever one answered the scrape, and starts each
+worker's webhook queue threads once the app is loaded.
+"""
+import os
+import shutil
+import sys
+
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/garcar_prometheus')
+
+
+def on_starting(server):
+    # Samples from a previous master would otherwise be summed into the new one's.
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # Every worker tails the webhook queue so its revenue aggregate and SSE
+    # clients follow events delivered to any worker, including workers that
+    # never receive a webhook themselves. Threads started before a --preload
+    # fork do not survive it, so this runs in each worker.
+    app_module = sys.modules.get('app')
+    if app_module is not None:
+        app_module.webhook_queue.start()
@@ -3,15 +3,167 @@ Master Conductor - Revenue Orchestration System
 Coordinates all revenue streams, aggregates metrics, and provides unified dashboard
 """
 
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import cached_property
 from typing import Dict, List, Any
+import hashlib
+import json
 import logging
 import os
 import random
-from cache_utils import cached, TTL_CONDUCTOR
+import threading
+from cache_utils import (cached, dependency_graph, revenue_invalidator, REVENUE_ROOT, TTL_CONDUCTOR,
+                         TTL_CONDUCTOR_HARD, TTL_HEALTH)
+from forecast_engine import MAX_HORIZON, simulate
+from payout_engine import ALL, PayoutLedger
+from revenue_history import RevenueHistory
+from revenue_providers import ProviderRegistry, RevenueSource
 
 logger = logging.getLogger(__name__)
 
+# Every cached view below reads the subscriptions source (fetch_stripe_revenue) through revenue_snapshot.
+REVENUE_INPUTS = (REVENUE_ROOT,)
+VIEW_KEYS = ('conductor_master_dashboard', 'conductor_financial_summary', 'conductor_forecast', 'conductor_health')
+DAY = 86400
+
+
+@dataclass(frozen=True)
+class RevenueSnapshot:
+    """
+    Revenue across all streams at one revenue version.
+
+    Immutable; the derived views below are computed on first use and then
+    shared by every conductor view built from the same snapshot.
+    """
+    version: str
+    subscriptions: float
+    api_usage: int
+    affiliates: int
+    content: int
+    services: int
+    subscription_customers: int
+    api_calls: int
+    active_affiliates: int
+    digital_products: int
+    active_projects: int
+    total_customers: int
+
+    @classmethod
+    def build(cls, version: str, subscriptions: float, api_usage: int = 0, affiliates: int = 0,
+              content: int = 0, services: int = 0) -> 'RevenueSnapshot':
+        # Placeholder activity counts, seeded by version so every view and worker agrees on them.
+        rng = random.Random(version)
+        return cls(version, subscriptions, api_usage, affiliates, content, services,
+                   subscription_customers=rng.randint(100, 200),
+                   api_calls=rng.randint(500000, 1000000),
+                   active_affiliates=rng.randint(30, 60),
+                   digital_products=rng.randint(5, 15),
+                   active_projects=rng.randint(10, 25),
+                   total_customers=rng.randint(150, 300))
+
+    @cached_property
+    def total_monthly(self) -> float:
+        return (self.subscriptions / 12) + self.api_usage + self.affiliates + self.content + self.services
+
+    @property
+    def total_yearly(self) -> float:
+        return self.total_monthly * 12
+
+    @cached_property
+    def streams(self) -> Dict[str, float]:
+        return {'subscriptions': self.subscriptions, 'api_usage': self.api_usage,
+                'affiliates': self.affiliates, 'content': self.content, 'services': self.services}
+
+    @cached_property
+    def percentages(self) -> Dict[str, int]:
+        """Percentage contribution of each stream"""
+        return {name: _percentage(amount, self.total_monthly) for name, amount in self.streams.items()}
+
+    @cached_property
+    def health_score(self) -> int:
+        """Overall system health score (0-100)"""
+        revenue_score = min(100, (self.total_monthly / 300000) * 100)
+
+        percentages = list(self.percentages.values())
+        avg = sum(percentages) / len(percentages)
+        variance = sum((x - avg) ** 2 for x in percentages) / len(percentages)
+        diversity_score = max(0, 100 - variance)
+
+        return round((revenue_score * 0.7) + (diversity_score * 0.3))
+
+    @cached_property
+    def top_performers(self) -> List[Dict]:
+        """Top performing revenue streams"""
+        performers = [
+            {'name': 'SaaS Subscriptions', 'revenue': self.subscriptions},
+            {'name': 'Services & Consulting', 'revenue': self.services},
+            {'name': 'API Usage', 'revenue': self.api_usage},
+            {'name': 'Affiliate Network', 'revenue': self.affiliates},
+            {'name': 'Content Sales', 'revenue': self.content}
+        ]
+
+        performers.sort(key=lambda x: x['revenue'], reverse=True)
+        return performers[:3]
+
+    @cached_property
+    def quarterly_forecast(self) -> Dict[str, Any]:
+        """Quarterly forecast"""
+        q1 = round(self.total_monthly * 1.15 * 3)
+        q2 = round(self.total_monthly * 1.25 * 3)
+        q3 = round(self.total_monthly * 1.35 * 3)
+        q4 = round(self.total_monthly * 1.45 * 3)
+
+        return {
+            'nextQuarter': q1,
+            'quarters': {
+                'Q1': q1,
+                'Q2': q2,
+                'Q3': q3,
+                'Q4': q4
+            },
+            'yearTotal': q1 + q2 + q3 + q4
+        }
+
+    @cached_property
+    def alerts(self) -> List[Dict]:
+        """System alerts based on revenue"""
+        alerts = []
+
+        for stream in ('subscriptions', 'affiliates', 'content'):
+            if self.streams[stream] < 30000:
+                alerts.append({
+                    'type': 'warning',
+                    'stream': stream,
+                    'message': f"{stream.title()} revenue below $30k threshold"
+                })
+
+        if self.total_customers < 100:
+            alerts.append({
+                'type': 'warning',
+                'stream': 'customers',
+                'message': 'Customer count below 100, increase acquisition efforts'
+            })
+
+        return alerts if alerts else [{'type': 'info', 'message': 'All systems operating normally'}]
+
+    @cached_property
+    def recommendations(self) -> List[str]:
+        """Recommendations based on revenue"""
+        lowest_stream = min(self.streams, key=self.streams.get)
+        return [
+            f"Focus growth efforts on {lowest_stream.replace('_', ' ')}",
+            "Maintain diversified revenue stream portfolio",
+            "Consider scaling top-performing services"
+        ]
+
+
+def _percentage(value: float, total: float) -> int:
+    """Calculate percentage contribution"""
+    if total == 0:
+        return 0
+    return round((value / total) * 100)
+
 
 class MasterConductor:
     """
@@ -31,98 +183,102 @@ class MasterConductor:
         # Revenue constants (can be overridden by actual data)
         self.mrr_base = int(os.getenv('MRR', 5000))
         self.arr_multiplier = int(os.getenv('ARR_MULTIPLIER', 12))
-        self.growth_rate = float(os.getenv('GROWTH_RATE', 0.235))  # 23.5% monthly growth
-
-    @cached('conductor_master_dashboard', ttl=TTL_CONDUCTOR)
+        self.growth_rate = float(os.getenv('GROWTH_RATE', 0.235))  # 23.5% monthly growth, until history says otherwise
+        self.churn_rate = float(os.getenv('CHURN_RATE', 2.1)) / 100  # monthly, given in percent
+
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+        self.history = RevenueHistory()
+        self.payouts = PayoutLedger()
+
+        # Stand-in sources until real integrations exist; the app registers 'subscriptions' from Stripe.
+        self.providers = ProviderRegistry(on_late=self._on_late_source)
+        for name, env in (('api_usage', 'API_USAGE_REVENUE'), ('affiliates', 'AFFILIATE_REVENUE'),
+                          ('content', 'CONTENT_REVENUE'), ('services', 'SERVICES_REVENUE')):
+            self.providers.register(RevenueSource(name, lambda env=env: int(os.getenv(env, 0))))
+        self.last_readings = {}
+
+    @cached('conductor_master_dashboard', ttl=TTL_CONDUCTOR_HARD, soft_ttl=TTL_CONDUCTOR, depends_on=REVENUE_INPUTS)
     def get_master_dashboard(self) -> Dict[str, Any]:
         """
         Returns comprehensive dashboard with all revenue streams
         """
-        revenue_data = self._calculate_all_revenue()
+        snapshot = self.revenue_snapshot()
+        growth, measured = self.measured_growth()
 
         return {
             'status': 'operational',
             'timestamp': datetime.utcnow().isoformat(),
             'conductor_version': '1.0.0',
             'summary': {
-                'totalMonthlyRevenue': revenue_data['total_monthly'],
-                'totalYearlyProjection': revenue_data['total_yearly'],
-                'growthRate': f"{self.growth_rate * 100:.1f}%",
-                'activeCustomers': revenue_data['total_customers'],
-                'revenueHealth': self._calculate_health_score(revenue_data)
+                'totalMonthlyRevenue': snapshot.total_monthly,
+                'totalYearlyProjection': snapshot.total_yearly,
+                'growthRate': f"{growth * 100:.1f}%",
+                'growthSource': 'measured' if measured else 'configured',
+                'trend': {
+                    'mrrChange24h': self._percent_change(DAY),
+                    'mrrChange7d': self._percent_change(7 * DAY),
+                    'mrrChange30d': self._percent_change(30 * DAY)
+                },
+                'activeCustomers': snapshot.total_customers,
+                'revenueHealth': snapshot.health_score
             },
             'revenueStreams': {
                 'subscriptions': {
                     'label': 'SaaS Subscriptions',
-                    'monthly': revenue_data['subscriptions'],
-                    'percentage': self._calculate_percentage(
-                        revenue_data['subscriptions'],
-                        revenue_data['total_monthly']
-                    ),
+                    'monthly': snapshot.subscriptions,
+                    'percentage': snapshot.percentages['subscriptions'],
                     'status': 'active',
-                    'customers': revenue_data['subscription_customers']
+                    'customers': snapshot.subscription_customers
                 },
                 'apiUsage': {
                     'label': 'API Usage & Overage',
-                    'monthly': revenue_data['api_usage'],
-                    'percentage': self._calculate_percentage(
-                        revenue_data['api_usage'],
-                        revenue_data['total_monthly']
-                    ),
+                    'monthly': snapshot.api_usage,
+                    'percentage': snapshot.percentages['api_usage'],
                     'status': 'active',
-                    'calls': revenue_data['api_calls']
+                    'calls': snapshot.api_calls
                 },
                 'affiliates': {
                     'label': 'Affiliate Commissions',
-                    'monthly': revenue_data['affiliates'],
-                    'percentage': self._calculate_percentage(
-                        revenue_data['affiliates'],
-                        revenue_data['total_monthly']
-                    ),
+                    'monthly': snapshot.affiliates,
+                    'percentage': snapshot.percentages['affiliates'],
                     'status': 'active',
-                    'activeAffiliates': revenue_data['active_affiliates']
+                    'activeAffiliates': snapshot.active_affiliates
                 },
                 'content': {
                     'label': 'Content Monetization',
-                    'monthly': revenue_data['content'],
-                    'percentage': self._calculate_percentage(
-                        revenue_data['content'],
-                        revenue_data['total_monthly']
-                    ),
+                    'monthly': snapshot.content,
+                    'percentage': snapshot.percentages['content'],
                     'status': 'active',
-                    'products': revenue_data['digital_products']
+                    'products': snapshot.digital_products
                 },
                 'services': {
                     'label': 'Services & Consulting',
-                    'monthly': revenue_data['services'],
-                    'percentage': self._calculate_percentage(
-                        revenue_data['services'],
-                        revenue_data['total_monthly']
-                    ),
+                    'monthly': snapshot.services,
+                    'percentage': snapshot.percentages['services'],
                     'status': 'active',
-                    'activeProjects': revenue_data['active_projects']
+                    'activeProjects': snapshot.active_projects
                 }
             },
-            'topPerformers': self._get_top_performers(revenue_data),
+            'topPerformers': snapshot.top_performers,
             'metrics': {
                 'customerAcquisitionCost': int(os.getenv('CAC', 45)),
                 'averageLifetimeValue': int(os.getenv('LTV', 8500)),
                 'churnRate': float(os.getenv('CHURN_RATE', 2.1)),
                 'netPromoterScore': int(os.getenv('NPS', 72)),
-                'revenuePerCustomer': round(
-                    revenue_data['total_monthly'] / max(revenue_data['total_customers'], 1)
-                )
+                'revenuePerCustomer': round(snapshot.total_monthly / max(snapshot.total_customers, 1))
             },
-            'forecast': self._generate_forecast(revenue_data['total_monthly'])
+            'forecast': snapshot.quarterly_forecast,
+            'sources': {name: reading.to_dict() for name, reading in self.last_readings.items()}
         }
 
-    @cached('conductor_financial_summary', ttl=TTL_CONDUCTOR)
+    @cached('conductor_financial_summary', ttl=TTL_CONDUCTOR_HARD, soft_ttl=TTL_CONDUCTOR, depends_on=REVENUE_INPUTS)
     def get_financial_summary(self) -> Dict[str, Any]:
         """
         Returns financial summary with revenue, expenses, and profit
         """
-        revenue_data = self._calculate_all_revenue()
-        gross_revenue = revenue_data['total_monthly']
+        snapshot = self.revenue_snapshot()
+        gross_revenue = snapshot.total_monthly
 
         # Calculate expenses (approximations)
         expenses = {
@@ -130,7 +286,7 @@ class MasterConductor:
             'paymentProcessing': round(gross_revenue * 0.029),  # Stripe fees
             'contentCreation': round(gross_revenue * 0.12),  # 12% of revenue
             'marketing': round(gross_revenue * 0.08),  # 8% of revenue
-            'affiliatePayouts': revenue_data['affiliates']  # Pass-through cost
+            'affiliatePayouts': snapshot.affiliates  # Pass-through cost
         }
 
         total_expenses = sum(expenses.values())
@@ -156,9 +312,16 @@ class MasterConductor:
 
     def get_revenue_forecast(self, months: int = 12) -> Dict[str, Any]:
         """
-        Generate revenue forecast for specified number of months
+        Monte Carlo revenue forecast (median with p10/p90 band) for up to MAX_HORIZON months
         """
-        current_revenue = self._calculate_all_revenue()['total_monthly']
+        # Clamped before the cached call so out-of-range requests share one cache entry;
+        # growth is part of the key so a history rollup that moves it re-simulates
+        return self._revenue_forecast(max(1, min(months, MAX_HORIZON)), self.measured_growth()[0])
+
+    @cached('conductor_forecast', ttl=TTL_CONDUCTOR_HARD, soft_ttl=TTL_CONDUCTOR, vary=('months', 'growth'),
+            depends_on=REVENUE_INPUTS)
+    def _revenue_forecast(self, months: int, growth: float) -> Dict[str, Any]:
+        simulation = simulate(self.revenue_snapshot().total_monthly, growth, self.churn_rate, months)
         forecast = []
 
         month_names = [
@@ -168,23 +331,17 @@ class MasterConductor:
 
         current_month = datetime.utcnow().month - 1  # 0-indexed
 
-        for i in range(months):
-            growth_factor = 1 + (self.growth_rate * (1 + random.uniform(-0.1, 0.1)))
-            projected_revenue = round(current_revenue * (growth_factor ** (i + 1)))
-
-            if i == 0:
-                trend = f"+{self.growth_rate * 100:.0f}%"
-            else:
-                prev_revenue = round(current_revenue * (growth_factor ** i))
-                trend_pct = ((projected_revenue - prev_revenue) / prev_revenue) * 100
-                trend = f"+{trend_pct:.0f}%"
-
-            month_idx = (current_month + i) % 12
+        previous = simulation.start
+        for i, (low, median, high) in enumerate(zip(simulation.p10, simulation.p50, simulation.p90)):
+            trend_pct = ((median - previous) / previous) * 100 if previous else 0
+            previous = median
 
             forecast.append({
-                'month': month_names[month_idx],
-                'revenue': projected_revenue,
-                'trend': trend
+                'month': month_names[(current_month + i) % 12],
+                'revenue': round(median),
+                'low': round(low),
+                'high': round(high),
+                'trend': f"{trend_pct:+.0f}%"
             })
 
         total_projected = sum(item['revenue'] for item in forecast)
@@ -193,16 +350,20 @@ class MasterConductor:
             'forecast12Months': forecast,
             'totalProjected': total_projected,
             'averageMonthly': round(total_projected / months),
-            'growthRate': f"{self.growth_rate * 100:.1f}%",
+            'growthRate': f"{growth * 100:.1f}%",
+            'churnRate': f"{self.churn_rate * 100:.1f}%",
+            'confidenceBand': {'low': 'p10', 'revenue': 'p50', 'high': 'p90'},
+            'simulation': {'paths': simulation.paths, 'seed': simulation.seed},
             'timestamp': datetime.utcnow().isoformat()
         }
 
+    @cached('conductor_health', ttl=TTL_HEALTH, depends_on=REVENUE_INPUTS)
     def get_system_health(self) -> Dict[str, Any]:
         """
         Returns overall system health and status
         """
-        revenue_data = self._calculate_all_revenue()
-        health_score = self._calculate_health_score(revenue_data)
+        snapshot = self.revenue_snapshot()
+        health_score = snapshot.health_score
 
         if health_score >= 90:
             status = 'excellent'
@@ -225,215 +386,106 @@ class MasterConductor:
                 'dashboard': {'status': 'operational', 'uptime': 100.0}
             },
             'revenue': {
-                'monthly': revenue_data['total_monthly'],
-                'yearly': revenue_data['total_yearly'],
-                'growth': f"{self.growth_rate * 100:.1f}%"
+                'monthly': snapshot.total_monthly,
+                'yearly': snapshot.total_yearly,
+                'growth': f"{self.measured_growth()[0] * 100:.1f}%"
             },
-            'alerts': self._generate_alerts(revenue_data),
-            'recommendations': self._generate_recommendations(revenue_data)
+            'alerts': snapshot.alerts,
+            'recommendations': snapshot.recommendations
         }
 
-    def orchestrate_payout_cycle(self, tier: str = None) -> Dict[str, Any]:
+    def orchestrate_payout_cycle(self, tier: str = None, idempotency_key: str = None) -> Dict[str, Any]:
         """
-        Orchestrate automatic payout cycle across all revenue streams
+        Orchestrate a payout cycle across all revenue streams from the payout ledger
         """
-        timestamp = datetime.utcnow()
-
-        affiliate_payouts = self._calculate_affiliate_payouts(tier)
-        content_payouts = self._calculate_content_payouts()
-        service_payouts = self._calculate_service_payouts()
-
-        total_payouts = (
-            affiliate_payouts['total'] +
-            content_payouts['total'] +
-            service_payouts['total']
-        )
+        batch = self.payouts.run_cycle(tier, idempotency_key)
+        timestamp = datetime.utcfromtimestamp(batch.created_at)
+        by_kind = batch.by_kind()
+
+        def summary(kind: str) -> Dict[str, Any]:
+            entry = by_kind[kind]
+            return {
+                'count': entry['payees'],
+                'total': entry['cents'] / 100,
+                'average': round(entry['cents'] / entry['payees'] / 100, 2) if entry['payees'] else 0,
+                'records': entry['records']
+            }
 
         return {
-            'orchestrationId': f"ORCH_{int(timestamp.timestamp())}",
+            'orchestrationId': batch.batch_id,
             'timestamp': timestamp.isoformat(),
-            'status': 'completed',
+            'status': 'replayed' if batch.replayed else 'completed',
             'payoutSummary': {
-                'affiliates': affiliate_payouts,
-                'contentCreators': content_payouts,
-                'serviceProviders': service_payouts
+                'affiliates': {**summary('commission'), 'tier': 'all' if batch.scope == ALL else batch.scope},
+                'contentCreators': summary('content'),
+                'serviceProviders': summary('service')
             },
-            'totalPayouts': total_payouts,
-            'processedCount': (
-                affiliate_payouts['count'] +
-                content_payouts['count'] +
-                service_payouts['count']
-            ),
+            'totalPayouts': batch.total_cents / 100,
+            'processedCount': len(batch.lines),
+            'recordsProcessed': batch.records,
+            'carriedForward': batch.carried_cents / 100,
+            'payouts': [{'payee': line.payee, 'kind': line.kind, 'tier': line.tier, 'amount': line.cents / 100,
+                         'idempotencyKey': line.idempotency_key} for line in batch.lines],
             'estimatedArrival': (timestamp + timedelta(days=2)).isoformat()
         }
 
-    # Private helper methods
-
-    def _calculate_all_revenue(self) -> Dict[str, Any]:
-        """Calculate revenue from all streams"""
-        from app import fetch_stripe_revenue
+    def revenue_snapshot(self) -> RevenueSnapshot:
+        """The revenue snapshot for the current revenue inputs, rebuilt only when they change"""
+        inputs = self._revenue_inputs()
+        version = hashlib.sha1(json.dumps(inputs, sort_keys=True).encode()).hexdigest()[:16]
+        with self._snapshot_lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = RevenueSnapshot.build(version, **inputs)
+            return self._snapshot
+
+    def revenue_version(self) -> int:
+        """Changes whenever a revenue source reports a new value; starts due fetches but never waits on them"""
+        self.providers.refresh()
+        return self.providers.version
+
+    def measured_growth(self) -> tuple:
+        """Monthly growth measured from revenue history, else the configured rate; and whether it was measured"""
         try:
-            stripe_data = fetch_stripe_revenue()
-            subscriptions = stripe_data.get('mrr', self.mrr_base) * 12
-            api_usage = int(os.getenv('API_USAGE_REVENUE', 0))
-            affiliates = int(os.getenv('AFFILIATE_REVENUE', 0))
-            content = int(os.getenv('CONTENT_REVENUE', 0))
-            services = int(os.getenv('SERVICES_REVENUE', 0))
-            active_customers = stripe_data.get('customers', 0)
+            measured = self.history.monthly_growth()
         except Exception as e:
-            logger.warning(f'[Conductor] Could not fetch Stripe data, using defaults: {e}')
-            subscriptions = self.mrr_base
-            api_usage = affiliates = content = services = active_customers = 0
+            logger.warning(f'[Conductor] Could not read revenue history: {e}')
+            measured = None
+        if measured is None:
+            return self.growth_rate, False
+        return round(measured, 4), True  # rounded so forecasts stay cached while growth barely moves
 
-        total_monthly = (subscriptions / 12) + api_usage + affiliates + content + services
-
-        return {
-            'subscriptions': subscriptions,
-            'api_usage': api_usage,
-            'affiliates': affiliates,
-            'content': content,
-            'services': services,
-            'total_monthly': total_monthly,
-            'total_yearly': total_monthly * 12,
-            'subscription_customers': random.randint(100, 200),
-            'api_calls': random.randint(500000, 1000000),
-            'active_affiliates': random.randint(30, 60),
-            'digital_products': random.randint(5, 15),
-            'active_projects': random.randint(10, 25),
-            'total_customers': random.randint(150, 300)
-        }
-
-    def _calculate_percentage(self, value: float, total: float) -> int:
-        """Calculate percentage contribution"""
-        if total == 0:
-            return 0
-        return round((value / total) * 100)
-
-    def _calculate_health_score(self, revenue_data: Dict) -> int:
-        """Calculate overall system health score (0-100)"""
-        revenue_score = min(100, (revenue_data['total_monthly'] / 300000) * 100)
-
-        percentages = [
-            self._calculate_percentage(revenue_data['subscriptions'], revenue_data['total_monthly']),
-            self._calculate_percentage(revenue_data['api_usage'], revenue_data['total_monthly']),
-            self._calculate_percentage(revenue_data['affiliates'], revenue_data['total_monthly']),
-            self._calculate_percentage(revenue_data['content'], revenue_data['total_monthly']),
-            self._calculate_percentage(revenue_data['services'], revenue_data['total_monthly'])
-        ]
-
-        avg = sum(percentages) / len(percentages)
-        variance = sum((x - avg) ** 2 for x in percentages) / len(percentages)
-        diversity_score = max(0, 100 - variance)
-
-        return round((revenue_score * 0.7) + (diversity_score * 0.3))
-
-    def _get_top_performers(self, revenue_data: Dict) -> List[Dict]:
-        """Get top performing revenue streams"""
-        performers = [
-            {'name': 'SaaS Subscriptions', 'revenue': revenue_data['subscriptions']},
-            {'name': 'Services & Consulting', 'revenue': revenue_data['services']},
-            {'name': 'API Usage', 'revenue': revenue_data['api_usage']},
-            {'name': 'Affiliate Network', 'revenue': revenue_data['affiliates']},
-            {'name': 'Content Sales', 'revenue': revenue_data['content']}
-        ]
-
-        performers.sort(key=lambda x: x['revenue'], reverse=True)
-        return performers[:3]
-
-    def _generate_forecast(self, current_revenue: float) -> Dict[str, Any]:
-        """Generate quarterly forecast"""
-        q1 = round(current_revenue * 1.15 * 3)
-        q2 = round(current_revenue * 1.25 * 3)
-        q3 = round(current_revenue * 1.35 * 3)
-        q4 = round(current_revenue * 1.45 * 3)
-
-        return {
-            'nextQuarter': q1,
-            'quarters': {
-                'Q1': q1,
-                'Q2': q2,
-                'Q3': q3,
-                'Q4': q4
-            },
-            'yearTotal': q1 + q2 + q3 + q4
-        }
-
-    def _generate_alerts(self, revenue_data: Dict) -> List[Dict]:
-        """Generate system alerts based on revenue data"""
-        alerts = []
-
-        for stream, amount in [
-            ('subscriptions', revenue_data['subscriptions']),
-            ('affiliates', revenue_data['affiliates']),
-            ('content', revenue_data['content'])
-        ]:
-            if amount < 30000:
-                alerts.append({
-                    'type': 'warning',
-                    'stream': stream,
-                    'message': f"{stream.title()} revenue below $30k threshold"
-                })
-
-        if revenue_data['total_customers'] < 100:
-            alerts.append({
-                'type': 'warning',
-                'stream': 'customers',
-                'message': 'Customer count below 100, increase acquisition efforts'
-            })
-
-        return alerts if alerts else [{'type': 'info', 'message': 'All systems operating normally'}]
-
-    def _generate_recommendations(self, revenue_data: Dict) -> List[str]:
-        """Generate recommendations based on revenue data"""
-        streams = {
-            'subscriptions': revenue_data['subscriptions'],
-            'api_usage': revenue_data['api_usage'],
-            'affiliates': revenue_data['affiliates'],
-            'content': revenue_data['content'],
-            'services': revenue_data['services']
-        }
-
-        lowest_stream = min(streams, key=streams.get)
-        return [
-            f"Focus growth efforts on {lowest_stream.replace('_', ' ')}",
-            "Maintain diversified revenue stream portfolio",
-            "Consider scaling top-performing services"
-        ]
+    # Private helper methods
 
-    def _calculate_affiliate_payouts(self, tier: str = None) -> Dict[str, Any]:
-        """Calculate affiliate payouts"""
-        count = random.randint(10, 30)
-        avg_payout = random.randint(200, 800)
-        total = count * avg_payout
+    def _percent_change(self, window: float):
+        """MRR change over the trailing window in percent, or None without history"""
+        try:
+            change = self.history.change(window)
+        except Exception as e:
+            logger.warning(f'[Conductor] Could not read revenue history: {e}')
+            return None
+        return None if change is None else round(change * 100, 1)
 
-        return {
-            'count': count,
-            'total': total,
-            'average': avg_payout,
-            'tier': tier or 'all'
-        }
+    def _revenue_inputs(self) -> Dict[str, Any]:
+        """Monthly revenue per stream from every registered source, fetched concurrently"""
+        readings = self.providers.collect()
+        self.last_readings = readings
 
-    def _calculate_content_payouts(self) -> Dict[str, Any]:
-        """Calculate content creator payouts"""
-        count = random.randint(3, 8)
-        total = random.randint(5000, 15000)
+        def monthly(name: str, default: float = 0) -> float:
+            reading = readings.get(name)
+            return reading.value if reading is not None and reading.value is not None else default
 
         return {
-            'count': count,
-            'total': total,
-            'average': round(total / count) if count > 0 else 0
+            'subscriptions': monthly('subscriptions', self.mrr_base) * 12,
+            'api_usage': monthly('api_usage'),
+            'affiliates': monthly('affiliates'),
+            'content': monthly('content'),
+            'services': monthly('services'),
         }
 
-    def _calculate_service_payouts(self) -> Dict[str, Any]:
-        """Calculate service provider payouts"""
-        count = random.randint(5, 12)
-        total = random.randint(10000, 25000)
-
-        return {
-            'count': count,
-            'total': total,
-            'average': round(total / count) if count > 0 else 0
-        }
+    def _on_late_source(self, name: str) -> None:
+        """A source that missed its deadline has reported; drop the views built without it"""
+        logger.info(f'[Conductor] Late result from {name}, refreshing conductor views')
+        revenue_invalidator.invalidate(VIEW_KEYS)
 
 
 # Singleton instance
@@ -444,4 +496,10 @@ def get_conductor() -> MasterConductor:
     global _conductor_instance
     if _conductor_instance is None:
         _conductor_instance = MasterConductor()
+        # Methods need the instance, so their eager refreshes are registered here.
+        for key, refresh in (('conductor_master_dashboard', _conductor_instance.get_master_dashboard),
+                             ('conductor_financial_summary', _conductor_instance.get_financial_summary),
+                             ('conductor_forecast', _conductor_instance.get_revenue_forecast),
+                             ('conductor_health', _conductor_instance.get_system_health)):
+            dependency_graph.on_refresh(key, refresh)
     return _conductor_instance
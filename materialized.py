@@ -0,0 +1,163 @@
+"""Pre-rendered JSON responses with strong ETags.
+
+Polled endpoints whose payload only changes with the revenue snapshot are
+rendered ahead of time: a background thread watches a version function and
+re-renders every view to JSON bytes, plus a gzipped copy, when the version
+changes or a render is older than ``max_age``. Requests are then answered from
+those bytes, or with ``304 Not Modified`` when ``If-None-Match`` carries the
+current ETag, without touching the cache or serializing anything.
+
+The materializer is these views' cache: a view should compute from current
+state rather than read a cache of its own, or a render for a new version
+can carry the previous version's payload until ``max_age``.
+
+The ETag is a hash of the payload without its ``VOLATILE_KEYS`` (render
+timestamps, source ages), so every worker, and every periodic re-render,
+gives the same revenue figures the same ETag and polling clients behind a
+load balancer keep getting 304s.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from flask import Request, Response
+
+logger = logging.getLogger(__name__)
+POLL_SECONDS = float(os.getenv("MATERIALIZE_POLL", "1"))
+MAX_AGE_SECONDS = float(os.getenv("MATERIALIZE_MAX_AGE", "60"))
+# Keys that change on every render (render time, source ages); left out of the ETag.
+VOLATILE_KEYS = frozenset({"timestamp", "age"})
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=str, separators=(",", ":"))
+
+
+def _stable(value: Any, volatile: frozenset[str]) -> Any:
+    if isinstance(value, dict):
+        return {k: _stable(v, volatile) for k, v in value.items() if k not in volatile}
+    if isinstance(value, (list, tuple)):
+        return [_stable(v, volatile) for v in value]
+    return value
+
+
+@dataclass(frozen=True)
+class Rendered:
+    body: bytes
+    gzipped: bytes
+    etag: str
+    version: str
+    rendered_at: float
+
+    @classmethod
+    def of(cls, payload: Any, version: str, dumps: Callable[[Any], str] = _dumps,
+           volatile: frozenset[str] = VOLATILE_KEYS) -> "Rendered":
+        """Render ``payload``; the ETag hashes it without ``volatile`` keys, so every worker agrees on it."""
+        body = dumps(payload).encode()
+        stable = json.dumps(_stable(payload, volatile), default=str, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha256(stable.encode()).hexdigest()[:32]
+        return cls(body, gzip.compress(body, 6, mtime=0), digest, version, time.time())
+
+
+class Materializer:
+    """Keeps named views rendered to bytes, re-rendering when ``version()`` changes."""
+
+    def __init__(self, views: dict[str, Callable[[], Any]], version: Callable[[], Any],
+                 max_age: float = MAX_AGE_SECONDS, poll: float = POLL_SECONDS,
+                 dumps: Callable[[Any], str] = _dumps, volatile: frozenset[str] = VOLATILE_KEYS) -> None:
+        self.views = views
+        self.volatile = volatile
+        self.version = version
+        self.max_age = max_age
+        self.poll = poll
+        self.dumps = dumps
+        self._rendered: dict[str, Rendered] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.stats = {"renders": 0, "render_errors": 0, "served": 0, "gzip": 0, "not_modified": 0}
+
+    def _version(self) -> str:
+        return hashlib.sha256(_dumps(self.version()).encode()).hexdigest()[:16]
+
+    def render(self, name: str, version: str | None = None) -> Rendered:
+        version = version if version is not None else self._version()
+        rendered = Rendered.of(self.views[name](), version, self.dumps, self.volatile)
+        with self._lock:
+            self._rendered[name] = rendered
+            self.stats["renders"] += 1
+        return rendered
+
+    def _stale(self, rendered: Rendered | None, version: str) -> bool:
+        return rendered is None or rendered.version != version or time.time() - rendered.rendered_at >= self.max_age
+
+    def refresh(self) -> None:
+        """Re-render every view whose render is out of date."""
+        version = self._version()
+        for name in self.views:
+            if self._stale(self._rendered.get(name), version):
+                try:
+                    self.render(name, version)
+                except Exception as exc:
+                    with self._lock:
+                        self.stats["render_errors"] += 1
+                    logger.warning("[Materialize] rendering %s failed: %s", name, exc)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as exc:
+                logger.warning("[Materialize] version check failed: %s", exc)
+            self._wake.wait(self.poll)
+            self._wake.clear()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="materializer", daemon=True)
+                self._thread.start()
+
+    def wake(self) -> None:
+        """Check the version now instead of at the next poll."""
+        self._wake.set()
+
+    def get(self, name: str) -> Rendered:
+        rendered = self._rendered.get(name)
+        if rendered is None:
+            rendered = self.render(name)
+        self._ensure_thread()
+        return rendered
+
+    def respond(self, name: str, request: Request) -> Response:
+        """The view's bytes, gzipped when accepted, or a 304 when the client's copy is current."""
+        rendered = self.get(name)
+        use_gzip = request.accept_encodings["gzip"] > 0
+        etag = f"{rendered.etag}-gz" if use_gzip else rendered.etag
+        headers = {"ETag": f'"{etag}"', "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if request.if_none_match.contains(etag):
+            with self._lock:
+                self.stats["not_modified"] += 1
+            return Response(status=304, headers=headers)
+        with self._lock:
+            self.stats["served"] += 1
+            self.stats["gzip"] += use_gzip
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+        return Response(rendered.gzipped if use_gzip else rendered.body, mimetype="application/json", headers=headers)
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            views = {name: {"etag": r.etag, "bytes": len(r.body), "gzip_bytes": len(r.gzipped),
+                            "age": round(time.time() - r.rendered_at, 3)} for name, r in self._rendered.items()}
+            return {**self.stats, "views": views}
@@ -0,0 +1,113 @@
+"""Prometheus instrumentation for the cache layer and HTTP endpoints.
+
+Metrics are labeled by key namespace (the part of a cache key before the
+first ``:``) and tier (``l1``, ``redis`` or ``memory``). Under gunicorn,
+set PROMETHEUS_MULTIPROC_DIR (``gunicorn.conf.py`` does this) so each worker
+writes its samples to a shared directory and ``/metrics`` aggregates them;
+otherwise the process-local registry is exported.
+
+prometheus_client is optional; without it every recorder is a no-op.
+"""
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+try:
+    import prometheus_client
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+ENABLED = prometheus_client is not None and os.getenv("METRICS_ENABLED", "1").lower() not in {"0", "false", "no"}
+
+# Backend calls are sub-millisecond when healthy; recomputes hit Stripe and take seconds.
+BACKEND_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COMPUTE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+if ENABLED:
+    CACHE_EVENTS = Counter("cache_events_total", "Cache hits, misses, sets, deletes and errors",
+                           ["namespace", "tier", "event"])
+    CACHE_BACKEND_SECONDS = Histogram("cache_backend_seconds", "Latency of cache backend calls",
+                                      ["namespace", "tier", "op"], buckets=BACKEND_BUCKETS)
+    CACHE_COMPUTE_SECONDS = Histogram("cache_compute_seconds", "Time spent recomputing a missed cache value",
+                                      ["namespace"], buckets=COMPUTE_BUCKETS)
+    HTTP_REQUEST_SECONDS = Histogram("http_request_seconds", "HTTP request latency",
+                                     ["endpoint", "method", "status"], buckets=COMPUTE_BUCKETS)
+
+
+def namespace(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+def record(key: str, tier: str, event: str) -> None:
+    """Count a cache event: hit, miss, set, delete or error."""
+    if ENABLED:
+        CACHE_EVENTS.labels(namespace(key), tier, event).inc()
+
+
+@contextmanager
+def backend_call(key: str, tier: str, op: str) -> Iterator[None]:
+    """Time a backend call; exceptions are counted as errors and re-raised."""
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        CACHE_EVENTS.labels(namespace(key), tier, "error").inc()
+        raise
+    finally:
+        CACHE_BACKEND_SECONDS.labels(namespace(key), tier, op).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def bulk_call(keys: Iterable[str], tier: str, op: str) -> Iterator[None]:
+    """Time one backend call covering several keys, observed once under each of their namespaces."""
+    if not ENABLED:
+        yield
+        return
+    namespaces = {namespace(key) for key in keys}
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        for ns in namespaces:
+            CACHE_EVENTS.labels(ns, tier, "error").inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        for ns in namespaces:
+            CACHE_BACKEND_SECONDS.labels(ns, tier, op).observe(elapsed)
+
+
+def observe_compute(key: str, seconds: float) -> None:
+    if ENABLED:
+        CACHE_COMPUTE_SECONDS.labels(namespace(key)).observe(seconds)
+
+
+def observe_request(endpoint: str, method: str, status: int, seconds: float) -> None:
+    if ENABLED:
+        HTTP_REQUEST_SECONDS.labels(endpoint, method, str(status)).observe(seconds)
+
+
+def exposition() -> bytes:
+    """The text exposition for /metrics, aggregated across workers in multiprocess mode."""
+    if not ENABLED:
+        return b"# prometheus_client not installed\n"
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a dead worker's live-gauge files (gunicorn child_exit hook)."""
+    if ENABLED and os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
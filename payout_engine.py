@@ -0,0 +1,261 @@
+"""Payout ledger and batch computation.
+
+Affiliate commissions, content-sale creator shares and service-order
+provider shares are appended to a SQLite ledger as payable amounts in cents.
+Records are never updated: each one references an integer payee id, and
+what has been paid is tracked by a ledger-id cursor per partner tier, so a
+payout cycle only reads the records past its cursor. It aggregates them in
+id-ordered chunks, letting SQLite group each chunk by payee so only one
+running total per payee stays in memory, and commits the batch and the
+advanced cursor in one transaction.
+
+Payees below their tier's minimum are not paid; their total is carried
+forward as a balance and included in the next batch. A batch id is derived
+from the scope and the ledger position it covers (or given by the caller),
+so re-running a cycle that already committed returns the stored batch, and
+each line carries its own idempotency key for the transfer.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+DB_PATH = Path(os.getenv("PAYOUT_LEDGER_DB", "/tmp/garcar_payout_ledger.sqlite3"))
+CHUNK_SIZE = max(1000, int(os.getenv("PAYOUT_CHUNK_SIZE", "200000")))
+
+KINDS = ("commission", "content", "service")
+# Minimum payout in cents by affiliate partner tier (affiliate-system.js PAYOUT_SCHEDULE).
+MINIMUM_CENTS = {"bronze": 5000, "silver": 10000, "gold": 20000, "platinum": 50000}
+DEFAULT_MINIMUM_CENTS = int(os.getenv("PAYOUT_DEFAULT_MINIMUM_CENTS", "5000"))
+ALL = "*"  # scope of cycles that cover every tier; never a tier name
+
+
+@dataclass(frozen=True)
+class PayoutLine:
+    kind: str
+    payee: str
+    tier: str
+    cents: int
+    records: int
+    idempotency_key: str
+
+
+@dataclass
+class PayoutBatch:
+    batch_id: str
+    scope: str
+    cutoff: int
+    created_at: float
+    records: int
+    lines: list[PayoutLine] = field(default_factory=list)
+    carried_cents: int = 0
+    replayed: bool = False
+
+    @property
+    def total_cents(self) -> int:
+        return sum(line.cents for line in self.lines)
+
+    def by_kind(self) -> dict[str, dict[str, int]]:
+        summary = {kind: {"payees": 0, "cents": 0, "records": 0} for kind in KINDS}
+        for line in self.lines:
+            entry = summary[line.kind]
+            entry["payees"] += 1
+            entry["cents"] += line.cents
+            entry["records"] += line.records
+        return summary
+
+
+class PayoutLedger:
+    """SQLite payout ledger with chunked, idempotent batch computation."""
+
+    def __init__(self, path: Path = DB_PATH, chunk_size: int = CHUNK_SIZE) -> None:
+        self.path = path
+        self.chunk_size = chunk_size
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._payee_ids: dict[tuple[str, str, str], int] = {}
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS payout_payees (
+                id INTEGER PRIMARY KEY, kind TEXT NOT NULL, payee TEXT NOT NULL, tier TEXT NOT NULL,
+                UNIQUE (kind, payee, tier))""")
+            db.execute("""CREATE TABLE IF NOT EXISTS payout_records (
+                id INTEGER PRIMARY KEY, source_id TEXT UNIQUE, payee_id INTEGER NOT NULL,
+                amount_cents INTEGER NOT NULL, created_at INTEGER NOT NULL)""")
+            db.execute("CREATE TABLE IF NOT EXISTS payout_cursors (scope TEXT PRIMARY KEY, cutoff INTEGER NOT NULL)")
+            db.execute("""CREATE TABLE IF NOT EXISTS payout_balances (
+                payee_id INTEGER PRIMARY KEY, cents INTEGER NOT NULL, records INTEGER NOT NULL)""")
+            db.execute("""CREATE TABLE IF NOT EXISTS payout_batches (
+                batch_id TEXT PRIMARY KEY, scope TEXT NOT NULL, cutoff INTEGER NOT NULL, created_at REAL NOT NULL,
+                records INTEGER NOT NULL, total_cents INTEGER NOT NULL, carried_cents INTEGER NOT NULL)""")
+            db.execute("""CREATE TABLE IF NOT EXISTS payout_lines (
+                batch_id TEXT NOT NULL, payee_id INTEGER NOT NULL, cents INTEGER NOT NULL,
+                records INTEGER NOT NULL, idempotency_key TEXT NOT NULL UNIQUE,
+                PRIMARY KEY (batch_id, payee_id)) WITHOUT ROWID""")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection whose transaction commits on success; closed on exit."""
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    # -- ingest -------------------------------------------------------------
+
+    def _payee_id(self, db: sqlite3.Connection, kind: str, payee: str, tier: str) -> int:
+        key = (kind, payee, tier)
+        payee_id = self._payee_ids.get(key)
+        if payee_id is None:
+            if kind not in KINDS:
+                raise ValueError(f"unknown payout kind: {kind}")
+            db.execute("INSERT OR IGNORE INTO payout_payees(kind,payee,tier) VALUES (?,?,?)", key)
+            payee_id = db.execute("SELECT id FROM payout_payees WHERE kind=? AND payee=? AND tier=?", key).fetchone()[0]
+            self._payee_ids[key] = payee_id
+        return payee_id
+
+    def record_many(self, rows: Iterable[tuple]) -> int:
+        """Append ``(source_id, kind, payee, tier, amount_cents[, created_at])`` rows.
+
+        Rows are consumed lazily, so any iterable of any length can be
+        streamed in. Rows whose source_id is already in the ledger are
+        skipped, so replaying the same sales is harmless; a None source_id is
+        never deduplicated. Returns the rows inserted.
+        """
+        now = int(time.time())
+        with self._lock:
+            try:
+                with self._connect() as db:
+                    return db.executemany(
+                        "INSERT OR IGNORE INTO payout_records(source_id,payee_id,amount_cents,created_at) VALUES (?,?,?,?)",
+                        ((row[0], self._payee_id(db, row[1], row[2], row[3]), row[4],
+                          row[5] if len(row) > 5 else now) for row in rows)).rowcount
+            except BaseException:
+                self._payee_ids.clear()  # payees added in the rolled-back transaction are gone
+                raise
+
+    def record(self, source_id: str | None, kind: str, payee: str, tier: str, amount_cents: int) -> bool:
+        return self.record_many([(source_id, kind, payee, tier, int(amount_cents))]) == 1
+
+    # -- batches ------------------------------------------------------------
+
+    def _aggregate(self, db: sqlite3.Connection, totals: dict[int, list[int]], lo: int, cutoff: int,
+                   tiers: list[str] | None) -> int:
+        """Add per-payee totals of records in ``(lo, cutoff]`` to ``totals``, one chunk at a time."""
+        tier_clause = ""
+        if tiers is not None:
+            tier_clause = f" AND payee_id IN (SELECT id FROM payout_payees WHERE tier IN ({','.join('?' * len(tiers))}))"
+        scanned = 0
+        while lo < cutoff:
+            hi = min(lo + self.chunk_size, cutoff)
+            for payee_id, cents, count in db.execute(
+                    "SELECT payee_id, sum(amount_cents), count(*) FROM payout_records "
+                    f"WHERE id > ? AND id <= ?{tier_clause} GROUP BY payee_id", (lo, hi, *(tiers or ()))):
+                entry = totals.get(payee_id)
+                if entry is None:
+                    totals[payee_id] = [cents, count]
+                else:
+                    entry[0] += cents
+                    entry[1] += count
+                scanned += count
+            lo = hi
+        return scanned
+
+    def run_cycle(self, tier: str | None = None, idempotency_key: str | None = None) -> PayoutBatch:
+        """Compute and commit the next payout batch (optionally only one partner tier)."""
+        if tier is not None and tier not in tuple(MINIMUM_CENTS):
+            raise ValueError(f"unknown partner tier: {tier!r}")
+        scope = tier or ALL
+        with self._lock, self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            cutoff = db.execute("SELECT coalesce(max(id), 0) FROM payout_records").fetchone()[0]
+            batch_id = "PAY_" + hashlib.sha256(f"{scope}:{idempotency_key or cutoff}".encode()).hexdigest()[:24]
+            existing = self._load(db, batch_id)
+            if existing is not None:
+                existing.replayed = True
+                return existing
+
+            # Every tier is paid up to the last all-tier cutoff and possibly further by its own cycles.
+            cursors = {row[0]: row[1] for row in db.execute("SELECT scope, cutoff FROM payout_cursors")}
+            floor = cursors.pop(ALL, 0)
+            tiers = [tier] if tier else [row[0] for row in db.execute("SELECT DISTINCT tier FROM payout_payees")]
+            starts: dict[int, list[str]] = {}
+            for name in tiers:
+                starts.setdefault(max(floor, cursors.get(name, 0)), []).append(name)
+            totals: dict[int, list[int]] = {}
+            scanned = 0
+            for lo, group in starts.items():
+                scanned += self._aggregate(db, totals, lo, cutoff, group if tier or len(starts) > 1 else None)
+
+            payee_filter = " WHERE payee_id IN (SELECT id FROM payout_payees WHERE tier = ?)" if tier else ""
+            args = (tier,) if tier else ()
+            for payee_id, cents, records in db.execute(
+                    f"SELECT payee_id, cents, records FROM payout_balances{payee_filter}", args).fetchall():
+                entry = totals.setdefault(payee_id, [0, 0])
+                entry[0] += cents
+                entry[1] += records
+            db.execute(f"DELETE FROM payout_balances{payee_filter}", args)
+
+            payees = {row[0]: (row[1], row[2], row[3]) for row in db.execute(
+                f"SELECT id, kind, payee, tier FROM payout_payees{' WHERE tier = ?' if tier else ''}", args)}
+            paid, carried, lines = [], [], []
+            for payee_id, (cents, records) in totals.items():
+                kind, payee, payee_tier = payees[payee_id]
+                if cents < MINIMUM_CENTS.get(payee_tier, DEFAULT_MINIMUM_CENTS):
+                    carried.append((payee_id, cents, records))
+                else:
+                    key = f"{batch_id}:{payee_id}"
+                    paid.append((batch_id, payee_id, cents, records, key))
+                    lines.append(PayoutLine(kind, payee, payee_tier, cents, records, key))
+            lines.sort(key=lambda line: (line.kind, line.payee, line.tier))
+            batch = PayoutBatch(batch_id, scope, cutoff, time.time(), scanned, lines,
+                                carried_cents=sum(row[1] for row in carried))
+
+            if tier:
+                db.execute("INSERT OR REPLACE INTO payout_cursors VALUES (?,?)", (tier, cutoff))
+            else:
+                db.execute("DELETE FROM payout_cursors")
+                db.execute("INSERT INTO payout_cursors VALUES (?,?)", (ALL, cutoff))
+            db.executemany("INSERT INTO payout_balances VALUES (?,?,?)", carried)
+            db.executemany("INSERT INTO payout_lines VALUES (?,?,?,?,?)", paid)
+            db.execute("INSERT INTO payout_batches VALUES (?,?,?,?,?,?,?)",
+                       (batch_id, scope, cutoff, batch.created_at, scanned, batch.total_cents, batch.carried_cents))
+        logger.info("[Payouts] batch %s: %d records, %d payees, %d cents (%d carried)",
+                    batch_id, scanned, len(lines), batch.total_cents, batch.carried_cents)
+        return batch
+
+    def _load(self, db: sqlite3.Connection, batch_id: str) -> PayoutBatch | None:
+        row = db.execute("SELECT * FROM payout_batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        if row is None:
+            return None
+        lines = [PayoutLine(r["kind"], r["payee"], r["tier"], r["cents"], r["records"], r["idempotency_key"])
+                 for r in db.execute("SELECT p.kind, p.payee, p.tier, l.cents, l.records, l.idempotency_key "
+                                     "FROM payout_lines l JOIN payout_payees p ON p.id = l.payee_id "
+                                     "WHERE l.batch_id = ? ORDER BY p.kind, p.payee, p.tier", (batch_id,))]
+        return PayoutBatch(row["batch_id"], row["scope"], row["cutoff"], row["created_at"], row["records"],
+                           lines, carried_cents=row["carried_cents"])
+
+    def batch(self, batch_id: str) -> PayoutBatch | None:
+        with self._connect() as db:
+            return self._load(db, batch_id)
+
+    def status(self) -> dict[str, Any]:
+        with self._connect() as db:
+            last = db.execute("SELECT coalesce(max(id), 0) FROM payout_records").fetchone()[0]
+            cursors = {row[0]: row[1] for row in db.execute("SELECT scope, cutoff FROM payout_cursors")}
+            carried = db.execute("SELECT coalesce(sum(cents), 0), count(*) FROM payout_balances").fetchone()
+            batches = db.execute("SELECT count(*) FROM payout_batches").fetchone()[0]
+        return {"last_record": last, "paid_through": cursors.pop(ALL, 0), "tier_cursors": cursors,
+                "carried_cents": carried[0], "carried_payees": carried[1], "batches": batches}
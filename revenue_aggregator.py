@@ -0,0 +1,166 @@
+"""Incremental revenue aggregator fed by Stripe webhooks.
+
+Keeps MRR and customer counts current by applying per-event deltas instead of
+re-listing every subscription on each cache miss. A full reconciliation scan
+still runs, but only on a slow schedule, to correct drift from missed or
+out-of-order deliveries.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+from revenue_engine import subscription_mrr
+
+logger = logging.getLogger(__name__)
+RECONCILE_INTERVAL = max(60, int(os.getenv("REVENUE_RECONCILE_INTERVAL", "900")))
+
+SUBSCRIPTION_EVENTS = {"customer.subscription.created", "customer.subscription.updated",
+                       "customer.subscription.deleted"}
+CUSTOMER_EVENTS = {"customer.created", "customer.deleted"}
+
+
+class RevenueAggregator:
+    """Live MRR/customer totals maintained in O(1) per webhook event.
+
+    ``scanner`` performs the full Stripe crawl and returns
+    ``{"subscriptions": {sub_id: mrr}, "customers": [ids], "total_revenue": x}``.
+    It is only called for the first load and for scheduled reconciliation.
+    """
+
+    def __init__(self, scanner: Callable[[], dict[str, Any]] | None = None,
+                 interval: int = RECONCILE_INTERVAL) -> None:
+        self.scanner = scanner
+        self.interval = interval
+        self._lock = threading.RLock()
+        self._sub_mrr: dict[str, float] = {}
+        self._sub_seen: dict[str, int] = {}
+        self._customers: set[str] = set()
+        self._mrr = 0.0
+        self._total_revenue = 0.0
+        self._primed = False
+        self._last_reconciled = 0.0
+        self._reconciling = False
+        self._pending: list[Any] | None = None
+        self.events_applied = 0
+
+    @property
+    def primed(self) -> bool:
+        return self._primed
+
+    def load(self, state: dict[str, Any]) -> None:
+        """Replace the aggregate with the result of a full scan."""
+        with self._lock:
+            self._sub_mrr = {k: float(v) for k, v in state.get("subscriptions", {}).items() if v}
+            self._sub_seen = {}
+            self._customers = set(state.get("customers", ()))
+            self._mrr = sum(self._sub_mrr.values())
+            self._total_revenue = float(state.get("total_revenue") or 0)
+            self._primed = True
+            self._last_reconciled = time.monotonic()
+
+    def reconcile(self) -> dict[str, Any]:
+        """Run the full scan now and return the refreshed snapshot."""
+        if self.scanner is None:
+            raise RuntimeError("RevenueAggregator has no scanner configured")
+        with self._lock:
+            self._reconciling = True
+        return self._run_reconcile()
+
+    def _run_reconcile(self) -> dict[str, Any]:
+        # Events delivered while the scan is in flight are replayed on top of
+        # the scanned state so they are not lost to the overwrite.
+        with self._lock:
+            self._pending = []
+        try:
+            state = self.scanner()
+            with self._lock:
+                pending = self._pending or []
+                self.load(state)
+                for event in pending:
+                    self._apply(event)
+        finally:
+            with self._lock:
+                self._reconciling = False
+                self._pending = None
+        logger.info("[Aggregator] Reconciled %d subscriptions, %d customers",
+                    len(self._sub_mrr), len(self._customers))
+        return self._totals()
+
+    def reconcile_due(self) -> bool:
+        return (time.monotonic() - self._last_reconciled) >= self.interval
+
+    def _reconcile_in_background(self) -> None:
+        with self._lock:
+            if self._reconciling or self.scanner is None:
+                return
+            self._reconciling = True
+
+        def run() -> None:
+            try:
+                self._run_reconcile()
+            except Exception:
+                logger.exception("[Aggregator] Scheduled reconciliation failed")
+                with self._lock:
+                    self._last_reconciled = time.monotonic()
+
+        threading.Thread(target=run, name="revenue-reconcile", daemon=True).start()
+
+    def snapshot(self) -> dict[str, Any] | None:
+        """Return live totals, or ``None`` until the first full load.
+
+        Never talks to Stripe on the calling thread; when a reconciliation is
+        due it is started in the background and the current totals are served.
+        """
+        if not self._primed:
+            return None
+        if self.reconcile_due():
+            self._reconcile_in_background()
+        return self._totals()
+
+    def _totals(self) -> dict[str, Any]:
+        with self._lock:
+            mrr = round(self._mrr, 2)
+            return {"mrr": mrr, "customers": len(self._customers), "arr": round(self._mrr * 12, 2),
+                    "total_revenue": round(self._total_revenue, 2), "configured": True,
+                    "source": "aggregate"}
+
+    def apply_event(self, event: Any) -> bool:
+        """Apply one Stripe event. Returns True when the aggregate changed."""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(event)
+            if not self._primed:
+                return False
+            return self._apply(event)
+
+    def apply_events(self, events: Iterable[Any]) -> int:
+        return sum(1 for event in events if self.apply_event(event))
+
+    def _apply(self, event: Any) -> bool:
+        event_type = event["type"]
+        obj = event["data"]["object"]
+        if event_type in SUBSCRIPTION_EVENTS:
+            sub_id = obj["id"]
+            created = int(event.get("created") or 0)
+            if created and created < self._sub_seen.get(sub_id, 0):
+                return False  # stale, out-of-order delivery
+            self._sub_seen[sub_id] = created
+            active = event_type != "customer.subscription.deleted" and obj.get("status") == "active"
+            new = subscription_mrr(obj) if active else 0.0
+            old = self._sub_mrr.pop(sub_id, 0.0)
+            if new:
+                self._sub_mrr[sub_id] = new
+            self._mrr += new - old
+        elif event_type in CUSTOMER_EVENTS:
+            if event_type == "customer.created":
+                self._customers.add(obj["id"])
+            else:
+                self._customers.discard(obj["id"])
+        else:
+            return False
+        self.events_applied += 1
+        return True
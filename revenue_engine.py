@@ -0,0 +1,209 @@
+"""Columnar, multi-currency MRR computation.
+
+Subscription items are loaded into parallel columns (amount, currency,
+interval, interval_count, quantity, discount) and normalized to monthly
+recurring revenue in a single vectorized pass. Amounts are converted to the
+base currency from a local FX rate table, and per-currency, per-plan and
+per-subscription breakdowns fall out of the same pass.
+
+NumPy is used when installed; otherwise an equivalent pure-Python loop runs.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+BASE_CURRENCY = os.getenv("FX_BASE_CURRENCY", "usd").lower()
+FX_RATES_PATH = os.getenv("FX_RATES_PATH", "")
+
+# Billing periods per month for each Stripe recurring interval (before interval_count).
+PERIODS_PER_MONTH = {"day": 365.25 / 12, "week": 365.25 / 7 / 12, "month": 1.0, "year": 1 / 12}
+
+
+def load_fx_rates(path: str = FX_RATES_PATH) -> dict[str, float]:
+    """Rates to convert one unit of each currency into BASE_CURRENCY.
+
+    The file is JSON, either ``{"eur": 1.08, ...}`` or
+    ``{"base": "usd", "rates": {...}}``; the base currency is always 1.0.
+    """
+    rates: dict[str, float] = {}
+    if path:
+        try:
+            raw = json.loads(Path(path).read_text())
+            if "rates" in raw:
+                if str(raw.get("base", BASE_CURRENCY)).lower() != BASE_CURRENCY:
+                    raise ValueError(f"FX table base {raw.get('base')} does not match {BASE_CURRENCY}")
+                raw = raw["rates"]
+            rates = {k.lower(): float(v) for k, v in raw.items()}
+        except Exception as exc:
+            logger.warning("[Revenue] Could not load FX rates from %s: %s", path, exc)
+    rates[BASE_CURRENCY] = 1.0
+    return rates
+
+
+_fx_cache: dict[str, Any] = {}
+
+
+def fx_rates() -> dict[str, float]:
+    """The FX table from FX_RATES_PATH, reloaded only when the file changes."""
+    try:
+        mtime = os.stat(FX_RATES_PATH).st_mtime if FX_RATES_PATH else 0.0
+    except OSError:
+        mtime = -1.0
+    if _fx_cache.get("mtime") != mtime:
+        _fx_cache.update(mtime=mtime, rates=load_fx_rates(FX_RATES_PATH))
+    return _fx_cache["rates"]
+
+
+def _discount_fraction(sub: Any) -> float:
+    discount = sub.get("discount") or {}
+    coupon = discount.get("coupon") or {}
+    return float(coupon.get("percent_off") or 0) / 100
+
+
+@dataclass
+class LineItems:
+    """Subscription items as parallel columns; amounts are in minor units."""
+
+    subscription: list[str] = field(default_factory=list)
+    plan: list[str] = field(default_factory=list)
+    currency: list[str] = field(default_factory=list)
+    amount: list[float] = field(default_factory=list)
+    interval: list[str] = field(default_factory=list)
+    interval_count: list[int] = field(default_factory=list)
+    quantity: list[int] = field(default_factory=list)
+    discount: list[float] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+    def append(self, subscription: str, plan: str, currency: str, amount: float, interval: str | None,
+               interval_count: int = 1, quantity: int = 1, discount: float = 0.0) -> None:
+        self.subscription.append(subscription)
+        self.plan.append(plan)
+        self.currency.append((currency or BASE_CURRENCY).lower())
+        self.amount.append(amount or 0)
+        self.interval.append(interval or "month")
+        self.interval_count.append(interval_count or 1)
+        self.quantity.append(1 if quantity is None else quantity)
+        self.discount.append(discount or 0.0)
+
+    @classmethod
+    def from_subscriptions(cls, subscriptions: Iterable[Any]) -> "LineItems":
+        items = cls()
+        for sub in subscriptions:
+            discount = _discount_fraction(sub)
+            for item in sub["items"]["data"]:
+                price = item["price"]
+                recurring = price.get("recurring") or {}
+                items.append(sub["id"], price.get("id") or "", price.get("currency"),
+                             price.get("unit_amount") or 0, recurring.get("interval"),
+                             recurring.get("interval_count") or 1, item.get("quantity") or 1, discount)
+        return items
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> "LineItems":
+        """Build from ``(subscription, plan, currency, amount, interval, interval_count, quantity, discount)`` rows."""
+        items = cls()
+        for row in rows:
+            items.append(*row)
+        return items
+
+
+@dataclass(frozen=True)
+class MrrBreakdown:
+    total: float
+    base_currency: str
+    by_currency: dict[str, dict[str, float]]
+    by_plan: dict[str, float]
+    by_subscription: dict[str, float]
+    unconverted: tuple[str, ...] = ()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"mrr": round(self.total, 2), "baseCurrency": self.base_currency,
+                "byCurrency": {c: {k: round(v, 2) for k, v in d.items()} for c, d in self.by_currency.items()},
+                "byPlan": {p: round(v, 2) for p, v in self.by_plan.items()},
+                "unconvertedCurrencies": list(self.unconverted)}
+
+
+def _factorize(values: list[str]) -> tuple[list[str], Any]:
+    """Distinct values in first-seen order plus an integer code per row (hash-based, O(n))."""
+    index: dict[str, int] = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.intp, count=len(values))
+    return list(index), codes
+
+
+def _compute_numpy(items: LineItems, rates: dict[str, float]) -> MrrBreakdown:
+    currencies, cur_idx = _factorize(items.currency)
+    intervals, int_idx = _factorize(items.interval)
+    plans, plan_idx = _factorize(items.plan)
+    subs, sub_idx = _factorize(items.subscription)
+
+    factor = np.array([PERIODS_PER_MONTH.get(i, 1.0) for i in intervals])[int_idx]
+    factor /= np.maximum(np.asarray(items.interval_count, dtype=np.float64), 1.0)
+    native = (np.asarray(items.amount, dtype=np.float64) / 100 * np.asarray(items.quantity, dtype=np.float64)
+              * (1.0 - np.asarray(items.discount, dtype=np.float64)) * factor)
+    cur_rates = np.array([rates.get(c, math.nan) for c in currencies])
+    base = np.nan_to_num(native * cur_rates[cur_idx], nan=0.0)
+
+    native_by_cur = np.bincount(cur_idx, weights=native, minlength=len(currencies))
+    base_by_cur = np.bincount(cur_idx, weights=base, minlength=len(currencies))
+    return MrrBreakdown(
+        total=float(base.sum()), base_currency=BASE_CURRENCY,
+        by_currency={c: {"native": float(n), "base": float(b)}
+                     for c, n, b in zip(currencies, native_by_cur, base_by_cur)},
+        by_plan=dict(zip(plans, np.bincount(plan_idx, weights=base, minlength=len(plans)).tolist())),
+        by_subscription=dict(zip(subs, np.bincount(sub_idx, weights=base, minlength=len(subs)).tolist())),
+        unconverted=tuple(sorted(c for c, r in zip(currencies, cur_rates) if math.isnan(r))))
+
+
+def _compute_python(items: LineItems, rates: dict[str, float]) -> MrrBreakdown:
+    by_currency: dict[str, dict[str, float]] = {}
+    by_plan: dict[str, float] = {}
+    by_subscription: dict[str, float] = {}
+    unconverted: set[str] = set()
+    total = 0.0
+    for sub, plan, cur, amount, interval, count, qty, disc in zip(
+            items.subscription, items.plan, items.currency, items.amount, items.interval,
+            items.interval_count, items.quantity, items.discount):
+        native = amount / 100 * qty * (1.0 - disc) * PERIODS_PER_MONTH.get(interval, 1.0) / max(count, 1)
+        rate = rates.get(cur)
+        if rate is None:
+            unconverted.add(cur)
+            rate = 0.0
+        base = native * rate
+        totals = by_currency.setdefault(cur, {"native": 0.0, "base": 0.0})
+        totals["native"] += native
+        totals["base"] += base
+        by_plan[plan] = by_plan.get(plan, 0.0) + base
+        by_subscription[sub] = by_subscription.get(sub, 0.0) + base
+        total += base
+    return MrrBreakdown(total, BASE_CURRENCY, by_currency, by_plan, by_subscription, tuple(sorted(unconverted)))
+
+
+def compute_mrr(items: LineItems, rates: dict[str, float] | None = None) -> MrrBreakdown:
+    """Normalized MRR in the base currency, with breakdowns."""
+    rates = fx_rates() if rates is None else rates
+    if not len(items):
+        return MrrBreakdown(0.0, BASE_CURRENCY, {}, {}, {})
+    result = _compute_numpy(items, rates) if np is not None else _compute_python(items, rates)
+    if result.unconverted:
+        logger.warning("[Revenue] No FX rate for %s; excluded from MRR", ", ".join(result.unconverted))
+    return result
+
+
+def subscription_mrr(sub: Any, rates: dict[str, float] | None = None) -> float:
+    """Monthly recurring amount of one subscription in the base currency."""
+    items = LineItems.from_subscriptions([sub])
+    return _compute_python(items, fx_rates() if rates is None else rates).total
@@ -0,0 +1,172 @@
+"""Revenue time series with minute, hour and day rollups.
+
+Each recorded snapshot is stored as one fixed-width numeric row and folded
+into per-minute, per-hour and per-day rollup rows as it arrives, so reads
+never rescan raw history: a bucket is a primary-key lookup and a range is a
+primary-key range scan over at most one row per bucket. Raw rows and fine
+rollups are pruned after their retention period, leaving coarser rollups
+as the downsampled record.
+
+Sample times are floored to ``SAMPLE_SECONDS`` and the first sample of a
+slot wins, so workers that each record the same revenue at about the same
+time store it once and the rollups do not count it several times.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+DB_PATH = Path(os.getenv("REVENUE_HISTORY_DB", "/tmp/garcar_revenue_history.sqlite3"))
+RAW_RETENTION = int(os.getenv("REVENUE_HISTORY_RAW_DAYS", "2")) * 86400
+PRUNE_INTERVAL = 3600
+SAMPLE_SECONDS = max(1, int(os.getenv("REVENUE_HISTORY_SAMPLE_SECONDS", "60")))
+MONTH = 30 * 86400
+
+# resolution name -> (bucket width in seconds, retention in seconds; None keeps forever)
+RESOLUTIONS = {
+    "minute": (60, 7 * 86400),
+    "hour": (3600, 90 * 86400),
+    "day": (86400, None),
+}
+
+_UPSERT = """
+INSERT INTO revenue_rollups VALUES (?,?,1,?,?,?,?,?,?,?,?,?)
+ON CONFLICT(resolution, bucket) DO UPDATE SET
+    count = count + 1,
+    mrr_sum = mrr_sum + excluded.mrr_sum,
+    mrr_min = min(mrr_min, excluded.mrr_min),
+    mrr_max = max(mrr_max, excluded.mrr_max),
+    mrr_first = CASE WHEN excluded.first_ts < first_ts THEN excluded.mrr_first ELSE mrr_first END,
+    first_ts = min(first_ts, excluded.first_ts),
+    mrr_last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.mrr_last ELSE mrr_last END,
+    customers_last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.customers_last ELSE customers_last END,
+    total_revenue_last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.total_revenue_last
+                              ELSE total_revenue_last END,
+    last_ts = max(last_ts, excluded.last_ts)
+"""
+
+
+class RevenueHistory:
+    """SQLite-backed revenue samples and their rollups."""
+
+    def __init__(self, path: Path = DB_PATH) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._pruned_at = 0.0
+        with self._connect() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS revenue_samples (
+                ts INTEGER PRIMARY KEY, mrr REAL NOT NULL, customers INTEGER NOT NULL,
+                total_revenue REAL NOT NULL)""")
+            db.execute("""CREATE TABLE IF NOT EXISTS revenue_rollups (
+                resolution INTEGER NOT NULL, bucket INTEGER NOT NULL, count INTEGER NOT NULL,
+                first_ts INTEGER NOT NULL, last_ts INTEGER NOT NULL,
+                mrr_first REAL NOT NULL, mrr_last REAL NOT NULL, mrr_min REAL NOT NULL,
+                mrr_max REAL NOT NULL, mrr_sum REAL NOT NULL,
+                customers_last INTEGER NOT NULL, total_revenue_last REAL NOT NULL,
+                PRIMARY KEY (resolution, bucket)) WITHOUT ROWID""")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection whose transaction commits on success; closed on exit."""
+        db = sqlite3.connect(self.path, timeout=10)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def record(self, revenue: dict[str, Any], ts: float | None = None) -> bool:
+        """Store one snapshot (``mrr``, ``customers``, ``total_revenue``) and fold it into every rollup.
+
+        Returns False, storing nothing, when its sample slot already holds one.
+        """
+        ts = int(time.time() if ts is None else ts)
+        ts -= ts % SAMPLE_SECONDS
+        mrr = float(revenue.get("mrr") or 0)
+        customers = int(revenue.get("customers") or 0)
+        total = float(revenue.get("total_revenue") or 0)
+        with self._lock, self._connect() as db:
+            if not db.execute("INSERT OR IGNORE INTO revenue_samples VALUES (?,?,?,?)",
+                              (ts, mrr, customers, total)).rowcount:
+                return False
+            db.executemany(_UPSERT, [(width, ts - ts % width, ts, ts, mrr, mrr, mrr, mrr, mrr, customers, total)
+                                     for width, _ in RESOLUTIONS.values()])
+            if ts - self._pruned_at >= PRUNE_INTERVAL:
+                self._prune(db, ts)
+        return True
+
+    def _prune(self, db: sqlite3.Connection, now: int) -> None:
+        db.execute("DELETE FROM revenue_samples WHERE ts < ?", (now - RAW_RETENTION,))
+        for width, retention in RESOLUTIONS.values():
+            if retention is not None:
+                db.execute("DELETE FROM revenue_rollups WHERE resolution=? AND bucket < ?", (width, now - retention))
+        self._pruned_at = now
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> dict[str, Any]:
+        return {"bucket": row["bucket"], "count": row["count"], "mrr_avg": row["mrr_sum"] / row["count"],
+                "mrr_min": row["mrr_min"], "mrr_max": row["mrr_max"], "mrr_first": row["mrr_first"],
+                "mrr_last": row["mrr_last"], "customers": row["customers_last"],
+                "total_revenue": row["total_revenue_last"]}
+
+    def at(self, resolution: str, ts: float) -> dict[str, Any] | None:
+        """The rollup bucket containing ``ts``."""
+        width = RESOLUTIONS[resolution][0]
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM revenue_rollups WHERE resolution=? AND bucket=?",
+                             (width, int(ts) - int(ts) % width)).fetchone()
+        return self._row(row) if row else None
+
+    def series(self, resolution: str, start: float, end: float | None = None) -> list[dict[str, Any]]:
+        """Rollup buckets overlapping ``[start, end]``, oldest first."""
+        width = RESOLUTIONS[resolution][0]
+        end = time.time() if end is None else end
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM revenue_rollups WHERE resolution=? AND bucket BETWEEN ? AND ? "
+                              "ORDER BY bucket", (width, int(start) - int(start) % width, int(end))).fetchall()
+        return [self._row(row) for row in rows]
+
+    def _span(self, window: float) -> tuple[float, float, float] | None:
+        """(first mrr, last mrr, seconds between them) over the trailing window, from hourly rollups."""
+        width = RESOLUTIONS["hour"][0]
+        with self._connect() as db:
+            last = db.execute("SELECT bucket, last_ts, mrr_last FROM revenue_rollups WHERE resolution=? "
+                              "ORDER BY bucket DESC LIMIT 1", (width,)).fetchone()
+            if last is None:
+                return None
+            first = db.execute("SELECT first_ts, mrr_first FROM revenue_rollups WHERE resolution=? AND bucket >= ? "
+                               "ORDER BY bucket LIMIT 1", (width, last["bucket"] - int(window))).fetchone()
+        return first["mrr_first"], last["mrr_last"], last["last_ts"] - first["first_ts"]
+
+    def change(self, window: float) -> float | None:
+        """Fractional MRR change over the trailing window, or None without data or a zero base."""
+        span = self._span(window)
+        if span is None or span[0] <= 0 or span[2] <= 0:
+            return None
+        return span[1] / span[0] - 1
+
+    def monthly_growth(self, window: float = MONTH, min_span: float = 7 * 86400) -> float | None:
+        """Compound monthly MRR growth measured over the trailing window.
+
+        None until at least ``min_span`` seconds of history exist, since a few
+        hours of samples extrapolated to a month are mostly noise.
+        """
+        span = self._span(window)
+        if span is None or span[0] <= 0 or span[1] <= 0 or span[2] < min_span:
+            return None
+        return (span[1] / span[0]) ** (MONTH / span[2]) - 1
+
+    def status(self) -> dict[str, Any]:
+        with self._connect() as db:
+            samples = db.execute("SELECT count(*) AS n, min(ts) AS first, max(ts) AS last FROM revenue_samples").fetchone()
+            rollups = db.execute("SELECT resolution, count(*) AS n FROM revenue_rollups GROUP BY resolution").fetchall()
+        widths = {width: name for name, (width, _) in RESOLUTIONS.items()}
+        return {"samples": samples["n"], "first": samples["first"], "last": samples["last"],
+                "rollups": {widths.get(r["resolution"], r["resolution"]): r["n"] for r in rollups}}
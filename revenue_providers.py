@@ -0,0 +1,146 @@
+"""Pluggable revenue sources collected concurrently under deadlines.
+
+Each revenue stream is a :class:`RevenueSource` with its own TTL and
+deadline. :meth:`ProviderRegistry.collect` starts every due source at once on
+a thread pool and waits for each only until its deadline, so collecting costs
+roughly the slowest deadline rather than the sum of all sources. A source
+that misses its deadline keeps running; until it finishes, its last good
+value is returned marked stale (or no value, if it never succeeded), and
+``on_late`` is called when the late result lands so cached views can be
+invalidated. :attr:`ProviderRegistry.version` counts value changes, so
+callers can notice new revenue without collecting; :meth:`ProviderRegistry.refresh`
+starts the due fetches without waiting for them.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+MAX_WORKERS = max(1, int(os.getenv("REVENUE_SOURCE_WORKERS", "8")))
+SOURCE_TTL = float(os.getenv("REVENUE_SOURCE_TTL", "60"))
+SOURCE_DEADLINE = float(os.getenv("REVENUE_SOURCE_DEADLINE", "2"))
+
+
+@dataclass
+class RevenueSource:
+    """One revenue stream: ``fetch`` returns its monthly revenue."""
+
+    name: str
+    fetch: Callable[[], float]
+    ttl: float = SOURCE_TTL
+    deadline: float = SOURCE_DEADLINE
+
+
+@dataclass(frozen=True)
+class Reading:
+    name: str
+    value: float | None
+    fetched_at: float | None  # wall clock
+    stale: bool
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        age = round(time.time() - self.fetched_at, 3) if self.fetched_at is not None else None
+        return {"value": self.value, "age": age, "stale": self.stale, "error": self.error}
+
+
+class ProviderRegistry:
+    """Revenue sources by name, fetched in parallel with per-source deadlines."""
+
+    def __init__(self, max_workers: int = MAX_WORKERS, on_late: Callable[[str], Any] | None = None) -> None:
+        self.on_late = on_late
+        self._sources: dict[str, RevenueSource] = {}
+        self._state: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="revenue-source")
+        self.version = 0  # bumped whenever a source reports a different value
+        self.stats = {"fetches": 0, "errors": 0, "deadline_misses": 0, "late_results": 0}
+
+    def register(self, source: RevenueSource) -> None:
+        """Add a source, replacing any registered under the same name."""
+        with self._lock:
+            self._sources[source.name] = source
+            self._state[source.name] = {"value": None, "fetched_at": None, "checked_at": float("-inf"),
+                                        "error": None, "future": None, "late": False}
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._sources)
+
+    def _fetch(self, source: RevenueSource) -> None:
+        try:
+            value, error = float(source.fetch()), None
+        except Exception as exc:
+            value, error = None, str(exc)
+            logger.warning("[Revenue] source %s failed: %s", source.name, exc)
+        with self._lock:
+            state = self._state[source.name]
+            state["checked_at"] = time.monotonic()
+            state["error"] = error
+            if error is None:
+                self.version += value != state["value"]
+                state["value"], state["fetched_at"] = value, time.time()
+            state["future"] = None
+            late, state["late"] = state["late"], False
+            self.stats["fetches"] += 1
+            self.stats["errors"] += error is not None
+            self.stats["late_results"] += late
+        if late and self.on_late is not None:
+            try:
+                self.on_late(source.name)
+            except Exception as exc:
+                logger.warning("[Revenue] late-result callback for %s failed: %s", source.name, exc)
+
+    def _start_due(self) -> list[tuple[float, str, Future]]:
+        """Submit every source past its TTL; the running fetches with their deadlines."""
+        now = time.monotonic()
+        running: list[tuple[float, str, Future]] = []
+        with self._lock:
+            for name, source in self._sources.items():
+                state = self._state[name]
+                if state["future"] is None and now - state["checked_at"] < source.ttl:
+                    continue
+                if state["future"] is None:
+                    state["future"] = self._executor.submit(self._fetch, source)
+                running.append((now + source.deadline, name, state["future"]))
+        return running
+
+    def refresh(self) -> None:
+        """Start fetching every source past its TTL without waiting for any of them."""
+        self._start_due()
+
+    def expire(self, name: str) -> None:
+        """Fetch ``name`` again on the next collect or refresh, whatever its TTL."""
+        with self._lock:
+            if name in self._state:
+                self._state[name]["checked_at"] = float("-inf")
+
+    def collect(self) -> dict[str, Reading]:
+        """Current reading of every source, refreshing those past their TTL."""
+        late = set()
+        for deadline, name, future in sorted(self._start_due(), key=lambda item: item[0]):
+            try:
+                future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                with self._lock:
+                    state = self._state[name]
+                    if state["future"] is future:  # still running; report when it lands
+                        state["late"] = True
+                        late.add(name)
+                        self.stats["deadline_misses"] += 1
+        with self._lock:
+            return {name: Reading(name, state["value"], state["fetched_at"],
+                                  stale=name in late or state["error"] is not None, error=state["error"])
+                    for name, state in self._state.items()}
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            sources = {name: {"ttl": s.ttl, "deadline": s.deadline, "running": self._state[name]["future"] is not None}
+                       for name, s in self._sources.items()}
+            return {**self.stats, "sources": sources}
@@ -0,0 +1,199 @@
+"""Cross-process snapshot store on a memory-mapped file.
+
+Gunicorn workers on one host share a value through a file under
+SHARED_SNAPSHOT_DIR instead of each keeping (and recomputing) its own copy.
+The file starts with a fixed header guarded by a seqlock: the writer bumps
+the sequence to an odd number, writes the payload, then bumps it to the next
+even number. Readers retry when they see an odd or changed sequence, so they
+never block the writer and never see a torn value. Writers (the refresher,
+a worker that had nothing to serve, an invalidation) take an exclusive
+flock on the file so only one of them is inside the seqlock at a time.
+Each process decodes a given version once; later reads only compare the
+8-byte sequence and return the already-decoded object.
+
+One process is the refresher: the first to take a non-blocking flock on the
+companion lock file keeps it for its lifetime, and the OS releases it if that
+process dies, letting another worker take over.
+"""
+from __future__ import annotations
+
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+SNAPSHOT_DIR = Path(os.getenv("SHARED_SNAPSHOT_DIR", "/tmp/garcar_snapshots"))
+INITIAL_BYTES = 1 << 16
+
+MAGIC = b"GCSNAP01"
+_HEADER = struct.Struct("<8sQQdd")  # magic, seq, payload length, written_at, expires_at
+HEADER_SIZE = 64
+_SEQ_OFFSET = 8
+
+
+class SharedSnapshot:
+    """A single value shared by every process on the host through an mmap'd file."""
+
+    def __init__(self, name: str, directory: Path = SNAPSHOT_DIR,
+                 encode: Callable[[Any], bytes] | None = None,
+                 decode: Callable[[bytes], Any] | None = None) -> None:
+        from cache_codecs import Codec, default_codec
+        self.name = name
+        self.path = directory / f"{name}.snap"
+        self.lock_path = directory / f"{name}.lock"
+        self.encode = encode or default_codec.encode
+        self.decode = decode or Codec.decode
+        self._mm: mmap.mmap | None = None
+        self._fd: int | None = None
+        self._lock_fd: int | None = None
+        self._local = threading.Lock()
+        self._cached: tuple[int, Any, float, float] | None = None  # seq, value, written_at, expires_at
+        self.stats = {"reads": 0, "decodes": 0, "retries": 0, "writes": 0}
+
+    # -- mapping -----------------------------------------------------------
+
+    def _map(self, create: bool = False) -> mmap.mmap | None:
+        if self._mm is not None and len(self._mm) >= os.fstat(self._fd).st_size:
+            return self._mm
+        if self._fd is None:
+            if not create and not self.path.exists():
+                return None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = os.fstat(self._fd).st_size
+        if size < HEADER_SIZE:
+            if not create:
+                return None
+            os.ftruncate(self._fd, INITIAL_BYTES)
+            size = INITIAL_BYTES
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = mmap.mmap(self._fd, size)
+        if self._mm[:8] != MAGIC and create:
+            _HEADER.pack_into(self._mm, 0, MAGIC, 0, 0, 0.0, 0.0)
+        return self._mm
+
+    def _seq(self, mm: mmap.mmap) -> int:
+        return struct.unpack_from("<Q", mm, _SEQ_OFFSET)[0]
+
+    # -- read / write -------------------------------------------------------
+
+    def read_entry(self) -> tuple[Any, float, float] | None:
+        """``(value, written_at, expires_at)`` of the current version, or None if empty."""
+        with self._local:
+            self.stats["reads"] += 1
+            mm = self._map()
+            if mm is None or mm[:8] != MAGIC:
+                return None
+            for _ in range(1000):
+                seq = self._seq(mm)
+                if seq & 1:
+                    self.stats["retries"] += 1
+                    time.sleep(0)
+                    continue
+                if self._cached is not None and self._cached[0] == seq:
+                    _, value, written_at, expires_at = self._cached
+                    return None if value is None else (value, written_at, expires_at)
+                _, _, length, written_at, expires_at = _HEADER.unpack_from(mm, 0)
+                if HEADER_SIZE + length > len(mm):
+                    mm = self._map()  # writer grew the file; remap and retry
+                    continue
+                payload = mm[HEADER_SIZE:HEADER_SIZE + length]
+                if self._seq(mm) != seq:
+                    self.stats["retries"] += 1
+                    continue
+                value = self.decode(payload) if length else None
+                self.stats["decodes"] += 1
+                self._cached = (seq, value, written_at, expires_at)
+                return None if value is None else (value, written_at, expires_at)
+            logger.warning("[Snapshot] %s kept changing under the reader; giving up", self.name)
+            return None
+
+    def read(self) -> Any:
+        """The current value if it has not expired, else None."""
+        entry = self.read_entry()
+        if entry is None or entry[2] <= time.time():
+            return None
+        return entry[0]
+
+    def write(self, value: Any, ttl: float, raw: bytes | None = None) -> None:
+        """Publish a new version; pass ``raw`` when the caller already encoded ``value``."""
+        payload = b"" if value is None else raw if raw is not None else self.encode(value)
+        with self._writing() as mm:
+            if HEADER_SIZE + len(payload) > len(mm):
+                os.ftruncate(self._fd, max(HEADER_SIZE + len(payload), 2 * len(mm)))
+                mm = self._map(create=True)
+            seq = self._begin(mm)
+            mm[HEADER_SIZE:HEADER_SIZE + len(payload)] = payload
+            now = time.time()
+            _HEADER.pack_into(mm, 0, MAGIC, seq, len(payload), now, now + ttl if payload else 0.0)
+            struct.pack_into("<Q", mm, _SEQ_OFFSET, seq + 1)
+            self.stats["writes"] += 1
+
+    def expire(self) -> None:
+        """Mark the current version expired but keep it readable through ``read_entry``."""
+        if not self.path.exists():
+            return
+        with self._writing() as mm:
+            _, _, length, written_at, _ = _HEADER.unpack_from(mm, 0)
+            seq = self._begin(mm)
+            _HEADER.pack_into(mm, 0, MAGIC, seq, length, written_at, 0.0)
+            struct.pack_into("<Q", mm, _SEQ_OFFSET, seq + 1)
+            self.stats["writes"] += 1
+
+    def clear(self) -> None:
+        if self.path.exists():
+            self.write(None, 0)
+
+    @contextmanager
+    def _writing(self) -> Iterator[mmap.mmap]:
+        """The mapping, held exclusively against writers in this and every other process."""
+        with self._local:
+            self._map(create=True)  # opens the file
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield self._map(create=True)  # another process may have grown the file meanwhile
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _begin(self, mm: mmap.mmap) -> int:
+        """Make the sequence odd for a write and return it."""
+        seq = self._seq(mm)
+        seq += 1 if seq % 2 == 0 else 2  # recover from a writer that died mid-write
+        struct.pack_into("<Q", mm, _SEQ_OFFSET, seq)
+        return seq
+
+    # -- refresher election -------------------------------------------------
+
+    def try_lead(self) -> bool:
+        """Become (or confirm being) this snapshot's refresher; held until the process exits."""
+        if self._lock_fd is not None:
+            return True
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        logger.info("[Snapshot] pid %d is the refresher for %s", os.getpid(), self.name)
+        return True
+
+    @property
+    def leader(self) -> bool:
+        return self._lock_fd is not None
+
+    def status(self) -> dict[str, Any]:
+        entry = self.read_entry()
+        return {"name": self.name, "leader": self.leader, "present": entry is not None,
+                "age": round(time.time() - entry[1], 3) if entry else None, **self.stats}
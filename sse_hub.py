@@ -0,0 +1,202 @@
+"""Server-sent event broadcast hub.
+
+Published events are framed once and appended to a fixed-size ring buffer
+under monotonically increasing ids. Clients do not get a queue of their own:
+each stream keeps only the id of the last frame it sent and reads forward
+from the ring when woken, so publishing costs the same however many
+dashboards are connected, and a slow client never blocks or evicts anyone.
+
+With Redis, ids come from a shared counter and frames travel over pub/sub,
+so every worker's ring holds the same events under the same ids and a
+browser can resume with ``Last-Event-ID`` on whichever worker it reconnects
+to. Without Redis, or while it is unreachable, the hub runs in-process.
+
+A frame id is the Redis counter value shifted left by ``LOCAL_BITS``;
+frames delivered only locally number the low bits after the last Redis
+id, so they never take an id that a later Redis event will arrive with.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+BUFFER_SIZE = max(16, int(os.getenv("SSE_BUFFER_SIZE", "1024")))
+HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT", "25"))
+CHANNEL = os.getenv("SSE_CHANNEL", "garcar:sse")
+DEDUPE_SECONDS = 3600
+LOCAL_BITS = 32
+
+# Dedupe, id allocation and publish in one step so pub/sub order matches id order.
+_PUBLISH = """
+if ARGV[3] ~= '' and not redis.call('SET', ARGV[3], '1', 'NX', 'EX', ARGV[4]) then return 0 end
+local id = redis.call('INCR', KEYS[1])
+redis.call('PUBLISH', ARGV[1], id .. '\\n' .. ARGV[2])
+return id
+"""
+
+
+def format_frame(event_id: int, event: str, data: Any) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class EventHub:
+    """Ring-buffered SSE broadcaster with optional Redis pub/sub fan-out.
+
+    ``redis_client`` is a client, or a callable returning one (or None while
+    Redis is unavailable) that is consulted on every publish.
+    """
+
+    def __init__(self, capacity: int = BUFFER_SIZE, redis_client: Any = None, channel: str = CHANNEL) -> None:
+        self.capacity = capacity
+        self._redis_source = redis_client
+        self.channel = channel
+        self._slots: list[tuple[int, str] | None] = [None] * capacity
+        self._head = 0  # frames ever appended; the newest lives at (_head - 1) % capacity
+        self._last_id = 0
+        self._evicted = 0  # id of the newest frame overwritten in the ring
+        self._cond = threading.Condition()
+        self._subscriber: threading.Thread | None = None
+        self._subscriber_lock = threading.Lock()
+        self._publish_script = None
+        self.stats = {"published": 0, "received": 0, "deduplicated": 0, "resyncs": 0, "clients": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, stat: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[stat] += n
+
+    def _redis(self) -> Any:
+        source = self._redis_source
+        return source() if callable(source) else source
+
+    @property
+    def distributed(self) -> bool:
+        return self._redis() is not None
+
+    @property
+    def last_id(self) -> int:
+        with self._cond:
+            return self._last_id
+
+    def _append(self, event_id: int, frame: str) -> bool:
+        with self._cond:
+            if event_id <= self._last_id:
+                return False
+            if self._head >= self.capacity:
+                self._evicted = self._slots[self._head % self.capacity][0]
+            self._slots[self._head % self.capacity] = (event_id, frame)
+            self._head += 1
+            self._last_id = event_id
+            self._cond.notify_all()
+        return True
+
+    def publish(self, event: str, data: Any, dedupe: str | None = None) -> int | None:
+        """Broadcast to every connected client; returns the event id, or None if ``dedupe`` was seen."""
+        self._count("published")
+        client = self._redis()
+        if client is not None:
+            self._ensure_subscriber()
+            message = json.dumps({"event": event, "data": data}, default=str)
+            try:
+                if self._publish_script is None:
+                    self._publish_script = client.register_script(_PUBLISH)
+                event_id = int(self._publish_script(keys=[f"{self.channel}:id"], args=[
+                    self.channel, message, f"{self.channel}:dedupe:{dedupe}" if dedupe else "", DEDUPE_SECONDS],
+                    client=client))
+            except Exception as exc:
+                logger.warning("[SSE] Redis publish failed, delivering locally: %s", exc)
+            else:
+                if not event_id:
+                    self._count("deduplicated")
+                    return None
+                return event_id << LOCAL_BITS
+        with self._cond:
+            event_id = self._last_id + 1  # low bits only; the next Redis id is the next multiple of 1 << LOCAL_BITS
+            self._append(event_id, format_frame(event_id, event, data))
+        return event_id
+
+    def _on_message(self, raw: str | bytes) -> None:
+        if isinstance(raw, bytes):
+            raw = raw.decode()
+        head, _, body = raw.partition("\n")
+        message = json.loads(body)
+        event_id = int(head) << LOCAL_BITS
+        if self._append(event_id, format_frame(event_id, message["event"], message["data"])):
+            self._count("received")
+
+    def _listen(self) -> None:
+        delay = 1.0
+        while True:
+            try:
+                client = self._redis()
+                if client is None:
+                    raise ConnectionError("Redis unavailable")
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                delay = 1.0
+                while True:
+                    message = pubsub.get_message(timeout=30)
+                    if message and message.get("type") == "message":
+                        self._on_message(message["data"])
+            except Exception as exc:
+                logger.warning("[SSE] Subscription to %s lost, retrying in %.0fs: %s", self.channel, delay, exc)
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    def _ensure_subscriber(self) -> None:
+        with self._subscriber_lock:
+            if self._subscriber is None or not self._subscriber.is_alive():
+                self._subscriber = threading.Thread(target=self._listen, name="sse-subscriber", daemon=True)
+                self._subscriber.start()
+
+    def read(self, cursor: int) -> tuple[list[str], int, bool]:
+        """Frames newer than ``cursor``, the new cursor, and whether frames were lost to the ring."""
+        with self._cond:
+            oldest = max(0, self._head - self.capacity)
+            lo, hi = oldest, self._head
+            while lo < hi:  # first ring position with id > cursor
+                mid = (lo + hi) // 2
+                if self._slots[mid % self.capacity][0] <= cursor:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            frames = [self._slots[pos % self.capacity][1] for pos in range(lo, self._head)]
+            # Ids are sparse (Redis ids are shifted), so a gap is a frame after the cursor that was evicted.
+            return frames, self._last_id, cursor < self._evicted
+
+    def wait(self, cursor: int, timeout: float) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self._last_id > cursor, timeout)
+
+    def stream(self, last_event_id: int | None = None, heartbeat: float = HEARTBEAT_SECONDS) -> Iterator[str]:
+        """SSE frames for one client, resuming after ``last_event_id`` when it is still buffered."""
+        if self._redis() is not None:
+            self._ensure_subscriber()
+        cursor = self.last_id if last_event_id is None else last_event_id
+        if cursor > self.last_id:  # id from before a counter reset
+            cursor = self.last_id
+        self._count("clients")
+        try:
+            yield f"id: {cursor}\nevent: heartbeat\ndata: {{}}\n\n"
+            while True:
+                frames, cursor, gap = self.read(cursor)
+                if gap:
+                    self._count("resyncs")
+                    yield f"id: {cursor}\nevent: resync\ndata: {{}}\n\n"
+                    frames = []
+                yield from frames
+                if not self.wait(cursor, heartbeat):
+                    yield ": keep-alive\n\n"
+        finally:
+            self._count("clients", -1)
+
+    def status(self) -> dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {"distributed": self.distributed, "capacity": self.capacity, "last_id": self.last_id,
+                "buffered": min(self._head, self.capacity), **stats}
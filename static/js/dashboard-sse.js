@@ -83,6 +83,7 @@
   // ── SSE connection ─────────────────────────────────────────────────────────
 
   let _es = null;
+  let _lastEventId = null; // resume point; a new EventSource does not carry it over on its own
   let _reconnectDelay = 1000; // ms, doubles on each failure up to 30s
   const MAX_DELAY = 30000;
 
@@ -91,16 +92,24 @@
       _es.close();
     }
 
-    console.info('[SSE] connecting to /api/events/stream …');
-    _es = new EventSource('/api/events/stream');
+    let url = '/api/events/stream';
+    if (_lastEventId !== null) url += '?last_event_id=' + encodeURIComponent(_lastEventId);
+    console.info('[SSE] connecting to', url, '…');
+    _es = new EventSource(url);
 
-    _es.addEventListener('heartbeat', function () {
+    function track(e) {
+      if (e.lastEventId) _lastEventId = e.lastEventId;
+    }
+
+    _es.addEventListener('heartbeat', function (e) {
+      track(e);
       console.debug('[SSE] heartbeat received');
       _reconnectDelay = 1000; // reset backoff on successful connection
     });
 
     // revenue_update fires on payment_intent.succeeded / charge.succeeded / invoice.payment_succeeded
     _es.addEventListener('revenue_update', function (e) {
+      track(e);
       console.info('[SSE] revenue_update', e.data);
       refreshRevenue();
       refreshMaster();
@@ -108,10 +117,18 @@
 
     // subscription_change fires on customer.subscription.created/updated/deleted
     _es.addEventListener('subscription_change', function (e) {
+      track(e);
       console.info('[SSE] subscription_change', e.data);
       refreshAll();
     });
 
+    // resync fires when events were missed (buffer overrun while disconnected or too slow)
+    _es.addEventListener('resync', function (e) {
+      track(e);
+      console.info('[SSE] resync');
+      refreshAll();
+    });
+
     _es.onerror = function (err) {
       console.warn('[SSE] connection error, reconnecting in', _reconnectDelay, 'ms', err);
       _es.close();
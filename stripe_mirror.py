@@ -0,0 +1,243 @@
+"""Local SQLite mirror of the Stripe objects the revenue path reads.
+
+Subscriptions, subscription items, prices, customers and charges are synced
+incrementally with Stripe's ``created`` / ``starting_after`` list cursors and
+kept current by webhook upserts, so revenue, customer and charge totals are
+local aggregates over indexed tables instead of a paged API crawl.
+
+``created`` cursors only discover new objects; changes to existing objects
+(status transitions, cancellations, refunds) arrive through webhooks and the
+scheduled reconciliation in :mod:`revenue_aggregator`. Each object remembers
+the time of the newest event (or sync) that wrote it, and an event older than
+that is skipped, so a late or retried webhook cannot overwrite newer state.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from revenue_engine import LineItems, MrrBreakdown, compute_mrr
+from stripe_listing import ListSource, crawl
+
+logger = logging.getLogger(__name__)
+DB_PATH = Path(os.getenv("STRIPE_MIRROR_DB", "/tmp/garcar_stripe_mirror.sqlite3"))
+FULL_SYNC_INTERVAL = int(os.getenv("STRIPE_MIRROR_FULL_SYNC_INTERVAL", "86400"))
+# total_revenue has always been succeeded charges among the newest page of charges, not an all-time sum.
+RECENT_CHARGES = 100
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS customers (
+        id TEXT PRIMARY KEY, email TEXT, created INTEGER NOT NULL, deleted INTEGER NOT NULL DEFAULT 0)""",
+    "CREATE INDEX IF NOT EXISTS idx_customers_deleted ON customers(deleted)",
+    """CREATE TABLE IF NOT EXISTS prices (
+        id TEXT PRIMARY KEY, product TEXT, currency TEXT, unit_amount INTEGER NOT NULL DEFAULT 0,
+        interval TEXT, interval_count INTEGER NOT NULL DEFAULT 1, created INTEGER NOT NULL DEFAULT 0)""",
+    """CREATE TABLE IF NOT EXISTS subscriptions (
+        id TEXT PRIMARY KEY, customer TEXT, status TEXT NOT NULL, created INTEGER NOT NULL,
+        discount REAL NOT NULL DEFAULT 0)""",
+    "CREATE INDEX IF NOT EXISTS idx_subscriptions_status ON subscriptions(status)",
+    """CREATE TABLE IF NOT EXISTS subscription_items (
+        id TEXT PRIMARY KEY, subscription_id TEXT NOT NULL, price_id TEXT NOT NULL,
+        quantity INTEGER NOT NULL DEFAULT 1)""",
+    "CREATE INDEX IF NOT EXISTS idx_items_subscription ON subscription_items(subscription_id)",
+    """CREATE TABLE IF NOT EXISTS charges (
+        id TEXT PRIMARY KEY, customer TEXT, amount INTEGER NOT NULL, currency TEXT,
+        status TEXT NOT NULL, created INTEGER NOT NULL)""",
+    "CREATE INDEX IF NOT EXISTS idx_charges_status ON charges(status, created)",
+    """CREATE TABLE IF NOT EXISTS object_versions (
+        id TEXT PRIMARY KEY, updated INTEGER NOT NULL) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS sync_cursors (
+        resource TEXT PRIMARY KEY, created INTEGER NOT NULL, synced_at REAL NOT NULL)""",
+)
+
+_LINE_ITEMS = """SELECT si.subscription_id, p.id, p.currency, p.unit_amount, p.interval, p.interval_count,
+    si.quantity, s.discount FROM subscription_items si
+    JOIN subscriptions s ON s.id = si.subscription_id JOIN prices p ON p.id = si.price_id
+    WHERE s.status = 'active'"""
+
+
+class StripeMirror:
+    """SQLite-backed mirror with cursor-based incremental sync."""
+
+    def __init__(self, path: Path = DB_PATH, stripe_module: Any = None) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.stripe = stripe_module
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                db.execute(statement)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(subscriptions)")}
+            if "discount" not in columns:  # mirrors created before discounts were tracked
+                db.execute("ALTER TABLE subscriptions ADD COLUMN discount REAL NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection whose transaction commits on success; closed on exit."""
+        db = sqlite3.connect(self.path, timeout=10)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    # Upserts
+
+    def _upsert_customer(self, db, obj: Any) -> None:
+        db.execute("INSERT OR REPLACE INTO customers(id,email,created,deleted) VALUES (?,?,?,?)",
+                   (obj["id"], obj.get("email"), int(obj.get("created") or 0), int(bool(obj.get("deleted")))))
+
+    def _upsert_price(self, db, price: Any) -> None:
+        recurring = price.get("recurring") or {}
+        db.execute("INSERT OR REPLACE INTO prices VALUES (?,?,?,?,?,?,?)",
+                   (price["id"], price.get("product"), price.get("currency"), int(price.get("unit_amount") or 0),
+                    recurring.get("interval"), int(recurring.get("interval_count") or 1),
+                    int(price.get("created") or 0)))
+
+    def _upsert_subscription(self, db, sub: Any) -> None:
+        coupon = (sub.get("discount") or {}).get("coupon") or {}
+        db.execute("INSERT OR REPLACE INTO subscriptions(id,customer,status,created,discount) VALUES (?,?,?,?,?)",
+                   (sub["id"], sub.get("customer"), sub.get("status") or "active", int(sub.get("created") or 0),
+                    float(coupon.get("percent_off") or 0) / 100))
+        db.execute("DELETE FROM subscription_items WHERE subscription_id=?", (sub["id"],))
+        for item in (sub.get("items") or {}).get("data", []):
+            self._upsert_price(db, item["price"])
+            db.execute("INSERT OR REPLACE INTO subscription_items VALUES (?,?,?,?)",
+                       (item.get("id") or f"{sub['id']}:{item['price']['id']}", sub["id"],
+                        item["price"]["id"], int(item.get("quantity") or 1)))
+
+    def _upsert_charge(self, db, charge: Any) -> None:
+        db.execute("INSERT OR REPLACE INTO charges VALUES (?,?,?,?,?,?)",
+                   (charge["id"], charge.get("customer"), int(charge.get("amount") or 0), charge.get("currency"),
+                    charge.get("status") or "pending", int(charge.get("created") or 0)))
+
+    def _writer(self, resource: str):
+        return {"customers": self._upsert_customer, "prices": self._upsert_price,
+                "subscriptions": self._upsert_subscription, "charges": self._upsert_charge}[resource]
+
+    def _seen(self, db, object_id: str, updated: int) -> None:
+        db.execute("INSERT INTO object_versions VALUES (?,?) "
+                   "ON CONFLICT(id) DO UPDATE SET updated=max(updated, excluded.updated)", (object_id, updated))
+
+    def upsert(self, resource: str, objects: Iterable[Any], seen_at: int | None = None) -> int:
+        """Write listed objects; ``seen_at`` (when they were listed) makes older events for them stale."""
+        writer = self._writer(resource)
+        count = 0
+        with self._lock, self._connect() as db:
+            for obj in objects:
+                writer(db, obj)
+                if seen_at is not None:
+                    self._seen(db, obj["id"], seen_at)
+                count += 1
+        return count
+
+    def apply_event(self, event: Any) -> bool:
+        """Upsert the object carried by a Stripe webhook event, unless a newer one already wrote it."""
+        event_type = event["type"]
+        obj = event["data"]["object"]
+        if event_type.startswith("customer.subscription."):
+            resource = "subscriptions"
+            if event_type == "customer.subscription.deleted":
+                obj = {**obj, "status": "canceled"}
+        elif event_type in ("customer.created", "customer.updated", "customer.deleted"):
+            resource = "customers"
+        elif event_type.startswith("charge."):
+            resource = "charges"
+        elif event_type.startswith("price."):
+            resource = "prices"
+        else:
+            return False
+        updated = int(event.get("created") or 0)
+        with self._lock, self._connect() as db:
+            row = db.execute("SELECT updated FROM object_versions WHERE id=?", (obj["id"],)).fetchone()
+            if updated and row is not None and updated < row["updated"]:
+                logger.info("[Mirror] Skipped stale %s for %s", event_type, obj["id"])
+                return False
+            if event_type == "customer.deleted":
+                db.execute("UPDATE customers SET deleted=1 WHERE id=?", (obj["id"],))
+            else:
+                self._writer(resource)(db, obj)
+            if updated:
+                self._seen(db, obj["id"], updated)
+        return True
+
+    # Incremental sync
+
+    def cursor(self, resource: str) -> int:
+        with self._connect() as db:
+            row = db.execute("SELECT created FROM sync_cursors WHERE resource=?", (resource,)).fetchone()
+        return row["created"] if row else 0
+
+    def full_sync_due(self) -> bool:
+        with self._connect() as db:
+            row = db.execute("SELECT synced_at FROM sync_cursors WHERE resource='full'").fetchone()
+        return row is None or time.time() - row["synced_at"] >= FULL_SYNC_INTERVAL
+
+    def sync(self, full: bool | None = None) -> dict[str, int]:
+        """Pull objects created since the last cursor for every mirrored resource.
+
+        A full sync re-lists from the beginning to pick up state changes whose
+        webhooks were missed; by default one runs every FULL_SYNC_INTERVAL.
+        """
+        if self.stripe is None:
+            raise RuntimeError("StripeMirror has no Stripe client configured")
+        with self._sync_lock:
+            full = self.full_sync_due() if full is None else full
+            started = int(time.time())
+            # No deadline: cursors only advance once a sync completes, so a cold sync of a large account
+            # that timed out would restart from 0 every time and never fill the mirror.
+            sources = {resource: ListSource(lister, params, since=0 if full else self.cursor(resource), timeout=None,
+                                            sink=lambda objs, r=resource: self.upsert(r, objs, seen_at=started))
+                       for resource, lister, params in (("customers", self.stripe.Customer.list, {}),
+                                                        ("subscriptions", self.stripe.Subscription.list, {"status": "all"}),
+                                                        ("charges", self.stripe.Charge.list, {}))}
+            # ``gte`` plus idempotent upserts covers objects sharing the cursor
+            # second, and cursors only move once every window has been paged.
+            synced = crawl(sources)
+            with self._lock, self._connect() as db:
+                for resource in sources:
+                    newest = db.execute(f"SELECT COALESCE(MAX(created), 0) FROM {resource}").fetchone()[0]
+                    db.execute("INSERT OR REPLACE INTO sync_cursors VALUES (?,?,?)", (resource, newest, time.time()))
+                if full:
+                    db.execute("INSERT OR REPLACE INTO sync_cursors VALUES ('full',0,?)", (time.time(),))
+        logger.info("[Mirror] Synced %s (full=%s)", synced, full)
+        return synced
+
+    # Aggregates
+
+    def line_items(self) -> LineItems:
+        """Active subscription items as columns for :func:`revenue_engine.compute_mrr`."""
+        with self._connect() as db:
+            return LineItems.from_rows(db.execute(_LINE_ITEMS))
+
+    def mrr(self) -> MrrBreakdown:
+        return compute_mrr(self.line_items())
+
+    def _charge_total(self, db) -> float:
+        return db.execute("SELECT COALESCE(SUM(amount), 0) FROM (SELECT amount, status FROM charges "
+                          "ORDER BY created DESC LIMIT ?) WHERE status='succeeded'", (RECENT_CHARGES,)).fetchone()[0] / 100
+
+    def totals(self) -> dict[str, Any]:
+        mrr = self.mrr().total
+        with self._connect() as db:
+            customers = db.execute("SELECT COUNT(*) FROM customers WHERE deleted=0").fetchone()[0]
+            total = self._charge_total(db)
+        return {"mrr": round(mrr, 2), "customers": customers, "arr": round(mrr * 12, 2),
+                "total_revenue": round(total, 2), "configured": True, "source": "mirror"}
+
+    def scan_state(self) -> dict[str, Any]:
+        """Per-subscription MRR and customer ids, in the shape RevenueAggregator.load expects."""
+        subscriptions = self.mrr().by_subscription
+        with self._connect() as db:
+            customers = [row[0] for row in db.execute("SELECT id FROM customers WHERE deleted=0")]
+            total = self._charge_total(db)
+        return {"subscriptions": subscriptions, "customers": customers, "total_revenue": total}
@@ -188,3 +188,98 @@ class TestIntegration:
             assert isinstance(data['mrr'], (int, float))
             assert isinstance(data['customers'], int)
             assert isinstance(data['arr'], (int, float))
+
+
+class TestConductorEndpoints:
+    """Tests for the pre-rendered conductor endpoints"""
+
+    def test_conductor_dashboard_revalidates_with_etag(self, client):
+        """Test that a polling client with a current ETag gets 304"""
+        response = client.get('/api/conductor/dashboard')
+        assert response.status_code == 200
+        assert 'conductor_version' in json.loads(response.data)
+        again = client.get('/api/conductor/dashboard', headers={'If-None-Match': response.headers['ETag']})
+        assert again.status_code == 304
+
+    def test_new_revenue_version_renders_the_new_figures(self, client, monkeypatch):
+        """Test that a re-render for a new version is not fed the previously cached view"""
+        import app as app_module
+
+        conductor = app_module.conductor
+        client.get('/api/conductor/dashboard')
+        conductor.get_master_dashboard()
+        monkeypatch.setenv('SERVICES_REVENUE', '777')
+        conductor.providers.expire('services')
+        try:
+            conductor.providers.collect()
+            app_module.conductor_views.refresh()
+            data = json.loads(client.get('/api/conductor/dashboard').data)
+            assert data['revenueStreams']['services']['monthly'] == 777
+        finally:
+            monkeypatch.delenv('SERVICES_REVENUE')
+            conductor.providers.expire('services')
+
+
+class TestRevenueBreakdown:
+    """Tests for the cached MRR breakdown endpoint"""
+
+    def test_breakdown_is_cached_until_revenue_is_invalidated(self, client, monkeypatch):
+        """Test that repeated requests reuse one mirror computation until a webhook invalidates it"""
+        import app as app_module
+        from types import SimpleNamespace
+
+        calls = []
+        mirror = SimpleNamespace(mrr=lambda: calls.append(1) or SimpleNamespace(to_dict=lambda: {'total': len(calls)}))
+        monkeypatch.setattr(app_module, 'stripe_mirror', mirror)
+        monkeypatch.setattr(app_module, 'stripe', SimpleNamespace(api_key='sk_test'))
+        app_module.invalidate_revenue_cache(immediate=True)
+        first = json.loads(client.get('/api/revenue/breakdown').data)
+        second = json.loads(client.get('/api/revenue/breakdown').data)
+        assert first['total'] == second['total'] == 1 and len(calls) == 1
+        app_module.invalidate_revenue_cache(immediate=True)
+        assert json.loads(client.get('/api/revenue/breakdown').data)['total'] == 2
+
+
+class TestRemoteRevenueInvalidation:
+    """Tests for revenue invalidations that happen in another worker"""
+
+    def test_remote_invalidation_expires_the_subscriptions_source(self):
+        """Test that a webhook flushed by another worker makes this worker refetch subscriptions"""
+        import app as app_module
+        import cache_utils
+
+        providers = app_module.conductor.providers
+        providers.collect()
+        assert providers._state['subscriptions']['checked_at'] > float('-inf')
+        cache_utils._on_invalidation(f'{app_module.REVENUE_ROOT}\nconductor_master_dashboard')
+        assert providers._state['subscriptions']['checked_at'] == float('-inf')
+
+
+class TestPayoutOrchestration:
+    """Tests for the admin-only payout endpoint"""
+
+    def test_payout_requires_the_admin_secret(self, client, monkeypatch):
+        """Test that payouts cannot be triggered without PAYOUT_ADMIN_SECRET configured and sent"""
+        import app as app_module
+
+        assert client.post('/api/conductor/orchestrate-payout', json={}).status_code == 401
+        monkeypatch.setattr(app_module, 'PAYOUT_ADMIN_SECRET', 's3cret')
+        response = client.post('/api/conductor/orchestrate-payout', json={}, headers={'X-Payout-Secret': 'wrong'})
+        assert response.status_code == 401
+
+    def test_payout_forwards_the_idempotency_key_and_rejects_unknown_tiers(self, client, monkeypatch, tmp_path):
+        """Test that the Idempotency-Key header names the batch and an unknown tier is a 400"""
+        import app as app_module
+        from payout_engine import PayoutLedger
+
+        monkeypatch.setattr(app_module, 'PAYOUT_ADMIN_SECRET', 's3cret')
+        monkeypatch.setattr(app_module.conductor, 'payouts', PayoutLedger(tmp_path / 'payouts.sqlite3'))
+        headers = {'X-Payout-Secret': 's3cret', 'Idempotency-Key': 'cycle-2026-10'}
+        first = json.loads(client.post('/api/conductor/orchestrate-payout', json={}, headers=headers).data)
+        app_module.conductor.payouts.record('s1', 'commission', 'aff_1', 'bronze', 9000)
+        again = json.loads(client.post('/api/conductor/orchestrate-payout', json={}, headers=headers).data)
+        assert again['status'] == 'replayed' and again['orchestrationId'] == first['orchestrationId']
+        assert first['payoutSummary']['affiliates']['tier'] == 'all'
+
+        response = client.post('/api/conductor/orchestrate-payout', json={'tier': 'all'}, headers=headers)
+        assert response.status_code == 400
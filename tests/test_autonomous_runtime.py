@@ -1,4 +1,5 @@
 import tempfile
+import time
 from pathlib import Path
 
 from autonomous_runtime import AutonomousRuntime, EventLedger
@@ -31,3 +32,17 @@ def test_runtime_is_bounded_and_exposes_expected_agents():
     runtime = AutonomousRuntime(revenue_reader=lambda: {"configured": True, "mrr": 0, "customers": 0})
     assert runtime.interval >= 10
     assert {"DealCloser", "PricingDynamo", "LeadNurtureBot", "CheckoutOptimizer", "RetentionEngine"}.issubset(set(runtime.AGENTS))
+
+
+def test_runtime_records_configured_revenue_into_history(tmp_path):
+    from revenue_history import RevenueHistory
+
+    history = RevenueHistory(tmp_path / "history.sqlite3")
+    runtime = AutonomousRuntime(revenue_reader=lambda: {"configured": True, "mrr": 2500, "customers": 10},
+                                history=history)
+    runtime.ledger = EventLedger(tmp_path / "runtime.sqlite3")
+    runtime.force_cycle()
+    runtime.revenue_reader = lambda: {"configured": False, "mrr": 5000, "customers": 12}
+    runtime.force_cycle()
+    assert history.at("day", time.time())["count"] == 1
+    assert history.at("day", time.time())["mrr_last"] == 2500
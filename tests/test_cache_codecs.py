@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from cache_codecs import MAGIC, Codec, msgpack
+
+
+def test_small_json_stays_untagged_and_legacy_values_decode():
+    codec = Codec("json", "zlib", threshold=64)
+    raw = codec.encode({"mrr": 5000})
+    assert raw == b'{"mrr": 5000}'
+    assert Codec.decode(raw) == {"mrr": 5000}
+    assert Codec.decode('{"mrr": 5000}') == {"mrr": 5000}
+
+
+def test_large_values_are_compressed_and_readable_by_any_codec():
+    value = {"subscriptions": {f"sub_{i}": i for i in range(500)}}
+    written = [Codec(name, compression, threshold=64).encode(value)
+               for name in ("json", "msgpack") for compression in ("none", "zlib", "lz4")]
+    for raw in written:
+        assert Codec.decode(raw) == value
+    zlib_raw = Codec("json", "zlib", threshold=64).encode(value)
+    assert zlib_raw[:3] == MAGIC + b"jz" and len(zlib_raw) < len(written[0])
+
+
+@pytest.mark.skipif(msgpack is None, reason="msgpack not installed")
+def test_msgpack_keeps_datetimes():
+    now = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    raw = Codec("msgpack", "none").encode({"at": now, "tags": {"a"}})
+    assert raw[:2] == MAGIC + b"m"
+    assert Codec.decode(raw) == {"at": now, "tags": ["a"]}
+
+
+def test_unknown_codec_falls_back_to_json():
+    codec = Codec("bson", "brotli")
+    assert codec.name == "json+zlib"
@@ -0,0 +1,323 @@
+import threading
+import time
+
+import pytest
+
+import cache_utils
+from cache_utils import cache_delete, cache_stats, cached
+
+
+def test_concurrent_misses_are_single_flighted():
+    calls = []
+
+    @cached('test_single_flight', ttl=60)
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return {'value': len(calls)}
+
+    cache_delete('test_single_flight')
+    before = cache_stats()['coalesced']
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(slow())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [{'value': 1}] * 8
+    assert cache_stats()['coalesced'] - before == 7
+
+
+def test_lock_holder_elsewhere_is_waited_on(monkeypatch):
+    monkeypatch.setattr(cache_utils, 'LOCK_WAIT', 1.0)
+    cache_delete('test_remote_lock')
+    assert cache_utils._acquire_lock('test_remote_lock', 'other-worker') == (True, False)
+    threading.Timer(0.1, lambda: cache_utils.cache_set('test_remote_lock', {'from': 'other'}, 60)).start()
+
+    @cached('test_remote_lock', ttl=60)
+    def compute():
+        return {'from': 'self'}
+
+    assert compute() == {'from': 'other'}
+    cache_utils._release_lock('test_remote_lock', 'other-worker')
+
+
+def test_soft_expired_entry_is_served_stale_while_refreshing(monkeypatch):
+    values = iter([{'v': 1}, {'v': 2}])
+    refreshed = threading.Event()
+
+    @cached('test_swr', ttl=60, soft_ttl=30)
+    def compute():
+        value = next(values)
+        if value['v'] == 2:
+            refreshed.set()
+        return value
+
+    cache_delete('test_swr')
+    assert compute() == {'v': 1}
+    assert compute() == {'v': 1}
+    now = time.time()
+    monkeypatch.setattr(cache_utils.time, 'time', lambda: now + 45)
+    assert compute() == {'v': 1}  # stale, but returned without blocking
+    assert refreshed.wait(2)
+    for _ in range(20):
+        if compute() == {'v': 2}:
+            break
+        time.sleep(0.05)
+    assert compute() == {'v': 2}
+
+
+def test_invalidation_burst_is_coalesced_into_one_flush(monkeypatch):
+    import master_conductor  # noqa: F401  registers the conductor's revenue dependents
+
+    deleted = []
+    refreshed = []
+    monkeypatch.setattr(cache_utils, 'cache_delete_many', deleted.extend)
+    coalescer = cache_utils.InvalidationCoalescer(window=0.1, refresh=False)
+    coalescer.on_flush(lambda: refreshed.append(1))
+    for _ in range(50):
+        coalescer.invalidate([cache_utils.REVENUE_ROOT])
+    assert deleted == []
+    time.sleep(0.3)
+    assert deleted[0] == 'stripe_revenue'
+    assert {'conductor_master_dashboard', 'conductor_financial_summary', 'conductor_health'} <= set(deleted)
+    assert 'conductor_forecast' not in deleted  # versioned: its namespace is bumped instead
+    assert refreshed == [1]
+    assert coalescer.stats['flushes'] == 1 and coalescer.stats['namespaces_bumped'] == 1
+
+    coalescer.invalidate(['conductor_health'], immediate=True)
+    assert deleted[-1] == 'conductor_health'
+
+
+def test_dependency_cascade_refreshes_in_order_without_overflushing(monkeypatch):
+    deleted = []
+    monkeypatch.setattr(cache_utils, 'cache_delete_many', deleted.extend)
+    graph = cache_utils.DependencyGraph()
+    graph.register('revenue')
+    graph.register('summary', depends_on=('revenue',))
+    graph.register('dashboard', depends_on=('summary', 'revenue'))
+    graph.register('report', depends_on=('dashboard',), namespace='report')
+    graph.register('payouts', depends_on=('ledger',))
+    calls = []
+    for key in ('report', 'dashboard', 'summary', 'revenue'):
+        graph.on_refresh(key, lambda key=key: calls.append(key))
+
+    assert graph.cascade(['revenue']) == ['revenue', 'summary', 'dashboard', 'report']
+    version = cache_utils.namespace_version('report')
+    cache_utils.InvalidationCoalescer(window=0, graph=graph, refresh=True).invalidate(['summary'])
+    assert deleted == ['summary', 'dashboard']
+    assert cache_utils.namespace_version('report') == version + 1
+    assert calls == ['summary', 'dashboard', 'report']
+
+    graph.register('revenue', depends_on=('report',))
+    with pytest.raises(ValueError):
+        graph.cascade(['revenue'])
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.calls = 0
+        self.published = []
+
+    def get(self, key):
+        self.calls += 1
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def mget(self, keys):
+        self.calls += 1
+        return [self.data.get(k) for k in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        self.redis.calls += 1
+        for name, args in self.commands:
+            if name == 'delete':
+                for key in args:
+                    self.redis.delete(key)
+            else:
+                getattr(self.redis, name)(*args)
+
+
+def test_hot_reads_are_served_from_l1_and_deletes_broadcast(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(cache_utils, '_redis', lambda: redis)
+    monkeypatch.setattr(cache_utils, '_ensure_listener', lambda: None)
+    cache_utils._l1.clear()
+
+    redis.data['test_l1'] = '{"mrr": 5000}'
+    for _ in range(100):
+        assert cache_utils.cache_get('test_l1') == {'mrr': 5000}
+    assert redis.calls == 1
+
+    cache_delete('test_l1')
+    assert redis.published == [(cache_utils.INVALIDATION_CHANNEL, 'test_l1')]
+    assert cache_utils.cache_get('test_l1') is None
+
+    # another worker's delete arrives over pub/sub
+    redis.data['test_l1'] = '{"mrr": 6000}'
+    assert cache_utils.cache_get('test_l1') == {'mrr': 6000}
+    redis.data['test_l1'] = '{"mrr": 7000}'
+    cache_utils._on_invalidation('test_l1')
+    assert cache_utils.cache_get('test_l1') == {'mrr': 7000}
+
+
+def test_invalidation_hooks_run_for_local_and_remote_invalidations(monkeypatch):
+    monkeypatch.setattr(cache_utils, '_redis', lambda: None)
+    monkeypatch.setitem(cache_utils._invalidation_hooks, 'test_hooked', [])
+    fired = []
+    cache_utils.on_invalidated('test_hooked', lambda: fired.append(1))
+    cache_delete('test_hooked')
+    cache_utils.cache_delete_many(['test_other', 'test_hooked'])
+    cache_utils._on_invalidation('test_other\ntest_hooked')  # another worker's delete
+    cache_utils._on_invalidation('test_other')
+    assert len(fired) == 3
+
+
+def test_l1_is_bounded_lru():
+    store = cache_utils.MemoryStore(max_entries=2)
+    store.set('a', 1, 60)
+    store.set('b', 2, 60)
+    assert store.get('a') == 1
+    store.set('c', 3, 60)
+    assert store.get('b') is None and store.get('a') == 1 and store.get('c') == 3
+    store.set('d', 4, -1)
+    assert store.get('d') is None
+
+
+def test_fallback_store_enforces_byte_budget_and_sweeps(monkeypatch):
+    store = cache_utils.MemoryStore(max_entries=100, max_bytes=100, sweep_interval=0)
+    store.set('big', 'x' * 200, 60)
+    store.set('a', 'x' * 40, 60)  # 42 bytes serialized
+    store.set('b', 'x' * 40, 60)
+    store.set('c', 'x' * 40, 60)
+    assert store.get('a') is None and store.get('c') is not None
+    stats = store.stats()
+    assert stats['rejected'] == 1 and stats['evictions'] == 1
+    assert stats['entries'] == 2 and stats['bytes'] == 84
+
+    store.set('short', 1, 0.01)
+    time.sleep(0.02)
+    store.set('d', 1, 60)  # write triggers the sweep
+    assert 'short' not in store._data and store.stats()['expirations'] == 1
+    store.delete('d')
+    assert store.stats()['bytes'] == sum(entry[2] for entry in store._data.values())
+
+
+def test_vary_keys_by_arguments_and_namespace_bump_invalidates_all():
+    calls = []
+
+    class Conductor:
+        @cached('test_forecast', ttl=60, vary=('months',), namespace='test_ns')
+        def forecast(self, months=12, verbose=False):
+            calls.append(months)
+            return {'months': months, 'call': len(calls)}
+
+    conductor = Conductor()
+    assert conductor.forecast() == {'months': 12, 'call': 1}
+    assert conductor.forecast(12) == {'months': 12, 'call': 1}
+    assert Conductor().forecast(months=12, verbose=True) == {'months': 12, 'call': 1}
+    assert conductor.forecast(6) == {'months': 6, 'call': 2}
+    assert calls == [12, 6]
+
+    version = cache_utils.namespace_version('test_ns')
+    assert cache_utils.bump_namespace('test_ns') == version + 1
+    assert conductor.forecast(12)['call'] == 3
+    assert conductor.forecast(6)['call'] == 4
+
+
+class DownRedis:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, *_args):
+        self.calls += 1
+        raise cache_utils.redis.ConnectionError('connection refused')
+
+    setex = delete = publish = get
+
+
+def test_breaker_opens_falls_back_per_call_and_recovers(monkeypatch):
+    down = DownRedis()
+    breaker = cache_utils.CircuitBreaker(failures=3, reset=0.1)
+    monkeypatch.setattr(cache_utils, '_breaker', breaker)
+    monkeypatch.setattr(cache_utils, '_connect', lambda: down)
+    monkeypatch.setattr(cache_utils, '_ensure_listener', lambda: None)
+
+    cache_utils.cache_set('test_breaker', {'v': 1}, 60)  # lands in the memory tier
+    for _ in range(10):
+        assert cache_utils.cache_get('test_breaker') == {'v': 1}
+    assert breaker.state == 'open' and down.calls == 3
+    assert cache_utils.redis_connection() is None
+
+    up = FakeRedis()
+    up.data['test_breaker'] = '{"v": 2}'
+    monkeypatch.setattr(cache_utils, '_connect', lambda: up)
+    time.sleep(0.15)
+    assert cache_utils.cache_get('test_breaker') == {'v': 2}  # half-open probe succeeds
+    assert breaker.state == 'closed' and breaker.stats()['probes'] == 1
+    cache_delete('test_breaker')
+
+
+def test_losing_the_refresher_election_asks_the_breaker_once(monkeypatch, tmp_path):
+    from shared_snapshot import SharedSnapshot
+
+    key = 'test_breaker_shared'
+    SharedSnapshot(key, tmp_path).try_lead()  # the elected worker, busy elsewhere
+    follower = SharedSnapshot(key, tmp_path)
+    follower.write({'v': 1}, 60)
+    monkeypatch.setitem(cache_utils._shared, key, follower)
+    breaker = cache_utils.CircuitBreaker(failures=1, reset=60)
+    monkeypatch.setattr(cache_utils, '_breaker', breaker)
+    breaker.record_failure()
+
+    assert cache_utils._compute_locked(key, 60, lambda: {'v': 2}) == {'v': 1}
+    # Only the lock attempt consults the breaker; a second allow() could spend a half-open probe.
+    assert breaker.stats()['short_circuited'] == 1
+
+
+def test_bulk_operations_take_one_round_trip(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(cache_utils, '_redis', lambda: redis)
+    monkeypatch.setattr(cache_utils, '_ensure_listener', lambda: None)
+    monkeypatch.setattr(cache_utils, 'L1_TTL', 0)
+
+    cache_utils.cache_set_many({'bulk_a': {'v': 1}, 'bulk_b': [1, 2], 'bulk_c': 'x'}, ttl=60)
+    assert redis.calls == 1
+    assert cache_utils.cache_get_many(['bulk_a', 'bulk_b', 'bulk_missing', 'bulk_a']) == \
+        {'bulk_a': {'v': 1}, 'bulk_b': [1, 2]}
+    assert redis.calls == 2
+
+    cache_utils.cache_delete_many(['bulk_a', 'bulk_b'])
+    assert redis.calls == 3
+    assert redis.published == [(cache_utils.INVALIDATION_CHANNEL, 'bulk_a\nbulk_b')]
+    assert cache_utils.cache_get_many(['bulk_a', 'bulk_b', 'bulk_c']) == {'bulk_c': 'x'}
+
+
+def test_bulk_operations_on_memory_tier():
+    cache_utils.cache_delete_many(['mem_a', 'mem_b'])
+    cache_utils.cache_set_many({'mem_a': 1, 'mem_b': 2}, ttl=60)
+    assert cache_utils.cache_get_many(['mem_a', 'mem_b', 'mem_c']) == {'mem_a': 1, 'mem_b': 2}
+    cache_utils.cache_delete_many(['mem_a'])
+    assert cache_utils.cache_get_many(['mem_a', 'mem_b']) == {'mem_b': 2}
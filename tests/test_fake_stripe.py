@@ -0,0 +1,57 @@
+import pytest
+
+stripe = pytest.importorskip("stripe")
+
+import app as revenue_app  # noqa: E402
+from benchmarks.fake_stripe import FakeStripeData, FakeStripeServer, make_event, sign_webhook  # noqa: E402
+from revenue_aggregator import subscription_mrr  # noqa: E402
+
+
+@pytest.fixture
+def fake_stripe(monkeypatch):
+    with FakeStripeServer(FakeStripeData.seed(250)) as server:
+        # Background refreshes of the revenue cache (the elected refresher, the conductor's
+        # subscriptions source) reconcile once invalidated; keep them off the fake server's call counts.
+        monkeypatch.setattr(revenue_app.revenue_aggregator, "snapshot", lambda: dict(
+            mrr=revenue_app.MRR, customers=revenue_app.CUSTOMERS, arr=revenue_app.ARR, total_revenue=0))
+        monkeypatch.setattr(stripe, "api_base", server.url)
+        monkeypatch.setattr(stripe, "api_key", "sk_test_fake")
+        monkeypatch.setattr(revenue_app, "stripe_mirror", None)
+        yield server
+
+
+def test_crawl_against_fake_stripe_matches_seeded_data(fake_stripe):
+    state = revenue_app._scan_stripe()
+    active = [s for s in fake_stripe.data.collections["subscriptions"] if s["status"] == "active"]
+    assert set(state["subscriptions"]) == {s["id"] for s in active}
+    assert round(sum(state["subscriptions"].values()), 2) == round(sum(subscription_mrr(s) for s in active), 2)
+    assert len(state["customers"]) == 250
+    assert fake_stripe.calls["GET /v1/charges"] == 1
+
+
+def test_checkout_and_signed_webhook_round_trip(fake_stripe, monkeypatch):
+    monkeypatch.setenv("STRIPE_STARTER_PRICE_ID", "price_starter")
+    monkeypatch.setattr(revenue_app, "STRIPE_WEBHOOK_SECRET", "whsec_test")
+    client = revenue_app.app.test_client()
+    session = client.post("/api/checkout-session", json={"tier": "starter"}).get_json()
+    assert session["sessionId"].startswith("cs_test_")
+
+    payload = '{"id": "evt_1", "object": "event", "type": "customer.created", "data": {"object": {"id": "cus_x"}}}'
+    ok = client.post("/webhooks/stripe", data=payload, headers={"Stripe-Signature": sign_webhook(payload, "whsec_test")})
+    bad = client.post("/webhooks/stripe", data=payload, headers={"Stripe-Signature": sign_webhook(payload, "whsec_other")})
+    assert ok.status_code == 200 and ok.get_json()["event"] == "customer.created"
+    assert bad.status_code == 400
+    assert make_event("charge.succeeded", {"id": "ch_1"})["type"] == "charge.succeeded"
+
+
+def test_revenue_path_stays_within_budget(monkeypatch):
+    monkeypatch.setenv("STRIPE_SECRET_KEY", "sk_test_benchmark")
+    monkeypatch.setenv("STRIPE_STARTER_PRICE_ID", "price_starter")
+    from benchmarks import bench_revenue_path
+
+    for module, name in ((stripe, "api_base"), (stripe, "api_key"), (revenue_app, "stripe_mirror"),
+                         (revenue_app, "STRIPE_WEBHOOK_SECRET")):
+        monkeypatch.setattr(module, name, getattr(module, name))
+    rows = bench_revenue_path.run_size(1000, latency=0.0, repeat=5)
+    assert {row["stage"] for row in rows} == set(bench_revenue_path.BUDGETS)
+    assert bench_revenue_path.over_budget(rows) == []
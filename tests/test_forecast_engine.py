@@ -0,0 +1,35 @@
+import pytest
+
+import forecast_engine
+from forecast_engine import MAX_HORIZON, simulate
+
+
+def test_forecast_is_deterministic_and_memoized():
+    first = simulate(10000.0, 0.05, 0.02, 24)
+    assert simulate(10000.0, 0.05, 0.02, 24) is first
+    simulate.cache_clear()
+    again = simulate(10000.0, 0.05, 0.02, 24)
+    assert again is not first and again == first
+    assert simulate(10000.0, 0.06, 0.02, 24).seed != first.seed
+
+
+def test_bands_are_ordered_and_widen_with_the_horizon():
+    forecast = simulate(10000.0, 0.05, 0.02, MAX_HORIZON)
+    assert forecast.months == MAX_HORIZON
+    assert all(lo < mid < hi for lo, mid, hi in zip(forecast.p10, forecast.p50, forecast.p90))
+    assert forecast.p90[-1] - forecast.p10[-1] > forecast.p90[0] - forecast.p10[0]
+    assert forecast.p50[-1] == pytest.approx(10000 * 1.03 ** MAX_HORIZON, rel=0.1)
+    with pytest.raises(ValueError):
+        simulate(10000.0, 0.05, 0.02, MAX_HORIZON + 1)
+
+
+def test_pure_python_fallback_agrees_with_numpy(monkeypatch):
+    if forecast_engine.np is None:
+        pytest.skip("numpy not installed")
+    vectorized = simulate(5000.0, 0.04, 0.02, 12, paths=500)
+    monkeypatch.setattr(forecast_engine, "np", None)
+    simulate.cache_clear()
+    fallback = simulate(5000.0, 0.04, 0.02, 12, paths=500)
+    simulate.cache_clear()
+    assert fallback.p50[-1] == pytest.approx(vectorized.p50[-1], rel=0.05)
+    assert fallback.p10[-1] < fallback.p50[-1] < fallback.p90[-1]
@@ -0,0 +1,115 @@
+import tempfile
+import time
+from pathlib import Path
+
+from cache_utils import bump_namespace
+from master_conductor import MasterConductor
+from revenue_history import RevenueHistory
+
+
+def _conductor(monkeypatch, inputs, history=None):
+    conductor = MasterConductor()
+    monkeypatch.setattr(conductor, '_revenue_inputs', lambda: dict(inputs))
+    conductor.history = history or RevenueHistory(Path(tempfile.mkdtemp()) / 'history.sqlite3')
+    return conductor
+
+
+def test_views_share_one_snapshot_per_revenue_version(monkeypatch):
+    inputs = {'subscriptions': 120000, 'services': 2500}
+    conductor = _conductor(monkeypatch, inputs)
+    dashboard = MasterConductor.get_master_dashboard.__wrapped__(conductor)
+    snapshot = conductor.revenue_snapshot()
+    health = MasterConductor.get_system_health.__wrapped__(conductor)
+    MasterConductor.get_financial_summary.__wrapped__(conductor)
+
+    assert conductor.revenue_snapshot() is snapshot
+    assert dashboard['summary']['revenueHealth'] == health['healthScore'] == snapshot.health_score
+    assert dashboard['summary']['activeCustomers'] == snapshot.total_customers
+    assert 'health_score' in snapshot.__dict__  # memoized on the snapshot
+
+    inputs['services'] = 5000
+    changed = conductor.revenue_snapshot()
+    assert changed is not snapshot and changed.total_monthly == snapshot.total_monthly + 2500
+
+
+def test_snapshots_with_equal_inputs_agree_across_instances(monkeypatch):
+    inputs = {'subscriptions': 60000}
+    first = _conductor(monkeypatch, inputs)
+    second = _conductor(monkeypatch, inputs)
+    assert first.revenue_snapshot() == second.revenue_snapshot()
+
+
+def test_forecast_is_stable_and_capped_at_the_max_horizon(monkeypatch):
+    conductor = _conductor(monkeypatch, {'subscriptions': 120000})
+    forecast = MasterConductor._revenue_forecast.__wrapped__(conductor, 60, 0.05)
+    assert len(forecast['forecast12Months']) == 60
+    month = forecast['forecast12Months'][0]
+    assert month['low'] < month['revenue'] < month['high']
+    again = MasterConductor._revenue_forecast.__wrapped__(conductor, 60, 0.05)
+    assert again['forecast12Months'] == forecast['forecast12Months']
+
+    horizons = []
+    monkeypatch.setattr(MasterConductor, '_revenue_forecast', lambda self, months, growth: horizons.append(months))
+    for months in (500, 999, 60, -3):
+        conductor.get_revenue_forecast(months)
+    assert horizons == [60, 60, 60, 1]  # one cache key per clamped horizon
+
+
+def test_forecast_is_recomputed_when_measured_growth_moves(monkeypatch):
+    conductor = _conductor(monkeypatch, {'subscriptions': 120000})
+    growth = [0.02]
+    monkeypatch.setattr(conductor, 'measured_growth', lambda: (growth[0], True))
+    bump_namespace('conductor_forecast')
+    assert conductor.get_revenue_forecast(12)['growthRate'] == '2.0%'
+    growth[0] = 0.035
+    assert conductor.get_revenue_forecast(12)['growthRate'] == '3.5%'
+
+
+def test_growth_is_measured_from_history_when_available(monkeypatch, tmp_path):
+    history = RevenueHistory(tmp_path / 'history.sqlite3')
+    conductor = _conductor(monkeypatch, {'subscriptions': 120000}, history)
+    dashboard = MasterConductor.get_master_dashboard.__wrapped__(conductor)
+    assert dashboard['summary']['growthSource'] == 'configured'
+    assert dashboard['summary']['trend']['mrrChange7d'] is None
+
+    now = time.time()
+    for day in range(10, -1, -1):
+        history.record({'mrr': 10000 / 1.02 ** day}, ts=now - day * 86400)
+    dashboard = MasterConductor.get_master_dashboard.__wrapped__(conductor)
+    assert dashboard['summary']['growthSource'] == 'measured'
+    assert dashboard['summary']['growthRate'] == f"{(1.02 ** 30 - 1) * 100:.1f}%"
+    assert dashboard['summary']['trend']['mrrChange24h'] == 2.0
+
+
+def test_dashboard_reports_partial_results_from_slow_sources(tmp_path):
+    from revenue_providers import RevenueSource
+
+    conductor = MasterConductor()
+    conductor.history = RevenueHistory(tmp_path / 'history.sqlite3')
+    conductor.providers.register(RevenueSource('subscriptions', lambda: 4000, ttl=0))
+    conductor.providers.register(RevenueSource('services', lambda: time.sleep(1) or 900, ttl=0, deadline=0.05))
+    started = time.perf_counter()
+    dashboard = MasterConductor.get_master_dashboard.__wrapped__(conductor)
+    assert time.perf_counter() - started < 0.5
+    assert dashboard['revenueStreams']['subscriptions']['monthly'] == 48000
+    assert dashboard['revenueStreams']['services']['monthly'] == 0
+    assert dashboard['sources']['services']['stale'] and not dashboard['sources']['subscriptions']['stale']
+
+
+def test_payout_cycle_pays_ledger_records_once(monkeypatch, tmp_path):
+    from payout_engine import PayoutLedger
+
+    conductor = _conductor(monkeypatch, {'subscriptions': 60000})
+    conductor.payouts = PayoutLedger(tmp_path / 'payouts.sqlite3')
+    conductor.payouts.record_many([('c1', 'commission', 'aff_1', 'silver', 12550),
+                                   ('o1', 'service', 'pro_1', 'standard', 20000),
+                                   ('p1', 'content', 'cre_1', 'standard', 900)])
+    result = conductor.orchestrate_payout_cycle()
+    assert result['status'] == 'completed' and result['orchestrationId'].startswith('PAY_')
+    assert result['payoutSummary']['affiliates'] == {'count': 1, 'total': 125.5, 'average': 125.5, 'records': 1,
+                                                     'tier': 'all'}
+    assert result['totalPayouts'] == 325.5 and result['carriedForward'] == 9.0
+    assert result['processedCount'] == 2 and result['recordsProcessed'] == 3
+
+    again = conductor.orchestrate_payout_cycle()
+    assert again['status'] == 'replayed' and again['orchestrationId'] == result['orchestrationId']
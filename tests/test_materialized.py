@@ -0,0 +1,70 @@
+import gzip
+import json
+import time
+
+from flask import Flask, request
+
+from materialized import Materializer
+
+
+def _setup(max_age=60):
+    state = {"mrr": 100, "renders": 0}
+
+    def dashboard():
+        state["renders"] += 1
+        return {"mrr": state["mrr"]}
+
+    views = Materializer({"dashboard": dashboard}, version=lambda: {"mrr": state["mrr"]}, max_age=max_age, poll=60)
+    app = Flask(__name__)
+    app.get("/dashboard")(lambda: views.respond("dashboard", request))
+    return app.test_client(), views, state
+
+
+def test_etag_round_trip_answers_304_without_rendering():
+    client, views, state = _setup()
+    first = client.get("/dashboard")
+    assert first.status_code == 200 and first.get_json() == {"mrr": 100}
+    etag = first.headers["ETag"]
+    again = client.get("/dashboard", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.data == b""
+    assert state["renders"] == 1 and views.stats["not_modified"] == 1
+
+
+def test_gzip_variant_has_its_own_etag():
+    client, _, _ = _setup()
+    plain = client.get("/dashboard")
+    zipped = client.get("/dashboard", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(zipped.data)) == {"mrr": 100}
+    assert zipped.headers["ETag"] != plain.headers["ETag"]
+    assert client.get("/dashboard", headers={"If-None-Match": plain.headers["ETag"],
+                                             "Accept-Encoding": "gzip"}).status_code == 200
+
+
+def test_rerendered_only_when_the_version_changes_or_ages_out():
+    client, views, state = _setup()
+    etag = client.get("/dashboard").headers["ETag"]
+    views.refresh()
+    assert state["renders"] == 1
+    state["mrr"] = 250
+    views.refresh()
+    response = client.get("/dashboard", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.get_json() == {"mrr": 250}
+
+    client, views, state = _setup(max_age=0)
+    client.get("/dashboard")
+    views.refresh()
+    assert state["renders"] >= 2
+
+
+def test_independent_renders_of_one_version_share_an_etag():
+    from datetime import datetime
+
+    def dashboard():
+        return {"mrr": 100, "timestamp": datetime.utcnow().isoformat(), "sources": {"stripe": {"value": 100, "age": time.time()}}}
+
+    first = Materializer({"dashboard": dashboard}, version=lambda: 1, poll=60)
+    second = Materializer({"dashboard": dashboard}, version=lambda: 7, poll=60)  # another worker's counter
+    a, b = first.render("dashboard"), second.render("dashboard")
+    assert a.body != b.body and a.etag == b.etag
+    assert first.render("dashboard").etag == a.etag  # the max_age re-render too
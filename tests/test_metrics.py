@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+import metrics
+
+pytestmark = pytest.mark.skipif(not metrics.ENABLED, reason="prometheus_client not installed")
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _sample(text, name, **labels):
+    want = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    for line in text.splitlines():
+        if line.startswith(f"{name}{{") and all(part in line for part in want.split(",")):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_cache_events_and_compute_time_are_labeled_by_namespace():
+    import cache_utils
+
+    @cache_utils.cached('test_metrics_ns:item', ttl=60)
+    def compute():
+        return {'v': 1}
+
+    cache_utils.cache_delete('test_metrics_ns:item')
+    before = metrics.exposition().decode()
+    compute()
+    compute()
+    after = metrics.exposition().decode()
+    assert _sample(after, "cache_compute_seconds_count", namespace="test_metrics_ns") - \
+        _sample(before, "cache_compute_seconds_count", namespace="test_metrics_ns") == 1
+    assert _sample(after, "cache_events_total", namespace="test_metrics_ns", event="set") > \
+        _sample(before, "cache_events_total", namespace="test_metrics_ns", event="set")
+
+
+def test_bulk_and_l1_calls_are_timed_under_each_namespace():
+    import cache_utils
+
+    def count(text, ns, tier, op):
+        return _sample(text, "cache_backend_seconds_count", namespace=ns, tier=tier, op=op)
+
+    keys = ['test_metrics_a:1', 'test_metrics_a:2', 'test_metrics_b:1']
+    before = metrics.exposition().decode()
+    cache_utils.cache_set_many(dict.fromkeys(keys, 1), ttl=60)
+    cache_utils.cache_get_many(keys)
+    cache_utils.cache_get('test_metrics_a:1')
+    after = metrics.exposition().decode()
+    for ns in ('test_metrics_a', 'test_metrics_b'):
+        tier = 'memory' if cache_utils.redis_connection() is None else 'redis'
+        assert count(after, ns, tier, 'set_many') - count(before, ns, tier, 'set_many') == 1
+        assert count(after, ns, 'l1', 'get_many') - count(before, ns, 'l1', 'get_many') == 1
+    assert count(after, 'test_metrics_a', 'l1', 'get') - count(before, 'test_metrics_a', 'l1', 'get') == 1
+    cache_utils.cache_delete_many(keys)
+
+
+def test_metrics_endpoint_aggregates_worker_processes():
+    script = ("import metrics; metrics.record('stripe_revenue', 'redis', 'hit'); "
+              "metrics.record('stripe_revenue', 'redis', 'hit')")
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": tmp}
+        for _ in range(2):  # two "workers"
+            subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, check=True)
+        out = subprocess.run([sys.executable, "-c", "import metrics, sys; sys.stdout.write(metrics.exposition().decode())"],
+                             cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+    assert _sample(out, "cache_events_total", namespace="stripe_revenue", tier="redis", event="hit") == 4
+
+
+def test_metrics_route_serves_exposition():
+    from app import app
+    client = app.test_client()
+    client.get('/health')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert b'http_request_seconds_count{endpoint="/health",method="GET",status="200"}' in response.data
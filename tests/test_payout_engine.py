@@ -0,0 +1,72 @@
+import pytest
+
+from payout_engine import ALL, PayoutLedger
+
+
+def _ledger(tmp_path, **kwargs):
+    return PayoutLedger(tmp_path / 'payouts.sqlite3', **kwargs)
+
+
+def test_cycle_aggregates_per_payee_across_chunks(tmp_path):
+    ledger = _ledger(tmp_path, chunk_size=1000)
+    rows = [(f'sale_{i}', 'commission', f'aff_{i % 3}', 'bronze', 100) for i in range(4500)]
+    rows += [('order_1', 'service', 'pro_1', 'standard', 7500), ('post_1', 'content', 'cre_1', 'standard', 6000)]
+    assert ledger.record_many(rows) == 4502
+    assert ledger.record_many(rows[:10]) == 0  # same sales again are ignored
+
+    batch = ledger.run_cycle()
+    assert batch.records == 4502
+    assert [(line.payee, line.cents, line.records) for line in batch.lines if line.kind == 'commission'] == [
+        ('aff_0', 150000, 1500), ('aff_1', 150000, 1500), ('aff_2', 150000, 1500)]
+    assert batch.by_kind()['service'] == {'payees': 1, 'cents': 7500, 'records': 1}
+    assert batch.total_cents == 4500 * 100 + 7500 + 6000
+    assert len({line.idempotency_key for line in batch.lines}) == len(batch.lines) == 5
+
+
+def test_rerun_replays_the_committed_batch_and_new_records_start_the_next(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.record('sale_1', 'commission', 'aff_1', 'bronze', 9000)
+    first = ledger.run_cycle()
+    again = ledger.run_cycle()
+    assert again.replayed and again.batch_id == first.batch_id and again.lines == first.lines
+
+    ledger.record('sale_2', 'commission', 'aff_1', 'bronze', 6000)
+    second = ledger.run_cycle()
+    assert second.batch_id != first.batch_id and not second.replayed
+    assert [(line.cents, line.records) for line in second.lines] == [(6000, 1)]
+
+
+def test_totals_below_the_tier_minimum_carry_forward(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.record('sale_1', 'commission', 'aff_1', 'gold', 15000)  # gold pays out from $200
+    first = ledger.run_cycle()
+    assert first.lines == [] and first.carried_cents == 15000
+    assert ledger.status()['carried_payees'] == 1
+
+    ledger.record('sale_2', 'commission', 'aff_1', 'gold', 6000)
+    second = ledger.run_cycle()
+    assert [(line.cents, line.records) for line in second.lines] == [(21000, 2)]
+    assert ledger.status()['carried_cents'] == 0
+
+
+def test_tier_cycles_leave_other_tiers_for_the_next_cycle(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.record_many([('s1', 'commission', 'aff_g', 'gold', 30000), ('s2', 'commission', 'aff_s', 'silver', 20000)])
+    gold = ledger.run_cycle('gold')
+    assert [line.payee for line in gold.lines] == ['aff_g']
+
+    ledger.record('s3', 'commission', 'aff_g', 'gold', 25000)
+    rest = ledger.run_cycle()
+    assert sorted((line.payee, line.cents) for line in rest.lines) == [('aff_g', 25000), ('aff_s', 20000)]
+    assert ledger.run_cycle().replayed
+
+
+def test_unknown_tiers_are_rejected_and_cannot_pose_as_the_all_tier_scope(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.record('s1', 'commission', 'aff_1', 'bronze', 9000)
+    for tier in ('all', ALL, '', 'diamond'):
+        with pytest.raises(ValueError):
+            ledger.run_cycle(tier)
+    assert ledger.status()['batches'] == 0 and ledger.status()['tier_cursors'] == {}
+    batch = ledger.run_cycle()
+    assert batch.scope == ALL and [line.payee for line in batch.lines] == ['aff_1']
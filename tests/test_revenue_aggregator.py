@@ -0,0 +1,53 @@
+from revenue_aggregator import RevenueAggregator, subscription_mrr
+
+
+def _sub(sub_id, amount, interval="month", quantity=1, status="active"):
+    return {"id": sub_id, "status": status, "items": {"data": [
+        {"quantity": quantity, "price": {"unit_amount": amount, "recurring": {"interval": interval}}}]}}
+
+
+def _event(event_type, obj, created=0):
+    return {"type": event_type, "created": created, "data": {"object": obj}}
+
+
+def _scanner():
+    return {"subscriptions": {"sub_1": 100.0, "sub_2": 50.0}, "customers": ["cus_1", "cus_2"], "total_revenue": 900}
+
+
+def test_subscription_mrr_normalizes_yearly_and_quantity():
+    assert subscription_mrr(_sub("s", 12000, interval="year")) == 10.0
+    assert subscription_mrr(_sub("s", 2500, quantity=2)) == 50.0
+
+
+def test_snapshot_is_none_until_primed_then_reads_reconciled_state():
+    aggregator = RevenueAggregator(scanner=_scanner)
+    assert aggregator.snapshot() is None
+    assert aggregator.apply_event(_event("customer.created", {"id": "cus_3"})) is False
+    result = aggregator.reconcile()
+    assert result["mrr"] == 150.0
+    assert result["customers"] == 2
+    assert result["arr"] == 1800.0
+    assert aggregator.snapshot() == result
+
+
+def test_events_apply_deltas_without_rescanning():
+    calls = []
+    aggregator = RevenueAggregator(scanner=lambda: calls.append(1) or _scanner())
+    aggregator.reconcile()
+    aggregator.apply_event(_event("customer.subscription.created", _sub("sub_3", 2000), created=10))
+    aggregator.apply_event(_event("customer.subscription.updated", _sub("sub_1", 15000), created=11))
+    aggregator.apply_event(_event("customer.subscription.deleted", _sub("sub_2", 5000), created=12))
+    aggregator.apply_event(_event("customer.created", {"id": "cus_3"}))
+    aggregator.apply_event(_event("customer.deleted", {"id": "cus_1"}))
+    snapshot = aggregator.snapshot()
+    assert snapshot["mrr"] == 170.0
+    assert snapshot["customers"] == 2
+    assert len(calls) == 1
+
+
+def test_out_of_order_and_inactive_subscription_events():
+    aggregator = RevenueAggregator(scanner=_scanner)
+    aggregator.reconcile()
+    aggregator.apply_event(_event("customer.subscription.updated", _sub("sub_1", 0, status="canceled"), created=20))
+    assert aggregator.apply_event(_event("customer.subscription.updated", _sub("sub_1", 90000), created=5)) is False
+    assert aggregator.snapshot()["mrr"] == 50.0
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+import revenue_engine
+from revenue_engine import LineItems, compute_mrr, load_fx_rates
+
+
+def _items():
+    items = LineItems()
+    items.append("sub_1", "starter", "usd", 1000, "month")
+    items.append("sub_1", "seats", "usd", 500, "month", quantity=4, discount=0.5)
+    items.append("sub_2", "annual", "eur", 12000, "year")
+    items.append("sub_3", "quarterly", "usd", 3000, "month", interval_count=3)
+    items.append("sub_4", "weekly", "usd", 700, "week")
+    items.append("sub_5", "yen", "jpy", 100000, "month")
+    return items
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_mrr_normalizes_intervals_discounts_and_currency(monkeypatch, vectorized):
+    if not vectorized:
+        monkeypatch.setattr(revenue_engine, "np", None)
+    elif revenue_engine.np is None:
+        pytest.skip("numpy not installed")
+    result = compute_mrr(_items(), {"usd": 1.0, "eur": 2.0})
+    weekly = 7 * 365.25 / 7 / 12
+    assert result.total == pytest.approx(10 + 10 + 20 + 10 + weekly)
+    assert result.by_subscription["sub_1"] == pytest.approx(20.0)
+    assert result.by_currency["eur"] == {"native": pytest.approx(10.0), "base": pytest.approx(20.0)}
+    assert result.by_plan["quarterly"] == pytest.approx(10.0)
+    assert result.unconverted == ("jpy",)
+    assert result.to_dict()["unconvertedCurrencies"] == ["jpy"]
+
+
+def test_fx_table_file_formats(tmp_path):
+    flat = tmp_path / "flat.json"
+    flat.write_text(json.dumps({"EUR": 1.1}))
+    nested = tmp_path / "nested.json"
+    nested.write_text(json.dumps({"base": "usd", "rates": {"gbp": 1.3}}))
+    assert load_fx_rates(str(flat)) == {"eur": 1.1, "usd": 1.0}
+    assert load_fx_rates(str(nested)) == {"gbp": 1.3, "usd": 1.0}
+    assert load_fx_rates(str(tmp_path / "missing.json")) == {"usd": 1.0}
+
+
+def test_from_subscriptions_reads_coupon_discount():
+    sub = {"id": "sub_1", "discount": {"coupon": {"percent_off": 25}}, "items": {"data": [
+        {"quantity": 2, "price": {"id": "price_1", "currency": "usd", "unit_amount": 1000,
+                                  "recurring": {"interval": "month", "interval_count": 1}}}]}}
+    assert compute_mrr(LineItems.from_subscriptions([sub]), {"usd": 1.0}).total == pytest.approx(15.0)
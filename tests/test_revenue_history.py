@@ -0,0 +1,51 @@
+import pytest
+
+from revenue_history import RevenueHistory
+
+T0 = 1_700_000_000 - 1_700_000_000 % 86400  # a day boundary
+
+
+def test_samples_fold_into_minute_hour_and_day_rollups(tmp_path):
+    history = RevenueHistory(tmp_path / "history.sqlite3")
+    for offset, mrr in [(0, 100), (60, 130), (180, 120), (3700, 150)]:
+        history.record({"mrr": mrr, "customers": 3, "total_revenue": 10}, ts=T0 + offset)
+    history.record({"mrr": 90, "customers": 2, "total_revenue": 5}, ts=T0 + 120)  # arrives late
+
+    minute = history.at("minute", T0 + 5)
+    assert minute["count"] == 1 and minute["mrr_first"] == minute["mrr_last"] == 100
+    hour = history.at("hour", T0)
+    assert hour["count"] == 4 and hour["mrr_first"] == 100 and hour["mrr_last"] == 120
+    assert hour["mrr_min"] == 90 and hour["mrr_max"] == 130 and hour["mrr_avg"] == pytest.approx(110)
+    day = history.at("day", T0 + 80000)
+    assert day["count"] == 5 and day["mrr_last"] == 150 and day["customers"] == 3
+    assert [b["bucket"] for b in history.series("hour", T0, T0 + 86400)] == [T0, T0 + 3600]
+    assert history.status()["rollups"] == {"minute": 5, "hour": 2, "day": 1}
+
+
+def test_workers_recording_the_same_slot_store_one_sample(tmp_path):
+    first = RevenueHistory(tmp_path / "history.sqlite3")
+    second = RevenueHistory(tmp_path / "history.sqlite3")  # another worker's runtime
+    assert first.record({"mrr": 100}, ts=T0 + 5)
+    assert not second.record({"mrr": 100}, ts=T0 + 40)
+    assert second.record({"mrr": 110}, ts=T0 + 65)
+    assert first.at("hour", T0)["count"] == 2 and first.status()["samples"] == 2
+
+
+def test_old_raw_rows_and_fine_rollups_are_downsampled_away(tmp_path):
+    history = RevenueHistory(tmp_path / "history.sqlite3")
+    history.record({"mrr": 100}, ts=T0)
+    history.record({"mrr": 110}, ts=T0 + 8 * 86400)
+    assert history.at("minute", T0) is None
+    assert history.at("hour", T0)["mrr_last"] == 100 and history.at("day", T0)["mrr_last"] == 100
+    assert history.status()["samples"] == 1
+
+
+def test_growth_is_measured_once_enough_history_exists(tmp_path):
+    history = RevenueHistory(tmp_path / "history.sqlite3")
+    history.record({"mrr": 1000}, ts=T0)
+    history.record({"mrr": 1010}, ts=T0 + 86400)
+    assert history.monthly_growth() is None
+    assert history.change(7 * 86400) == pytest.approx(0.01)
+    for day in range(2, 11):
+        history.record({"mrr": 1000 * 1.01 ** day}, ts=T0 + day * 86400)
+    assert history.monthly_growth() == pytest.approx(1.01 ** 30 - 1)
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from revenue_providers import ProviderRegistry, RevenueSource
+
+
+def test_sources_are_fetched_concurrently():
+    registry = ProviderRegistry()
+    for n in range(4):
+        registry.register(RevenueSource(f"s{n}", lambda n=n: time.sleep(0.2) or n * 100, deadline=1))
+    started = time.perf_counter()
+    readings = registry.collect()
+    assert time.perf_counter() - started < 0.5
+    assert {name: r.value for name, r in readings.items()} == {"s0": 0, "s1": 100, "s2": 200, "s3": 300}
+    assert not any(r.stale for r in readings.values())
+
+
+def test_slow_source_is_marked_stale_and_reported_when_it_lands():
+    release, landed = threading.Event(), threading.Event()
+    values = iter([10, 20])
+
+    def slow():
+        value = next(values)
+        if value == 20:
+            release.wait(2)
+        return value
+
+    registry = ProviderRegistry(on_late=lambda name: landed.set())
+    registry.register(RevenueSource("affiliates", slow, ttl=0, deadline=0.05))
+    registry.register(RevenueSource("content", lambda: 5, ttl=0, deadline=0.05))
+    assert registry.collect()["affiliates"].value == 10
+
+    started = time.perf_counter()
+    readings = registry.collect()
+    assert time.perf_counter() - started < 0.5
+    assert readings["affiliates"].value == 10 and readings["affiliates"].stale
+    assert readings["content"].value == 5 and not readings["content"].stale
+    release.set()
+    assert landed.wait(2)
+    assert registry.stats["late_results"] == 1
+
+
+def test_ttl_limits_refetches_and_errors_keep_the_last_good_value():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) > 1:
+            raise RuntimeError("affiliate API down")
+        return 42
+
+    registry = ProviderRegistry()
+    registry.register(RevenueSource("affiliates", flaky, ttl=60))
+    registry.collect()
+    registry.collect()
+    assert len(calls) == 1
+
+    registry.register(RevenueSource("affiliates", flaky, ttl=0))
+    registry._state["affiliates"].update(value=42.0, fetched_at=time.time())
+    reading = registry.collect()["affiliates"]
+    assert reading.value == 42 and reading.stale and "down" in reading.error
+
+
+def test_refresh_starts_due_fetches_without_waiting_and_version_tracks_changes():
+    values, fetched = iter([10, 10, 20]), threading.Event()
+
+    def slow():
+        time.sleep(0.2)
+        fetched.set()
+        return next(values)
+
+    registry = ProviderRegistry()
+    registry.register(RevenueSource("subscriptions", slow, ttl=60))
+    started = time.perf_counter()
+    registry.refresh()
+    assert time.perf_counter() - started < 0.1 and registry.version == 0
+    assert fetched.wait(2) and registry.collect()["subscriptions"].value == 10
+    assert registry.version == 1
+
+    registry.expire("subscriptions")
+    registry.collect()
+    assert registry.version == 1  # same value again
+    registry.expire("subscriptions")
+    assert registry.collect()["subscriptions"].value == 20 and registry.version == 2
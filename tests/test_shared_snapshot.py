@@ -0,0 +1,97 @@
+import json
+import os
+import struct
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from shared_snapshot import INITIAL_BYTES, SharedSnapshot
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_readers_see_each_version_once_and_follow_file_growth(tmp_path):
+    writer, reader = SharedSnapshot("revenue", tmp_path), SharedSnapshot("revenue", tmp_path)
+    assert reader.read() is None
+    writer.write({"mrr": 100}, ttl=60)
+    assert reader.read() == {"mrr": 100}
+    assert reader.read() is reader.read()
+    assert reader.stats["decodes"] == 1
+
+    big = {"subscriptions": ["sub_%06d" % n for n in range(INITIAL_BYTES // 8)]}
+    writer.write(big, ttl=60)
+    assert reader.read() == big and reader.stats["decodes"] == 2
+
+    writer.write({"mrr": 1}, ttl=-1)
+    assert reader.read() is None and reader.read_entry()[0] == {"mrr": 1}
+    writer.write({"mrr": 2}, ttl=60)
+    writer.expire()
+    assert reader.read() is None and reader.read_entry()[0] == {"mrr": 2}
+    writer.clear()
+    assert reader.read_entry() is None
+
+
+def test_writer_that_died_mid_write_does_not_wedge_readers(tmp_path):
+    writer, reader = SharedSnapshot("revenue", tmp_path), SharedSnapshot("revenue", tmp_path)
+    writer.write({"mrr": 1}, ttl=60)
+    seq = writer._seq(writer._mm)
+    struct.pack_into("<Q", writer._mm, 8, seq + 1)  # odd: a write that never finished
+    fresh = SharedSnapshot("revenue", tmp_path)
+    writer.write({"mrr": 2}, ttl=60)
+    assert writer._seq(writer._mm) % 2 == 0
+    assert reader.read() == {"mrr": 2} and fresh.read() == {"mrr": 2}
+
+
+def test_one_refresher_is_elected_until_it_goes_away(tmp_path):
+    first, second = SharedSnapshot("revenue", tmp_path), SharedSnapshot("revenue", tmp_path)
+    assert first.try_lead() and first.try_lead()
+    assert not second.try_lead()
+    os.close(first._lock_fd)  # what the OS does when the elected worker dies
+    assert second.try_lead()
+
+
+WORKER = textwrap.dedent("""
+    import json, sys, time
+    sys.path.insert(0, {root!r})
+    from cache_utils import cached
+
+    @cached('test_shared_crawl', ttl=60, soft_ttl=30, shared=True)
+    def crawl():
+        with open({calls!r}, 'a') as f:
+            f.write('crawl\\n')
+        time.sleep(0.3)
+        return {{'mrr': 4200}}
+
+    print(json.dumps(crawl()))
+""")
+
+
+def test_workers_share_one_crawl_without_redis(tmp_path):
+    calls = tmp_path / "calls"
+    script = WORKER.format(root=str(ROOT), calls=str(calls))
+    env = {**os.environ, "SHARED_SNAPSHOT_DIR": str(tmp_path / "snapshots"), "REDIS_PORT": "1",
+           "METRICS_ENABLED": "0"}
+
+    def run(n):
+        workers = [subprocess.Popen([sys.executable, "-c", script], env=env, stdout=subprocess.PIPE, text=True)
+                   for _ in range(n)]
+        return [json.loads(worker.communicate(timeout=30)[0]) for worker in workers]
+
+    assert run(1) + run(2) == [{"mrr": 4200}] * 3
+    assert calls.read_text().count("crawl") == 1
+
+
+def test_followers_serve_the_last_snapshot_or_compute_without_waiting(tmp_path, monkeypatch):
+    import time
+    import cache_utils
+
+    key = "test_shared_follower"
+    SharedSnapshot(key, tmp_path).try_lead()  # the elected worker, busy elsewhere
+    monkeypatch.setitem(cache_utils._shared, key, SharedSnapshot(key, tmp_path))
+    monkeypatch.setattr(cache_utils, "_redis", lambda: None)
+    started = time.monotonic()
+    assert cache_utils._compute_locked(key, 60, lambda: {"mrr": 1}) == {"mrr": 1}  # cold: computes
+    cache_utils._shared[key].expire()
+    assert cache_utils._compute_locked(key, 60, lambda: {"mrr": 2}) == {"mrr": 1}  # expired: served
+    assert time.monotonic() - started < cache_utils.LOCK_WAIT
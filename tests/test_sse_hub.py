@@ -0,0 +1,88 @@
+import threading
+
+from sse_hub import LOCAL_BITS, EventHub
+
+
+def _ids(frames):
+    return [int(frame.split("\n", 1)[0].removeprefix("id: ")) for frame in frames]
+
+
+def test_clients_resume_after_last_event_id():
+    hub = EventHub(capacity=16)
+    for n in range(5):
+        assert hub.publish("revenue_update", {"n": n}) == n + 1
+    frames, cursor, gap = hub.read(2)
+    assert _ids(frames) == [3, 4, 5] and cursor == 5 and not gap
+    assert hub.read(5)[0] == []
+
+    stream = hub.stream(last_event_id=3)
+    assert next(stream).startswith("id: 3\nevent: heartbeat")
+    assert _ids([next(stream), next(stream)]) == [4, 5]
+    stream.close()
+
+
+def test_overrun_cursor_gets_resync_instead_of_silent_loss():
+    hub = EventHub(capacity=16)
+    for n in range(40):
+        hub.publish("revenue_update", {"n": n})
+    frames, cursor, gap = hub.read(3)
+    assert gap and cursor == 40
+    assert _ids(frames) == list(range(25, 41))
+
+    stream = hub.stream(last_event_id=3)
+    next(stream)
+    assert "event: resync" in next(stream)
+    stream.close()
+    assert hub.status()["resyncs"] == 1 and hub.status()["clients"] == 0
+
+
+def test_waiting_clients_are_woken_by_one_publish():
+    hub = EventHub(capacity=16)
+    received = []
+
+    def client():
+        stream = hub.stream(heartbeat=5)
+        next(stream)
+        received.append(next(stream))
+        stream.close()
+
+    threads = [threading.Thread(target=client) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    while hub.status()["clients"] < 50:
+        threading.Event().wait(0.01)
+    hub.publish("revenue_update", {"count": 1})
+    for thread in threads:
+        thread.join(timeout=5)
+    assert len(received) == 50 and all(frame.startswith("id: 1\nevent: revenue_update") for frame in received)
+
+
+def test_pubsub_messages_append_in_id_order_once():
+    hub = EventHub(capacity=16)
+    hub._on_message('7\n{"event": "revenue_update", "data": {"count": 1}}')
+    hub._on_message('7\n{"event": "revenue_update", "data": {"count": 1}}')
+    hub._on_message('8\n{"event": "revenue_update", "data": {"count": 2}}')
+    assert _ids(hub.read(0)[0]) == [7 << LOCAL_BITS, 8 << LOCAL_BITS]
+    assert hub.status()["received"] == 2
+
+
+def test_local_frames_do_not_take_the_next_redis_id():
+    hub = EventHub(capacity=16)
+    hub._on_message('7\n{"event": "revenue_update", "data": {"count": 1}}')
+    local_id = hub.publish("revenue_update", {"count": 2})  # Redis unavailable: delivered in-process
+    hub._on_message('8\n{"event": "revenue_update", "data": {"count": 3}}')
+    assert _ids(hub.read(0)[0]) == [7 << LOCAL_BITS, local_id, 8 << LOCAL_BITS]
+    assert (7 << LOCAL_BITS) < local_id < (8 << LOCAL_BITS)
+
+
+def test_redis_ids_are_not_mistaken_for_a_gap():
+    hub = EventHub(capacity=4)
+    hub._on_message('7\n{"event": "revenue_update", "data": {"count": 1}}')
+    hub._on_message('9\n{"event": "revenue_update", "data": {"count": 2}}')
+    frames, cursor, gap = hub.read(0)
+    assert not gap and _ids(frames) == [7 << LOCAL_BITS, 9 << LOCAL_BITS] and cursor == 9 << LOCAL_BITS
+
+    for n in range(10, 14):
+        hub._on_message(f'{n}\n{{"event": "revenue_update", "data": {{"count": {n}}}}}')
+    assert hub.read(7 << LOCAL_BITS)[2]  # 9 was evicted before this client saw it
+    assert not hub.read(9 << LOCAL_BITS)[2]
@@ -0,0 +1,61 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from stripe_listing import ListSource, crawl, partition_windows
+
+
+def _lister(objects, seen=None, delay=0.0):
+    def list_(limit=100, created=None, starting_after=None, **_params):
+        if seen is not None:
+            seen.append(created)
+        time.sleep(delay)
+        created = created or {}
+        rows = [o for o in objects if created.get("gte", 0) <= o["created"] < created.get("lt", 2 ** 40)]
+        rows.sort(key=lambda o: -o["created"])
+        if starting_after:
+            rows = rows[[o["id"] for o in rows].index(starting_after) + 1:]
+        return SimpleNamespace(data=rows[:limit], has_more=len(rows) > limit)
+    return list_
+
+
+def test_partition_windows_cover_range_without_gaps():
+    windows = partition_windows(100, 200, 4)
+    assert windows[0] == {"gte": 100, "lt": 125}
+    assert windows[-1] == {"gte": 175}
+    assert all(a["lt"] == b["gte"] for a, b in zip(windows, windows[1:]))
+    assert partition_windows(0, 200, 4) == [{}]
+
+
+def test_crawl_merges_partitioned_sources_concurrently():
+    customers = [{"id": f"cus_{i}", "created": 1000 + i * 10} for i in range(50)]
+    charges = [{"id": f"ch_{i}", "created": i + 1} for i in range(250)]
+    seen = []
+    sink_rows = []
+    lock = threading.Lock()
+
+    def sink(rows):
+        with lock:
+            sink_rows.extend(rows)
+
+    result = crawl({"customers": ListSource(_lister(customers, seen), since=1000, partitions=4),
+                    "charges": ListSource(_lister(charges), max_pages=1),
+                    "sunk": ListSource(_lister(customers), sink=sink)})
+    assert sorted(c["id"] for c in result["customers"]) == sorted(c["id"] for c in customers)
+    assert len(seen) >= 4
+    assert len(result["charges"]) == 100
+    assert result["sunk"] == 50 and len(sink_rows) == 50
+
+
+def test_crawl_raises_when_a_source_misses_its_deadline():
+    with pytest.raises(TimeoutError, match="slow"):
+        crawl({"slow": ListSource(_lister([{"id": "x", "created": 1}], delay=0.5), timeout=0.05)})
+
+
+def test_sources_without_a_timeout_are_paged_to_the_end():
+    received = []
+    result = crawl({"slow": ListSource(_lister([{"id": "x", "created": 1}], delay=0.1), timeout=None,
+                                       sink=received.extend)})
+    assert result == {"slow": 1} and [o["id"] for o in received] == ["x"]
@@ -0,0 +1,91 @@
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from stripe_mirror import StripeMirror
+
+
+def _lister(objects, calls):
+    def list_(limit=100, created=None, starting_after=None, **_params):
+        calls.append({"created": created, "starting_after": starting_after})
+        created = created or {}
+        rows = sorted((o for o in objects if created.get("gte", 0) <= o["created"] < created.get("lt", 2 ** 40)),
+                      key=lambda o: -o["created"])
+        if starting_after:
+            rows = rows[[o["id"] for o in rows].index(starting_after) + 1:]
+        return SimpleNamespace(data=rows[:limit], has_more=len(rows) > limit)
+    return list_
+
+
+def _sub(sub_id, created, amount, interval="month", status="active"):
+    price = {"id": f"price_{amount}_{interval}", "currency": "usd", "unit_amount": amount,
+             "recurring": {"interval": interval, "interval_count": 1}}
+    return {"id": sub_id, "customer": "cus_1", "status": status, "created": created,
+            "items": {"data": [{"id": f"si_{sub_id}", "quantity": 1, "price": price}]}}
+
+
+def _fake_stripe(subscriptions, customers, charges, calls):
+    return SimpleNamespace(Subscription=SimpleNamespace(list=_lister(subscriptions, calls.setdefault("subscriptions", []))),
+                           Customer=SimpleNamespace(list=_lister(customers, calls.setdefault("customers", []))),
+                           Charge=SimpleNamespace(list=_lister(charges, calls.setdefault("charges", []))))
+
+
+def test_sync_pages_with_cursor_and_aggregates_in_sql(monkeypatch):
+    monkeypatch.setattr("stripe_listing.PAGE_SIZE", 2)
+    subscriptions = [_sub("sub_1", 1, 1000), _sub("sub_2", 2, 12000, "year"), _sub("sub_3", 3, 500, status="canceled")]
+    customers = [{"id": f"cus_{i}", "created": i} for i in range(1, 6)]
+    charges = [{"id": "ch_1", "amount": 2500, "status": "succeeded", "created": 1},
+               {"id": "ch_2", "amount": 900, "status": "failed", "created": 2}]
+    calls = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        mirror = StripeMirror(Path(tmp) / "mirror.sqlite3", _fake_stripe(subscriptions, customers, charges, calls))
+        assert mirror.sync() == {"customers": 5, "subscriptions": 3, "charges": 2}
+        assert any(call["starting_after"] for call in calls["customers"])
+        totals = mirror.totals()
+        assert totals["mrr"] == 20.0
+        assert totals["customers"] == 5
+        assert totals["total_revenue"] == 25.0
+        assert mirror.scan_state()["subscriptions"] == {"sub_1": 10.0, "sub_2": 10.0}
+
+        customers.append({"id": "cus_6", "created": 9})
+        calls["customers"].clear()
+        assert mirror.sync()["customers"] == 2  # cursor second re-read plus the new customer
+        assert min(call["created"]["gte"] for call in calls["customers"]) == 5
+
+
+def test_webhook_events_upsert_and_cancel():
+    with tempfile.TemporaryDirectory() as tmp:
+        mirror = StripeMirror(Path(tmp) / "mirror.sqlite3")
+        mirror.apply_event({"type": "customer.subscription.created", "data": {"object": _sub("sub_1", 1, 3000)}})
+        mirror.apply_event({"type": "customer.created", "data": {"object": {"id": "cus_1", "created": 1}}})
+        assert mirror.totals()["mrr"] == 30.0
+        mirror.apply_event({"type": "customer.subscription.deleted", "data": {"object": _sub("sub_1", 1, 3000)}})
+        mirror.apply_event({"type": "customer.deleted", "data": {"object": {"id": "cus_1"}}})
+        assert mirror.totals()["mrr"] == 0
+        assert mirror.totals()["customers"] == 0
+
+
+def test_total_revenue_covers_the_newest_page_of_charges():
+    with tempfile.TemporaryDirectory() as tmp:
+        mirror = StripeMirror(Path(tmp) / "mirror.sqlite3")
+        mirror.upsert("charges", [{"id": "ch_old", "amount": 99900, "status": "succeeded", "created": 0}])
+        mirror.upsert("charges", [{"id": f"ch_{i}", "amount": 100, "status": "succeeded", "created": i}
+                                  for i in range(1, 101)])
+        assert mirror.totals()["total_revenue"] == 100.0
+
+
+def test_late_webhooks_do_not_overwrite_newer_state():
+    with tempfile.TemporaryDirectory() as tmp:
+        mirror = StripeMirror(Path(tmp) / "mirror.sqlite3")
+        canceled = {"type": "customer.subscription.deleted", "created": 200, "data": {"object": _sub("sub_1", 1, 3000)}}
+        late = {"type": "customer.subscription.updated", "created": 100, "data": {"object": _sub("sub_1", 1, 3000)}}
+        assert mirror.apply_event(canceled)
+        assert not mirror.apply_event(late)  # delivered after the cancellation it preceded
+        assert mirror.totals()["mrr"] == 0
+
+        mirror.upsert("subscriptions", [_sub("sub_2", 1, 5000)], seen_at=300)  # listed by a sync
+        stale = {"type": "customer.subscription.deleted", "created": 250, "data": {"object": _sub("sub_2", 1, 5000)}}
+        assert not mirror.apply_event(stale)
+        assert mirror.totals()["mrr"] == 50.0
+        assert mirror.apply_event({**stale, "created": 300})  # same second as the listing still applies
+        assert mirror.totals()["mrr"] == 0
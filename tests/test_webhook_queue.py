@@ -0,0 +1,72 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from webhook_queue import MAX_ATTEMPTS, RETRY_BASE, RETRY_MAX, WebhookQueue
+
+
+def _event(event_id, event_type="customer.created"):
+    return {"id": event_id, "type": event_type, "data": {"object": {"id": f"obj_{event_id}"}}}
+
+
+def test_retried_deliveries_are_deduplicated_and_batched():
+    batches = []
+    with tempfile.TemporaryDirectory() as tmp:
+        processed = []
+        queue = WebhookQueue(Path(tmp) / "queue.sqlite3", handler=batches.append, batch_size=2,
+                             on_processed=lambda first, last, events: processed.append((first, last, len(events))))
+        queue.start = lambda: None  # drive the queue by hand
+        assert queue.enqueue(_event("evt_1"))
+        assert not queue.enqueue(_event("evt_1"))
+        assert queue.enqueue(_event("evt_2"))
+        assert queue.enqueue(_event("evt_3"))
+        assert queue.process_batch() == 2
+        assert queue.process_batch() == 1
+        assert queue.process_batch() == 0
+        assert [[e["id"] for e in batch] for batch in batches] == [["evt_1", "evt_2"], ["evt_3"]]
+        assert processed == [(1, 3, 2), (4, 4, 1)]  # the ignored duplicate still used seq 2
+        assert queue.status()["duplicates"] == 1
+        assert queue.depth() == {"done": 3}
+
+
+def test_failed_batches_are_retried_and_every_process_tails():
+    attempts = []
+    local = []
+
+    def flaky(events):
+        attempts.append(len(events))
+        if len(attempts) == 1:
+            raise RuntimeError("downstream unavailable")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "queue.sqlite3"
+        queue = WebhookQueue(path, handler=flaky)
+        other_worker = WebhookQueue(path, local_handler=local.extend)
+        queue.start = lambda: None
+        queue.enqueue(_event("evt_1"))
+        started = time.time()
+        queue.process_batch()
+        assert queue.depth() == {"queued": 1}
+        assert queue.process_batch() == 0  # backing off rather than retrying at once
+        with queue._connect() as db:
+            due = db.execute("SELECT next_attempt_at FROM webhook_events").fetchone()[0]
+            assert due >= started + queue.retry_delay(1)
+            db.execute("UPDATE webhook_events SET next_attempt_at=0")
+        queue.process_batch()
+        assert queue.depth() == {"done": 1}
+        assert [queue.retry_delay(n) for n in (1, 2, 3)] == [RETRY_BASE, 2 * RETRY_BASE, 4 * RETRY_BASE]
+        assert queue.retry_delay(MAX_ATTEMPTS) <= RETRY_MAX
+        assert other_worker.tail() == 1
+        assert [e["id"] for e in local] == ["evt_1"]
+
+
+def test_background_workers_drain_the_queue():
+    done = threading.Event()
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = WebhookQueue(Path(tmp) / "queue.sqlite3", handler=lambda events: done.set(), poll_interval=0.05)
+        try:
+            queue.enqueue(_event("evt_1"))
+            assert done.wait(2)
+        finally:
+            queue.stop()
@@ -0,0 +1,224 @@
+"""Durable Stripe webhook ingestion queue.
+
+The webhook endpoint only verifies the signature and inserts the event here,
+keyed by Stripe's event id so retried deliveries are dropped on arrival. A
+small worker pool claims events in batches and runs the side effects once,
+while every process also tails the queue so per-worker state (the revenue
+aggregator) sees each event regardless of which worker received it.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+DB_PATH = Path(os.getenv("WEBHOOK_QUEUE_DB", "/tmp/garcar_webhook_queue.sqlite3"))
+WORKERS = max(1, int(os.getenv("WEBHOOK_QUEUE_WORKERS", "2")))
+BATCH_SIZE = max(1, int(os.getenv("WEBHOOK_QUEUE_BATCH", "100")))
+POLL_INTERVAL = float(os.getenv("WEBHOOK_QUEUE_POLL", "0.5"))
+CLAIM_SECONDS = 60
+# Failed batches are retried after RETRY_BASE * 2**(attempt - 1) seconds, capped at RETRY_MAX;
+# eight attempts ride out roughly twenty minutes of a downstream outage before dead-lettering.
+MAX_ATTEMPTS = 8
+RETRY_BASE = float(os.getenv("WEBHOOK_QUEUE_RETRY_BASE", "10"))
+RETRY_MAX = 900.0
+# Stripe retries a delivery for up to three days; keep ids longer than that for dedupe.
+RETENTION_SECONDS = int(os.getenv("WEBHOOK_QUEUE_RETENTION", str(7 * 86400)))
+
+Handler = Callable[[list[dict[str, Any]]], Any]
+
+
+class WebhookQueue:
+    """SQLite-backed event queue with id dedupe, batch claims and local tailing.
+
+    ``handler`` runs exactly once per event across all workers sharing the
+    database; ``local_handler`` runs once per event in every process.
+    ``on_processed(first_seq, last_seq, events)`` runs after ``handler``
+    succeeds for a claimed batch, so it too sees each batch once; the seq
+    range identifies the batch if a reclaimed one is processed twice.
+    """
+
+    def __init__(self, path: Path = DB_PATH, handler: Handler | None = None,
+                 local_handler: Handler | None = None, workers: int = WORKERS,
+                 batch_size: int = BATCH_SIZE, poll_interval: float = POLL_INTERVAL,
+                 on_processed: Callable[[int, int, list[dict[str, Any]]], Any] | None = None) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.handler = handler
+        self.local_handler = local_handler
+        self.on_processed = on_processed
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.owner_id = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self.stats = {"enqueued": 0, "duplicates": 0, "processed": 0, "failed": 0, "batches": 0}
+        self._stats_lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS webhook_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE, type TEXT NOT NULL,
+                payload TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,
+                claimed_by TEXT, claimed_until REAL, received_at REAL NOT NULL, processed_at REAL,
+                error TEXT, next_attempt_at REAL NOT NULL DEFAULT 0)""")
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(webhook_events)")}
+            if "next_attempt_at" not in columns:  # queues created before retries backed off
+                db.execute("ALTER TABLE webhook_events ADD COLUMN next_attempt_at REAL NOT NULL DEFAULT 0")
+            db.execute("CREATE INDEX IF NOT EXISTS idx_webhook_status ON webhook_events(status, seq)")
+            self._tail_seq = db.execute("SELECT COALESCE(MAX(seq), 0) FROM webhook_events").fetchone()[0]
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection whose transaction commits on success; closed on exit."""
+        db = sqlite3.connect(self.path, timeout=10)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def _count(self, stat: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[stat] += n
+
+    def enqueue(self, event: dict[str, Any]) -> bool:
+        """Persist a verified event payload; returns False if its id was already received."""
+        event_id = event.get("id") or f"evt_local_{uuid.uuid4().hex}"
+        with self._connect() as db:
+            cursor = db.execute("""INSERT OR IGNORE INTO webhook_events(id,type,payload,status,received_at)
+                                   VALUES (?,?,?,'queued',?)""",
+                                (event_id, event["type"], json.dumps(event, default=str), time.time()))
+            fresh = cursor.rowcount == 1
+        self._count("enqueued" if fresh else "duplicates")
+        if fresh:
+            self.start()
+            self._wake.set()
+        return fresh
+
+    def _claim(self) -> list[sqlite3.Row]:
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute("""SELECT seq, id, payload, attempts FROM webhook_events
+                WHERE (status='queued' AND next_attempt_at <= ?) OR (status='processing' AND claimed_until < ?)
+                ORDER BY seq LIMIT ?""", (now, now, self.batch_size)).fetchall()
+            if rows:
+                db.executemany("""UPDATE webhook_events SET status='processing', claimed_by=?, claimed_until=?,
+                                  attempts=attempts+1 WHERE seq=?""",
+                               [(self.owner_id, now + CLAIM_SECONDS, row["seq"]) for row in rows])
+            return rows
+
+    def process_batch(self) -> int:
+        """Claim and handle one batch; returns the number of events claimed."""
+        rows = self._claim()
+        if not rows:
+            return 0
+        events = [json.loads(row["payload"]) for row in rows]
+        try:
+            if self.handler is not None:
+                self.handler(events)
+        except Exception as exc:
+            logger.exception("[Webhooks] Batch of %d events failed", len(rows))
+            now = time.time()
+            with self._connect() as db:
+                db.executemany("""UPDATE webhook_events SET status=CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                                  claimed_by=NULL, error=?, next_attempt_at=? WHERE seq=?""",
+                               [(MAX_ATTEMPTS, str(exc), now + self.retry_delay(row["attempts"] + 1), row["seq"])
+                                for row in rows])
+            self._count("failed", len(rows))
+            return len(rows)
+        with self._connect() as db:
+            db.executemany("UPDATE webhook_events SET status='done', processed_at=? WHERE seq=?",
+                           [(time.time(), row["seq"]) for row in rows])
+        self._count("processed", len(rows))
+        self._count("batches")
+        if self.on_processed is not None:
+            try:
+                self.on_processed(rows[0]["seq"], rows[-1]["seq"], events)
+            except Exception:
+                logger.exception("[Webhooks] on_processed callback failed")
+        return len(rows)
+
+    @staticmethod
+    def retry_delay(attempts: int) -> float:
+        """Seconds to wait before retrying an event that has failed ``attempts`` times."""
+        return min(RETRY_MAX, RETRY_BASE * 2 ** (attempts - 1))
+
+    def tail(self) -> int:
+        """Feed events received since the last call to ``local_handler``."""
+        with self._connect() as db:
+            rows = db.execute("SELECT seq, payload FROM webhook_events WHERE seq > ? ORDER BY seq LIMIT ?",
+                              (self._tail_seq, self.batch_size * 10)).fetchall()
+        if not rows:
+            return 0
+        self._tail_seq = rows[-1]["seq"]
+        if self.local_handler is not None:
+            try:
+                self.local_handler([json.loads(row["payload"]) for row in rows])
+            except Exception:
+                logger.exception("[Webhooks] Local handler failed")
+        return len(rows)
+
+    def prune(self) -> int:
+        with self._connect() as db:
+            return db.execute("DELETE FROM webhook_events WHERE status='done' AND processed_at < ?",
+                              (time.time() - RETENTION_SECONDS,)).rowcount
+
+    def depth(self) -> dict[str, int]:
+        with self._connect() as db:
+            rows = db.execute("SELECT status, COUNT(*) AS n FROM webhook_events GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def _work(self, tails: bool) -> None:
+        last_prune = 0.0
+        while not self._stop.is_set():
+            try:
+                busy = self.process_batch()
+                if tails:
+                    busy += self.tail()
+                    if time.monotonic() - last_prune > 3600:
+                        self.prune()
+                        last_prune = time.monotonic()
+            except Exception:
+                logger.exception("[Webhooks] Worker loop error")
+                busy = 0
+            if not busy:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._threads = [threading.Thread(target=self._work, args=(i == 0,), name=f"webhook-worker-{i}",
+                                              daemon=True) for i in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=3)
+
+    def status(self) -> dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {"running": self.running, "workers": self.workers, "depth": self.depth(), **stats}